@@ -1,7 +1,12 @@
 # Seu arquivo principal (ex: meu_app.py)
+from inicializacao import concluir_partida, iniciar_partida, medicao_partida, registrar_partida
+# Partida a frio: mede do primeiro script do processo até a primeira página com dados
+iniciar_partida()
+
 import streamlit as st
 import pandas as pd
 from streamlit_option_menu import option_menu
+import json
 import os
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
@@ -9,8 +14,12 @@ warnings.simplefilter(action='ignore', category=FutureWarning)
 
 st.set_page_config(page_title="Go MED SAÚDE", page_icon=":bar_chart:", layout="wide")
 
-from meu_app import *
-from compras import *
+# As páginas (e o plotly) são importadas só quando a aba é aberta; a thread de atualização
+# costuma importá-las antes, ao montar os dados
+from atualizacao import dados_atuais, iniciar_atualizacao, solicitar_atualizacao
+from cache_resultados import estatisticas_resultados
+from medicao import ATIVA_POR_PADRAO, CHAVE_ESTADO, depuracao_ativa, rodada
+registrar_partida("importações")
 
 def exibir_cabecalho(img_path, titulo):
     if os.path.exists(img_path):
@@ -27,12 +36,48 @@ exibir_cabecalho("go_med_saude.jpeg", "Sistema de Análise")
 st.write("")
 st.write("")
 
+def avisar_datas_invalidas(df):
+    for coluna, (linhas, exemplos) in df.attrs.get('datas_invalidas', {}).items():
+        st.warning(f"⚠️ {linhas} linha(s) da coluna '{coluna}' não puderam ser convertidas para data. "
+                   f"Exemplos: {', '.join(map(str, exemplos))}")
+
+def exibir_painel_desempenho(medicao):
+    registro = medicao.como_dict()
+    with st.sidebar.expander("Desempenho do último rerun", expanded=True):
+        st.caption(f"Rodada {registro['rodada']}: {registro['total_ms']:.0f} ms no total. "
+                   "Reruns de fragmento são registrados só no log 'desempenho'.")
+        cache = estatisticas_resultados()
+        st.caption(f"Cache de resultados: {cache['taxa_acerto']:.0f}% de acerto ({cache['hits']} de "
+                   f"{cache['hits'] + cache['misses']}), {cache['entradas']} combinações, "
+                   f"{cache['mb']:.1f} de {cache['limite_mb']:.0f} MB.")
+        partida = medicao_partida()
+        if partida is not None and partida.fim is not None:
+            etapas = ", ".join(f"{etapa['fase']} em {etapa['inicio_ms'] + etapa['duracao_ms']:.0f} ms"
+                               for etapa in sorted(partida.fases, key=lambda etapa: etapa['inicio_ms'] + etapa['duracao_ms']))
+            st.caption(f"Partida a frio do processo: {partida.total_ms:.0f} ms ({etapas}).")
+        if registro['fases']:
+            st.dataframe(pd.DataFrame(registro['fases'])[['fase', 'inicio_ms', 'duracao_ms', 'linhas', 'thread']],
+                         hide_index=True)
+        st.download_button("Exportar (JSON)", json.dumps(registro, ensure_ascii=False, default=str),
+                           file_name=f"desempenho_{registro['rodada']}.json", mime="application/json")
+
+CAMINHOS_ARQUIVOS = {
+    "vendas": "df_vendas.csv",
+    "compras": "df_compra.csv",
+}
+
 def carregar_arquivos(tipo: str):
-    caminhos = {
-        "vendas": "df_vendas.csv",
-        "compras": "df_compra.csv",
-    }
-    return caminhos.get(tipo, None)
+    return CAMINHOS_ARQUIVOS.get(tipo, None)
+
+# Os CSVs são carregados por uma thread do processo; as sessões só leem a versão pronta
+iniciar_atualizacao(CAMINHOS_ARQUIVOS)
+
+@st.fragment(run_every=1)
+def aguardar_carga(tipo):
+    # Primeira carga do processo ainda em andamento: confere a cada segundo sem bloquear a sessão
+    if tipo in dados_atuais():
+        st.rerun()
+    st.info(f"Carregando os dados de {tipo} em segundo plano; a página será atualizada ao terminar.")
 
 def main():
 
@@ -56,45 +101,97 @@ def main():
                 "nav-link-selected": {"background-color": "red"},
             },
         )
+        st.toggle("Depuração de desempenho", value=ATIVA_POR_PADRAO, key=CHAVE_ESTADO)
+
+    # Versão dos dados deste rerun: uma troca feita pela atualização em segundo plano no meio
+    # da renderização só vale a partir do próximo rerun
+    dados_carregados = dados_atuais()
+    solicitar_atualizacao()
 
     if menu_selecionado == "Análise de Vendas":
         caminho_arquivo = carregar_arquivos("vendas")
-        if caminho_arquivo and os.path.exists(caminho_arquivo):
+        dados_vendas = dados_carregados.get("vendas")
+        if not (caminho_arquivo and os.path.exists(caminho_arquivo)):
+            st.error("Arquivo de vendas não encontrado!")
+        elif dados_vendas is None:
+            aguardar_carga("vendas")
+        elif 'erro' in dados_vendas:
+            st.error(f"Ocorreu um erro ao carregar o arquivo de vendas: {dados_vendas['erro']}")
+        elif dados_vendas['vazio']:
+            st.warning("O arquivo CSV de vendas está vazio.")
+        else:
             try:
-                df = pd.read_csv(caminho_arquivo)
-                if df.empty:
-                    st.warning("O arquivo CSV de vendas está vazio.")
-                else:
-                    tab1, tab2, tab3 = st.tabs(["Visão Geral", "Comparativo de Períodos", "Analise de tickets"])
+                from meu_app import renderizar_pagina_comparativo, renderizar_pagina_vendas, renderizar_pagina_vendedor
 
-                    with tab1:
-                        renderizar_pagina_vendas(df)
+                df = dados_vendas['df']
+                if dados_vendas['agregado']:
+                    st.info("O histórico de vendas excede o limite de memória configurado; exibindo os dados agregados.")
+                elif df is not None:
+                    avisar_datas_invalidas(df)
+
+                # Só a aba selecionada é executada; trocar de aba provoca um novo rerun
+                tab1, tab2, tab3 = st.tabs(["Visão Geral", "Comparativo de Períodos", "Analise de tickets"],
+                                           key="abas_vendas", on_change="rerun")
 
+                if tab1.open:
+                    with tab1:
+                        if dados_vendas['consultas'] is not None:
+                            # Backend SQL (BACKEND_CONSULTAS=duckdb): a Visão Geral consulta o banco em disco
+                            renderizar_pagina_vendas(None, snapshot=dados_vendas['snapshot'], consultas=dados_vendas['consultas'],
+                                                     versao=dados_vendas['versao'])
+                        else:
+                            renderizar_pagina_vendas(df, cubo=dados_vendas['cubo'], snapshot=dados_vendas['snapshot'],
+                                                     versao=dados_vendas['versao'], particoes=dados_vendas['particoes'])
+
+                if tab2.open:
                     with tab2:
-                        renderizar_pagina_comparativo(df)
+                        renderizar_pagina_comparativo(df, dados_vendas['indice_faturado'])
 
+                if tab3.open:
                     with tab3:
-                        renderizar_pagina_vendedor(df)
+                        renderizar_pagina_vendedor(dados_vendas['df_tickets'])
 
             except Exception as e:
                 st.error(f"Ocorreu um erro ao carregar o arquivo de vendas: {e}")
-        else:
-            st.error("Arquivo de vendas não encontrado!")
 
     elif menu_selecionado == "Análise de Compras":
         caminho_arquivo = carregar_arquivos("compras")
-        if caminho_arquivo and os.path.exists(caminho_arquivo):
+        dados_compras = dados_carregados.get("compras")
+        if not (caminho_arquivo and os.path.exists(caminho_arquivo)):
+            st.error("Arquivo de compras não encontrado!")
+        elif dados_compras is None:
+            aguardar_carga("compras")
+        elif 'erro' in dados_compras:
+            st.error(f"Ocorreu um erro ao carregar o arquivo de compras: {dados_compras['erro']}")
+        elif dados_compras['agregado'] and dados_compras.get('particoes') is None:
+            st.error("O arquivo de compras excede o limite de memória configurado (LIMITE_MEMORIA_MB) "
+                     "e o Parquet particionado não está disponível (pyarrow).")
+        elif dados_compras['vazio']:
+            st.warning("O arquivo CSV de compras está vazio.")
+        else:
             try:
-                df_compras = pd.read_csv(caminho_arquivo)
-                if df_compras.empty:
-                    st.warning("O arquivo CSV de compras está vazio.")
-                else:
-                    renderizar_pagina_compras(df_compras)
+                from compras import renderizar_pagina_compras
+
+                if dados_compras['agregado']:
+                    st.info("O histórico de compras excede o limite de memória configurado; cada filtro lê só as "
+                            "partições de que precisa.")
+                elif dados_compras['df'] is not None:
+                    avisar_datas_invalidas(dados_compras['df'])
+                # Com o backend SQL, cartões e gráficos filtrados vêm do banco; pendentes e
+                # comparativo de preços continuam sobre o DataFrame (ou o Parquet particionado)
+                renderizar_pagina_compras(dados_compras['df'], indice=dados_compras['indice'], pendentes=dados_compras['pendentes'],
+                                          snapshot=dados_compras['snapshot'], consultas=dados_compras['consultas'],
+                                          versao=dados_compras['versao'], particoes=dados_compras['particoes'])
 
             except Exception as e:
                 st.error(f"Ocorreu um erro ao carregar o arquivo de compras: {e}")
-        else:
-            st.error("Arquivo de compras não encontrado!")
+
+    if dados_carregados:
+        concluir_partida()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # O valor do toggle da rodada anterior já está no session_state quando o script recomeça
+    with rodada("rerun completo", depuracao_ativa(st.session_state)) as medicao:
+        main()
+    if medicao is not None:
+        exibir_painel_desempenho(medicao)
\ No newline at end of file
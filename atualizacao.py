@@ -0,0 +1,247 @@
+"""Carga dos datasets em segundo plano, com troca atômica da versão exibida.
+
+Uma thread do processo confere os CSVs a cada INTERVALO_ATUALIZACAO segundos (ou quando uma
+sessão pede com solicitar_atualizacao()) e, se algum mudou, carrega vendas e compras em
+paralelo, monta as estruturas derivadas (cubo, índices, pendentes, snapshots de métricas,
+banco SQL; Parquet particionado para históricos acima do teto de memória) e só então troca a
+referência global pela versão nova. Com o backend SQL (BACKEND_CONSULTAS=duckdb) o CSV não é
+carregado no pandas: o banco, os agregados e o Parquet particionado servem as páginas.
+
+Cada rerun lê essa referência uma vez no início (dados_atuais()) e renderiza a versão que
+pegou até o fim, mesmo que uma troca aconteça no meio; nenhum rerun espera pela carga.
+
+As estruturas derivadas são opcionais: se uma delas falha, o erro vai para o log e as páginas
+calculam pelo DataFrame. Só a falha na leitura do próprio CSV marca o tipo com erro; ele é
+tentado de novo quando o arquivo muda ou, com o mesmo arquivo, depois de uma espera que
+dobra a cada falha (ESPERA_NOVA_TENTATIVA_S, até ESPERA_MAXIMA_TENTATIVA_S).
+
+Os módulos das páginas (e o plotly) só são importados aqui, dentro da thread, na primeira
+carga; com AQUECIMENTO ligado, a thread também monta as figuras de aquecimento em seguida.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from calculos import carregar_snapshot
+from consultas import abrir_consultas
+from cubo import AGREGADOS_VENDAS, atualizar_cubo, construir_cubo
+from dados import (abrir_particoes, assinatura_arquivo, carregar_agregados, carregar_dataset, carregar_derivado,
+                   ler_compras, ler_vendas)
+from filtros import DIMENSOES_COMPRAS, IndiceDatas, IndiceFiltros
+from inicializacao import AQUECIMENTO, aquecer_figuras, registrar_partida
+from medicao import fase, rodada
+
+
+INTERVALO_ATUALIZACAO = float(os.environ.get("INTERVALO_ATUALIZACAO_S", 30))
+ESPERA_NOVA_TENTATIVA = float(os.environ.get("ESPERA_NOVA_TENTATIVA_S", 5))
+ESPERA_MAXIMA_TENTATIVA = float(os.environ.get("ESPERA_MAXIMA_TENTATIVA_S", 300))
+
+_logger = logging.getLogger("atualizacao")
+
+# Versão em uso: tipo -> dados carregados (dict somente leitura); trocada inteira a cada carga
+_ATUAL = {}
+_TRAVA_TROCA = threading.Lock()
+_ACORDAR = threading.Event()
+_TRABALHADOR = None
+_TRAVA_TRABALHADOR = threading.Lock()
+
+
+def _opcional(descricao, construir, *args):
+    """`construir(*args)`, ou None se falhar: sem a estrutura, as páginas usam o DataFrame."""
+    try:
+        return construir(*args)
+    except Exception:
+        _logger.exception("Falha ao montar %s; as páginas seguem sem ele", descricao)
+        return None
+
+
+def preparar_vendas(caminho):
+    """Dataset de vendas e tudo que as três abas usam, montado fora das sessões."""
+    from meu_app import criar_indice_faturado
+
+    versao = assinatura_arquivo(caminho)
+    with fase("carga: banco SQL de vendas"):
+        consultas = _opcional("o banco SQL de vendas", abrir_consultas, caminho, "vendas")
+    if consultas is not None:
+        # Backend SQL: a Visão Geral e a exportação consultam o banco, então o CSV não é
+        # carregado no pandas; as outras duas abas usam os agregados, montados bloco a bloco
+        df = None
+        vazio = consultas.total_linhas() == 0
+    else:
+        with fase("carga: vendas") as medida:
+            df = carregar_dataset(caminho, ler_vendas)
+            medida.linhas(len(df) if df is not None else None)
+        vazio = df is not None and df.empty
+    dados = {'versao': versao, 'df': df, 'vazio': vazio, 'agregado': df is None and consultas is None,
+             'consultas': consultas}
+    if dados['vazio']:
+        return dados
+
+    if df is None:
+        # Histórico acima do teto de memória (ou no banco SQL): as abas são servidas pelos agregados
+        with fase("carga: agregados de vendas"):
+            agregados = carregar_agregados(caminho, "vendas", AGREGADOS_VENDAS)
+        dados['cubo'] = agregados['cubo']
+        dados['indice_faturado'] = IndiceDatas(agregados['diario_faturado'], 'Data_Emissao', 'Valor_Total_Item')
+        dados['df_tickets'] = agregados['notas_unicas']
+        dados['particoes'] = None
+        if consultas is None:
+            # Linhas filtradas (exportação) lidas do Parquet particionado, sem o DataFrame inteiro
+            with fase("carga: Parquet de vendas"):
+                dados['particoes'] = _opcional("o Parquet particionado de vendas", abrir_particoes, caminho, "vendas")
+    else:
+        dados['particoes'] = None
+        with fase("cubo"):
+            dados['cubo'] = _opcional("o cubo de vendas", carregar_derivado, caminho, "cubo", construir_cubo,
+                                      ler_vendas, atualizar_cubo)
+        with fase("índice de datas"):
+            dados['indice_faturado'] = _opcional("o índice de datas", carregar_derivado, caminho, "indice_faturado",
+                                                 criar_indice_faturado, ler_vendas)
+        dados['df_tickets'] = df
+
+    dados['snapshot'] = _opcional("o snapshot de vendas", carregar_snapshot, "vendas", caminho)
+    return dados
+
+
+def preparar_compras(caminho):
+    from compras import atualizar_pendentes, construir_pendentes, pendentes_das_particoes
+
+    versao = assinatura_arquivo(caminho)
+    with fase("carga: banco SQL de compras"):
+        consultas = _opcional("o banco SQL de compras", abrir_consultas, caminho, "compras")
+    particoes = None
+    if consultas is not None:
+        # Backend SQL: cartões e gráficos consultam o banco; pendentes e comparativo de preços
+        # leem do Parquet particionado, então o CSV não é carregado no pandas
+        with fase("carga: Parquet de compras"):
+            particoes = _opcional("o Parquet particionado de compras", abrir_particoes, caminho, "compras")
+    if particoes is not None:
+        df = None
+        vazio = consultas.total_linhas() == 0
+    else:
+        with fase("carga: compras") as medida:
+            df = carregar_dataset(caminho, ler_compras)
+            medida.linhas(len(df) if df is not None else None)
+        vazio = df is not None and df.empty
+    dados = {'versao': versao, 'df': df, 'vazio': vazio, 'agregado': df is None and particoes is None,
+             'consultas': consultas, 'particoes': particoes}
+    if dados['vazio']:
+        return dados
+
+    if df is None:
+        if dados['particoes'] is None:
+            # Histórico acima do teto de memória: a página lê do Parquet particionado só o que cada filtro pede
+            with fase("carga: Parquet de compras"):
+                dados['particoes'] = _opcional("o Parquet particionado de compras", abrir_particoes, caminho, "compras")
+        if dados['particoes'] is None:
+            return dados
+        dados['indice'] = None
+        with fase("pedidos pendentes: visão"):
+            dados['pendentes'] = _opcional("a visão de pendentes", pendentes_das_particoes, dados['particoes'])
+    else:
+        with fase("índice de filtros"):
+            dados['indice'] = _opcional("o índice de filtros", carregar_derivado, caminho, "indice_filtros",
+                                        lambda df: IndiceFiltros(df, DIMENSOES_COMPRAS), ler_compras)
+        with fase("pedidos pendentes: visão"):
+            dados['pendentes'] = _opcional("a visão de pendentes", carregar_derivado, caminho, "pendentes",
+                                           construir_pendentes, ler_compras, atualizar_pendentes)
+    dados['snapshot'] = _opcional("o snapshot de compras", carregar_snapshot, "compras", caminho)
+    return dados
+
+
+PREPARADORES = {"vendas": preparar_vendas, "compras": preparar_compras}
+
+
+def _preparar(tipo, caminho, anterior=None):
+    # Cada carga é uma rodada de medição própria, registrada no log 'desempenho'
+    with rodada(f"atualização: {tipo}", True):
+        versao = assinatura_arquivo(caminho)
+        try:
+            return PREPARADORES[tipo](caminho)
+        except Exception as erro:
+            _logger.exception("Falha ao carregar %s", caminho)
+            # Falhas seguidas na mesma versão do arquivo esperam cada vez mais pela próxima tentativa
+            tentativas = anterior['tentativas'] + 1 if anterior and anterior['versao'] == versao else 1
+            espera = min(ESPERA_MAXIMA_TENTATIVA, ESPERA_NOVA_TENTATIVA * 2 ** (tentativas - 1))
+            return {'versao': versao, 'erro': str(erro), 'tentativas': tentativas,
+                    'proxima_tentativa': time.monotonic() + espera}
+
+
+def _precisa_carregar(dados, caminho):
+    if dados is None or dados['versao'] != assinatura_arquivo(caminho):
+        return True
+    return 'erro' in dados and time.monotonic() >= dados['proxima_tentativa']
+
+
+def atualizar(caminhos):
+    """Recarrega, em paralelo, os tipos cujo arquivo mudou (ou cuja carga falhou e já pode ser
+    repetida) e troca a versão em uso de uma vez.
+
+    `caminhos` é um dict tipo -> caminho do CSV. Retorna os tipos recarregados.
+    """
+    global _ATUAL
+    atual = _ATUAL
+    mudaram = {tipo: caminho for tipo, caminho in caminhos.items()
+               if os.path.exists(caminho) and _precisa_carregar(atual.get(tipo), caminho)}
+    if not mudaram:
+        return []
+
+    with ThreadPoolExecutor(max_workers=len(mudaram), thread_name_prefix="atualizacao") as executor:
+        futuros = {tipo: executor.submit(_preparar, tipo, caminho, atual.get(tipo)) for tipo, caminho in mudaram.items()}
+        carregados = {tipo: futuro.result() for tipo, futuro in futuros.items()}
+
+    with _TRAVA_TROCA:
+        novo = {tipo: dados for tipo, dados in _ATUAL.items() if tipo in caminhos and os.path.exists(caminhos[tipo])}
+        novo.update(carregados)
+        # Uma única atribuição: quem já leu a versão anterior continua com ela
+        _ATUAL = novo
+    return list(carregados)
+
+
+def dados_atuais():
+    """Versão em uso (tipo -> dados); leia uma vez por rerun e use a mesma até o fim."""
+    return _ATUAL
+
+
+def solicitar_atualizacao():
+    """Pede à thread de atualização que confira os arquivos agora, sem esperar por ela."""
+    _ACORDAR.set()
+
+
+def _aquecer():
+    inicio = time.perf_counter()
+    try:
+        aquecer_figuras()
+    except Exception:
+        _logger.exception("Falha no aquecimento das figuras")
+    registrar_partida("aquecimento das figuras", inicio)
+
+
+def _laco(caminhos, intervalo):
+    # Antes da primeira carga nenhuma página monta figuras: os caches do Plotly são preenchidos
+    # aqui sem concorrer com as threads dos scripts
+    if AQUECIMENTO:
+        _aquecer()
+    primeira = True
+    while True:
+        try:
+            atualizar(caminhos)
+        except Exception:
+            _logger.exception("Falha na atualização em segundo plano")
+        if primeira:
+            primeira = False
+            registrar_partida("primeira carga dos dados")
+        _ACORDAR.wait(intervalo)
+        _ACORDAR.clear()
+
+
+def iniciar_atualizacao(caminhos, intervalo=INTERVALO_ATUALIZACAO):
+    """Inicia (uma vez por processo) a thread que mantém os dados atualizados."""
+    global _TRABALHADOR
+    with _TRAVA_TRABALHADOR:
+        if _TRABALHADOR is None or not _TRABALHADOR.is_alive():
+            _TRABALHADOR = threading.Thread(target=_laco, args=(dict(caminhos), intervalo),
+                                            name="atualizacao-dados", daemon=True)
+            _TRABALHADOR.start()
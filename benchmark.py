@@ -0,0 +1,251 @@
+"""Benchmarks das funções de cálculo dos painéis, sobre dados sintéticos (sinteticos.py).
+
+Cada caso é medido isoladamente, com os dados já carregados: o tempo é o melhor de
+REPETICOES execuções e o pico de memória vem de uma execução extra sob tracemalloc. Os
+resultados são acrescentados a RESULTADOS com a versão (commit) do código, para comparar
+versões entre si.
+Uso: python benchmark.py --linhas 10000 100000 1000000
+     python benchmark.py --comparar [VERSAO_BASE VERSAO_NOVA]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from calculos import calcular_metricas, calcular_metricas_compras, snapshot_compras, snapshot_vendas
+from compras import chave_periodo, construir_pendentes, montar_comparativo_precos
+from consultas import (MEDIDAS_VENDAS, Consultas, consultas_disponiveis, importar_csv, metricas_vendas,
+                       vendas_por_vendedor_com_meta)
+from cubo import AGREGADOS_VENDAS, calcular_metricas_cubo, construir_cubo
+from dados import MemoriaExcedida, carregar_agregados, ler_compras, ler_vendas
+from filtros import DIMENSOES_COMPRAS, DIMENSOES_VENDAS, IndiceFiltros
+from graficos import reduzir_pontos, resumir_caixas
+from meu_app import aplicar_filtros, criar_indice_faturado
+from sinteticos import garantir_sintetico
+
+
+DIRETORIO_DADOS = "bench_dados"
+RESULTADOS = os.path.join("benchmarks", "resultados.jsonl")
+REPETICOES = 3
+# Razão de tempo (nova / base) a partir da qual --comparar aponta uma regressão
+LIMIAR_REGRESSAO = 1.2
+
+
+def medir(funcao, repeticoes=REPETICOES):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'tempo_s': min(tempos), 'mediana_s': statistics.median(tempos), 'pico_mb': pico / 1024 ** 2}
+
+
+def _filtro_tipico(df, dimensoes):
+    # Valores mais frequentes de cada dimensão: o caso de um usuário filtrando o que mais aparece
+    return {dimensao: df[dimensao].mode().iloc[0] for dimensao in dimensoes}
+
+
+def _periodos(indice):
+    fim = pd.Timestamp(indice.df[indice.coluna_data].max()).normalize()
+    periodo2 = (fim - pd.Timedelta(days=90), fim)
+    periodo1 = (periodo2[0] - pd.Timedelta(days=365), periodo2[1] - pd.Timedelta(days=365))
+    return periodo1, periodo2
+
+
+def _comparar_periodos(indice, periodo1, periodo2):
+    # Parte de cálculo de renderizar_pagina_comparativo: totais, tendências e sazonalidade
+    for periodo in (periodo1, periodo2):
+        indice.soma(*periodo)
+        diario = indice.vendas_diarias(*periodo)
+        diario['Média Móvel'] = diario['Valor_Total_Item'].rolling(window=7, min_periods=1).mean()
+        reduzir_pontos(diario, 'Valor_Total_Item')
+        fatia = indice.fatia(*periodo)
+        resumir_caixas(fatia['Data_Emissao'].dt.dayofweek, fatia['Valor_Total_Item'])
+
+
+def _visao_geral_sql(consultas, filtros):
+    # Consultas da Visão Geral no backend SQL: cartões e cada gráfico
+    metricas_vendas(consultas, filtros)
+    consultas.somar_por(filtros, ['Mes'], ['Valor_Total_Item'])
+    vendas_por_vendedor_com_meta(consultas, filtros)
+    consultas.somar_por(filtros, ['Linha'], MEDIDAS_VENDAS)
+    consultas.somar_por(filtros, ['Vendedor'], MEDIDAS_VENDAS)
+    consultas.somar_por(filtros, ['Descricao_produto'], ['Valor_Total_Item'], ordenar='Valor_Total_Item', limite=10)
+    consultas.somar_por(filtros, ['Cliente'], ['Valor_Total_Item'], ordenar='Valor_Total_Item', limite=20)
+
+
+def casos_vendas(caminho):
+    """Casos (nome, função) sobre o CSV de vendas; a preparação de cada caso não é medida."""
+    if consultas_disponiveis():
+        # O backend SQL não depende do teto de memória do pandas: é medido em qualquer tamanho
+        banco = Consultas(importar_csv(caminho, "vendas", os.path.join(os.path.dirname(caminho), "duckdb")), "vendas")
+        yield 'consultas_sql', lambda: _visao_geral_sql(banco, {'situacao': 'Faturada'})
+
+    try:
+        df = ler_vendas(caminho)
+    except MemoriaExcedida:
+        # Acima do teto de memória o painel só usa os agregados, então só eles são medidos
+        yield 'carregar_agregados', lambda: carregar_agregados(caminho, "vendas", AGREGADOS_VENDAS)
+        return
+
+    yield 'ler_vendas', lambda: ler_vendas(caminho)
+
+    filtros = _filtro_tipico(df, DIMENSOES_VENDAS)
+    argumentos = (filtros['Vendedor'], filtros['Mes'], filtros['Ano'], filtros['situacao'])
+    yield 'aplicar_filtros', lambda: aplicar_filtros(df, *argumentos)
+
+    yield 'indice_filtros', lambda: IndiceFiltros(df, DIMENSOES_VENDAS)
+    indice = IndiceFiltros(df, DIMENSOES_VENDAS)
+    yield 'aplicar_filtros_indice', lambda: aplicar_filtros(df, *argumentos, indice=indice)
+
+    yield 'calcular_metricas', lambda: calcular_metricas(df)
+
+    yield 'construir_cubo', lambda: construir_cubo(df)
+    cubo = construir_cubo(df)
+
+    def metricas_cubo():
+        base = aplicar_filtros(cubo['base'], *argumentos, indice=cubo['indices']['base'])
+        notas = aplicar_filtros(cubo['notas'], *argumentos, indice=cubo['indices']['notas'])
+        return calcular_metricas_cubo(base, notas)
+    yield 'calcular_metricas_cubo', metricas_cubo
+
+    yield 'snapshot_vendas', lambda: snapshot_vendas(cubo)
+
+    yield 'indice_faturado', lambda: criar_indice_faturado(df)
+    indice_faturado = criar_indice_faturado(df)
+    periodo1, periodo2 = _periodos(indice_faturado)
+    yield 'comparar_periodos', lambda: _comparar_periodos(indice_faturado, periodo1, periodo2)
+
+
+def casos_compras(caminho):
+    try:
+        df = ler_compras(caminho)
+    except MemoriaExcedida:
+        return
+
+    yield 'ler_compras', lambda: ler_compras(caminho)
+
+    filtros = _filtro_tipico(df, DIMENSOES_COMPRAS)
+    yield 'indice_filtros', lambda: IndiceFiltros(df, DIMENSOES_COMPRAS)
+    indice = IndiceFiltros(df, DIMENSOES_COMPRAS)
+    yield 'filtrar_indice', lambda: indice.filtrar(filtros)
+
+    yield 'calcular_metricas_compras', lambda: calcular_metricas_compras(df)
+
+    periodos = sorted(chave_periodo(df).unique().tolist())[-2:]
+    yield 'montar_comparativo_precos', lambda: montar_comparativo_precos(df, periodos)
+
+    yield 'construir_pendentes', lambda: construir_pendentes(df)
+    yield 'snapshot_compras', lambda: snapshot_compras(df)
+
+
+CASOS = {"vendas": casos_vendas, "compras": casos_compras}
+
+
+def versao_do_codigo():
+    try:
+        saida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        versao = saida.stdout.strip()
+        alterado = subprocess.run(["git", "diff", "--quiet", "HEAD", "--", "*.py"]).returncode != 0
+        return versao + ("-alterado" if alterado else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecida"
+
+
+def executar(linhas, tipos, destino=DIRETORIO_DADOS, repeticoes=REPETICOES, rotulo=None):
+    """Mede todos os casos para cada tamanho e tipo e retorna os registros gerados."""
+    contexto = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'versao': rotulo or versao_do_codigo(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+    }
+    registros = []
+    for quantidade in linhas:
+        for tipo in tipos:
+            caminho = garantir_sintetico(destino, tipo, quantidade)
+            for caso, funcao in CASOS[tipo](caminho):
+                medida = medir(funcao, repeticoes)
+                registro = dict(contexto, tipo=tipo, caso=caso, linhas=quantidade, repeticoes=repeticoes, **medida)
+                registros.append(registro)
+                print(f"{tipo:8} {caso:28} {quantidade:>11} linhas  {medida['tempo_s'] * 1000:10.1f} ms  "
+                      f"{medida['pico_mb']:9.1f} MB")
+    return registros
+
+
+def gravar_resultados(registros, caminho=RESULTADOS):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        for registro in registros:
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+def ler_resultados(caminho=RESULTADOS):
+    if not os.path.exists(caminho):
+        return pd.DataFrame()
+    return pd.read_json(caminho, lines=True, dtype={'versao': str})
+
+
+def comparar(resultados, base=None, nova=None, limiar=LIMIAR_REGRESSAO):
+    """Tempo e pico de memória de cada caso nas duas versões, com a razão nova / base.
+
+    Sem versões informadas, compara as duas últimas registradas. Retorna a tabela e as
+    linhas em que a razão de tempo passa do limiar.
+    """
+    versoes = list(dict.fromkeys(resultados['versao']))
+    if base is None or nova is None:
+        if len(versoes) < 2:
+            raise ValueError("São necessárias ao menos duas versões registradas para comparar.")
+        base, nova = versoes[-2], versoes[-1]
+
+    # Se uma versão foi medida mais de uma vez, vale a última medição
+    ultimas = resultados.drop_duplicates(['versao', 'tipo', 'caso', 'linhas'], keep='last')
+    chave = ['tipo', 'caso', 'linhas']
+    tabela = ultimas[ultimas['versao'] == base].merge(
+        ultimas[ultimas['versao'] == nova], on=chave, suffixes=('_base', '_nova'))[
+        chave + ['tempo_s_base', 'tempo_s_nova', 'pico_mb_base', 'pico_mb_nova']]
+    tabela['razao_tempo'] = tabela['tempo_s_nova'] / tabela['tempo_s_base']
+    tabela['razao_pico'] = tabela['pico_mb_nova'] / tabela['pico_mb_base']
+    return (base, nova), tabela, tabela[tabela['razao_tempo'] > limiar]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks das funções de cálculo sobre dados sintéticos.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="tamanhos dos datasets sintéticos (10^4 a 10^8)")
+    parser.add_argument("--tipos", nargs="+", default=list(CASOS), choices=list(CASOS))
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES)
+    parser.add_argument("--dados", default=DIRETORIO_DADOS, help="diretório dos CSVs sintéticos")
+    parser.add_argument("--rotulo", help="nome da versão no registro (padrão: commit atual)")
+    parser.add_argument("--comparar", nargs="*", metavar="VERSAO",
+                        help="compara duas versões registradas (padrão: as duas últimas)")
+    parser.add_argument("--limiar", type=float, default=LIMIAR_REGRESSAO)
+    argumentos = parser.parse_args()
+
+    if argumentos.comparar is not None:
+        versoes = argumentos.comparar + [None] * (2 - len(argumentos.comparar))
+        (base, nova), tabela, regressoes = comparar(ler_resultados(), *versoes[:2], argumentos.limiar)
+        print(f"{base} -> {nova}")
+        print(tabela.to_string(index=False, float_format=lambda valor: f"{valor:.4g}"))
+        if not regressoes.empty:
+            print(f"\n{len(regressoes)} caso(s) acima de {argumentos.limiar:.2f}x o tempo da versão base.")
+            sys.exit(1)
+    else:
+        gravar_resultados(executar(argumentos.linhas, argumentos.tipos, argumentos.dados,
+                                   argumentos.repeticoes, argumentos.rotulo))
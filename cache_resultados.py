@@ -0,0 +1,126 @@
+"""Cache LRU, limitado em bytes, do que as páginas exibem para cada combinação de filtros.
+
+A chave é (versão do dataset, página, filtros selecionados) e o valor guarda as métricas dos
+cartões e o resultado de cada gráfico (tabela agregada ou figura já montada). O cache é do
+processo, compartilhado por todas as sessões, e as tabelas são somente leitura; as figuras
+ficam guardadas como JSON e cada leitura recebe uma figura nova, que pode ser alterada.
+Quando o total passa de LIMITE_CACHE_RESULTADOS_MB, saem primeiro as entradas usadas há
+mais tempo.
+"""
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+LIMITE_CACHE_RESULTADOS_MB = float(os.environ.get("LIMITE_CACHE_RESULTADOS_MB", 256))
+
+
+class _FiguraSerializada(str):
+    """JSON de uma figura do plotly guardada no cache."""
+
+
+def _serializar(valor):
+    """Troca as figuras de `valor` (e de tuplas e listas dentro dele) pelo JSON delas."""
+    if hasattr(valor, 'to_plotly_json'):
+        # O mesmo JSON que o st.plotly_chart envia ao navegador; o plotly só é importado
+        # aqui, por quem já montou uma figura
+        import plotly.io as pio
+        return _FiguraSerializada(pio.to_json(valor, validate=False))
+    if type(valor) in (tuple, list):
+        return type(valor)(_serializar(item) for item in valor)
+    return valor
+
+
+def _restaurar(valor):
+    """Inverso de _serializar: cada figura volta como um objeto novo, sem ligação com o cache."""
+    if isinstance(valor, _FiguraSerializada):
+        import plotly.graph_objects as go
+        # O JSON saiu de uma figura já validada; validar de novo custaria ~10x a montagem
+        return go.Figure(json.loads(valor), _validate=False)
+    if type(valor) in (tuple, list):
+        return type(valor)(_restaurar(item) for item in valor)
+    return valor
+
+
+def tamanho_em_bytes(valor):
+    """Estimativa do espaço ocupado: memória das tabelas e tamanho das figuras serializadas."""
+    if valor is None:
+        return 0
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, (tuple, list)):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(item) for item in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """Dict LRU com limite no total de bytes das entradas; seguro entre threads."""
+
+    def __init__(self, limite_bytes):
+        self.limite_bytes = limite_bytes
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self._contadores = {'hits': 0, 'misses': 0, 'removidas': 0}
+
+    def obter(self, chave):
+        """Valor da chave, ou None; um acerto passa a entrada para o fim da fila de remoção."""
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self._contadores['misses'] += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self._contadores['hits'] += 1
+            valor = entrada[0]
+        return _restaurar(valor)
+
+    def guardar(self, chave, valor):
+        # Serialização e tamanho fora da trava: serializar figuras leva alguns milissegundos
+        valor = _serializar(valor)
+        tamanho = tamanho_em_bytes(valor)
+        if tamanho > self.limite_bytes:
+            return
+        with self._trava:
+            anterior = self._entradas.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._entradas[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.limite_bytes:
+                _, (_, tamanho_removido) = self._entradas.popitem(last=False)
+                self._bytes -= tamanho_removido
+                self._contadores['removidas'] += 1
+
+    def estatisticas(self):
+        with self._trava:
+            hits = self._contadores['hits']
+            misses = self._contadores['misses']
+            removidas = self._contadores['removidas']
+            entradas = len(self._entradas)
+            ocupado = self._bytes
+        total = hits + misses
+        taxa_acerto = hits / total * 100 if total > 0 else 0
+        return {'hits': hits, 'misses': misses, 'taxa_acerto': taxa_acerto, 'entradas': entradas,
+                'removidas': removidas, 'mb': ocupado / 1024 ** 2, 'limite_mb': self.limite_bytes / 1024 ** 2}
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
+            for contador in self._contadores:
+                self._contadores[contador] = 0
+
+
+# Compartilhado por todas as sessões do processo
+CACHE_RESULTADOS = CacheLRU(int(LIMITE_CACHE_RESULTADOS_MB * 1024 ** 2))
+
+
+def estatisticas_resultados():
+    return CACHE_RESULTADOS.estatisticas()
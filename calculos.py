@@ -0,0 +1,261 @@
+"""Cálculos das páginas de vendas e de compras, sem dependência do Streamlit.
+
+Além das funções usadas pelas páginas, gera os snapshots de métricas: as métricas dos
+cartões pré-calculadas para todas as combinações de filtros, gravadas em DIRETORIO_SNAPSHOTS.
+Uso agendado (ex.: cron, após a exportação dos CSVs): python calculos.py
+"""
+import argparse
+import itertools
+import json
+import os
+import threading
+
+import pandas as pd
+
+from cubo import MEDIDAS_CUBO, atualizar_cubo, construir_cubo
+from dados import assinatura_arquivo, carregar_agregados, ler_compras, parquet_disponivel
+from filtros import DIMENSOES_COMPRAS, DIMENSOES_VENDAS
+
+
+METAS_VENDEDORES = {
+    "VERIDIANA SERRA": 600000.00,
+    "CESAR GAMA": 450000.00,
+    "FABIAN SILVA": 400000.00,
+    "DENIS SOUSA": 1050000.00,
+    "THIAGO SOUSA": 200000.00
+}
+
+
+# --- Vendas ---
+
+def calcular_metricas(df):
+    total_nf = len(df['NF'].unique())
+    total_qtd_produto = df['Qtd_Produto'].sum()
+    valor_total_item = df['Valor_Total_Item'].sum()
+    total_custo_compra = df['Total_Custo_Compra'].sum()
+    total_lucro_venda = df['Total_Lucro_Venda_Item'].sum()
+
+    ticket_medio_geral = valor_total_item / total_nf if total_nf > 0 else 0
+    porcentagem_lucro_venda = (total_lucro_venda / valor_total_item) * 100 if valor_total_item > 0 else 0
+
+    return total_nf, total_qtd_produto, valor_total_item, total_custo_compra, total_lucro_venda, ticket_medio_geral, porcentagem_lucro_venda
+
+def agrupar_e_somar(df, coluna_agrupamento):
+    return df.groupby(coluna_agrupamento, observed=True).agg(
+        {'Valor_Total_Item': 'sum', 'Total_Custo_Compra': 'sum', 'Total_Lucro_Venda_Item': 'sum'}
+    ).reset_index()
+
+def produtos_mais_vendidos(df, top_n=10, ordenar_por='Valor_Total_Item'):
+    df_agrupado = df.groupby('Descricao_produto', observed=True)[ordenar_por].sum().reset_index()
+    df_ordenado = df_agrupado.sort_values(by=ordenar_por, ascending=False)
+    return df_ordenado.head(top_n)
+
+def calcular_performance_vendedores(df_vendas):
+    vendas_por_vendedor_filtrado = df_vendas[
+        (df_vendas['Vendedor'] != 'GERAL VENDAS') & (df_vendas['Vendedor'] != 'NATALIA SILVA') & (df_vendas['Vendedor'] != 'JORGE TOTE')
+    ].copy()
+
+    # Realizar o groupby e os cálculos no DataFrame filtrado
+    vendas_por_vendedor = vendas_por_vendedor_filtrado.groupby('Vendedor', observed=True)['Valor_Total_Item'].sum().reset_index()
+    vendas_por_vendedor = vendas_por_vendedor.rename(columns={'Valor_Total_Item': 'Total_Vendido'})
+
+    vendas_por_vendedor['Meta'] = vendas_por_vendedor['Vendedor'].map(METAS_VENDEDORES).fillna(0)
+    vendas_por_vendedor['Porcentagem_Atingida'] = (vendas_por_vendedor['Total_Vendido'] / vendas_por_vendedor['Meta'] * 100).fillna(0).round(2)
+    vendas_por_vendedor['Porcentagem_Texto'] = vendas_por_vendedor['Porcentagem_Atingida'].astype(str) + '%'
+
+    return vendas_por_vendedor
+
+
+# --- Compras ---
+
+def calcular_metricas_compras(df):
+    qunatidade_total_pedidos = df['numeropedido'].nunique()
+    valor_total_pedidos = df['valor liquido item'].sum()
+    quantidade_total_itens = df['qtd pedido item'].sum()
+    quantidade_pedidos_entregues = df[df['situacao pedido'] == 'fechado pedido chegou']['numeropedido'].nunique()
+    quantidade_pedidos_pendentes = df[df['situacao pedido'] == 'pendente']['numeropedido'].nunique()
+    return qunatidade_total_pedidos, valor_total_pedidos, quantidade_total_itens, quantidade_pedidos_entregues, quantidade_pedidos_pendentes
+
+
+# --- Snapshots de métricas por combinação de filtros ---
+
+DIRETORIO_SNAPSHOTS = "snapshots"
+
+# Colunas de métricas na mesma ordem das tuplas de calcular_metricas e calcular_metricas_compras
+METRICAS_VENDAS = ['total_nf', 'total_qtd_produto', 'valor_total_item', 'total_custo_compra',
+                   'total_lucro_venda', 'ticket_medio_geral', 'porcentagem_lucro_venda']
+METRICAS_COMPRAS = ['qtd_total_pedidos', 'valor_total', 'qtd_total_itens', 'qtd_entregues', 'qtd_pendentes']
+
+DIMENSOES_SNAPSHOT = {"vendas": DIMENSOES_VENDAS, "compras": DIMENSOES_COMPRAS}
+
+_CACHE_SNAPSHOTS = {}
+_TRAVA_SNAPSHOTS = threading.Lock()
+
+
+def _por_combinacao(dimensoes, agregar, obrigatorias=()):
+    """Empilha agregar(grupo) para cada subconjunto das dimensões.
+
+    A dimensão fora do grupo fica nula, o que no snapshot significa "todos"; por isso as
+    linhas com valor nulo na própria dimensão ficam de fora (groupby com dropna).
+    """
+    livres = [dimensao for dimensao in dimensoes if dimensao not in obrigatorias]
+    partes = []
+    for tamanho in range(len(livres) + 1):
+        for combinacao in itertools.combinations(livres, tamanho):
+            grupo = [dimensao for dimensao in dimensoes if dimensao in obrigatorias or dimensao in combinacao]
+            parte = agregar(grupo)
+            for dimensao in dimensoes:
+                parte[dimensao] = parte[dimensao].astype(object) if dimensao in grupo else None
+            partes.append(parte)
+    return pd.concat(partes, ignore_index=True)
+
+
+def _agregar_grupo(df, grupo, agregacoes):
+    if grupo:
+        return df.groupby(grupo, observed=True).agg(**agregacoes).reset_index()
+    return pd.DataFrame({nome: [df[coluna].agg(funcao)] for nome, (coluna, funcao) in agregacoes.items()})
+
+
+def snapshot_vendas(cubo):
+    """Métricas dos cartões da Visão Geral para todas as combinações de Vendedor, Mes, Ano e situacao."""
+    base, notas = cubo['base'], cubo['notas']
+    somas = {coluna: (coluna, 'sum') for coluna in MEDIDAS_CUBO}
+
+    def agregar(grupo):
+        parte = _agregar_grupo(base, grupo, somas)
+        contagem = _agregar_grupo(notas, grupo, {'total_nf': ('NF', 'nunique')})
+        if grupo:
+            parte = parte.merge(contagem, on=grupo, how='left')
+        else:
+            parte['total_nf'] = contagem['total_nf']
+        parte['total_nf'] = parte['total_nf'].fillna(0).astype('int64')
+
+        valor = parte['Valor_Total_Item']
+        parte['ticket_medio_geral'] = (valor / parte['total_nf'].where(parte['total_nf'] > 0)).fillna(0)
+        parte['porcentagem_lucro_venda'] = (parte['Total_Lucro_Venda_Item'] / valor.where(valor > 0) * 100).fillna(0)
+        return parte.rename(columns={
+            'Qtd_Produto': 'total_qtd_produto',
+            'Valor_Total_Item': 'valor_total_item',
+            'Total_Custo_Compra': 'total_custo_compra',
+            'Total_Lucro_Venda_Item': 'total_lucro_venda',
+        })[grupo + METRICAS_VENDAS]
+
+    return _por_combinacao(DIMENSOES_VENDAS, agregar)
+
+
+def snapshot_compras(df):
+    """Métricas dos cartões de compras para todas as combinações de filtros.
+
+    O filtro de ano sempre se aplica ('todos' significa o ano atual), então toda linha tem ano.
+    """
+    df = df.assign(
+        pedido_entregue=df['numeropedido'].where(df['situacao pedido'] == 'fechado pedido chegou'),
+        pedido_pendente=df['numeropedido'].where(df['situacao pedido'] == 'pendente'),
+    )
+    agregacoes = {
+        'qtd_total_pedidos': ('numeropedido', 'nunique'),
+        'valor_total': ('valor liquido item', 'sum'),
+        'qtd_total_itens': ('qtd pedido item', 'sum'),
+        'qtd_entregues': ('pedido_entregue', 'nunique'),
+        'qtd_pendentes': ('pedido_pendente', 'nunique'),
+    }
+
+    def agregar(grupo):
+        return _agregar_grupo(df, grupo, agregacoes)[grupo + METRICAS_COMPRAS]
+
+    return _por_combinacao(DIMENSOES_COMPRAS, agregar, obrigatorias=['ano'])
+
+
+def _caminho_snapshot(tipo, destino=DIRETORIO_SNAPSHOTS):
+    extensao = ".parquet" if parquet_disponivel() else ".pkl"
+    return os.path.join(destino, tipo + extensao), os.path.join(destino, tipo + ".json")
+
+
+def gravar_snapshot(tabela, tipo, caminho_csv, destino=DIRETORIO_SNAPSHOTS):
+    """Grava a tabela do snapshot e, ao lado, a assinatura do CSV de origem.
+
+    Os dois arquivos são escritos em temporários e renomeados, então o painel nunca lê um
+    snapshot pela metade.
+    """
+    os.makedirs(destino, exist_ok=True)
+    caminho_tabela, caminho_origem = _caminho_snapshot(tipo, destino)
+
+    if parquet_disponivel():
+        tabela.to_parquet(caminho_tabela + ".tmp", index=False)
+    else:
+        tabela.to_pickle(caminho_tabela + ".tmp")
+    with open(caminho_origem + ".tmp", "w", encoding="utf-8") as arquivo:
+        json.dump(list(assinatura_arquivo(caminho_csv)), arquivo)
+
+    os.replace(caminho_tabela + ".tmp", caminho_tabela)
+    os.replace(caminho_origem + ".tmp", caminho_origem)
+
+
+def carregar_snapshot(tipo, caminho_csv, destino=DIRETORIO_SNAPSHOTS):
+    """Retorna o snapshot do tipo como dict (valores dos filtros) -> métricas.
+
+    Retorna None se não houver snapshot ou se ele foi gerado de outra versão do CSV; nesse
+    caso as páginas calculam as métricas na hora.
+    """
+    caminho_tabela, caminho_origem = _caminho_snapshot(tipo, destino)
+    try:
+        with open(caminho_origem, encoding="utf-8") as arquivo:
+            origem = tuple(json.load(arquivo))
+        if origem != assinatura_arquivo(caminho_csv):
+            return None
+        assinatura = assinatura_arquivo(caminho_tabela)
+    except (OSError, ValueError):
+        return None
+
+    with _TRAVA_SNAPSHOTS:
+        entrada = _CACHE_SNAPSHOTS.get(caminho_tabela)
+        if entrada is not None and entrada[0] == assinatura:
+            return entrada[1]
+
+    if caminho_tabela.endswith(".parquet"):
+        tabela = pd.read_parquet(caminho_tabela)
+    else:
+        tabela = pd.read_pickle(caminho_tabela)
+
+    dimensoes = DIMENSOES_SNAPSHOT[tipo]
+    metricas = METRICAS_VENDAS if tipo == "vendas" else METRICAS_COMPRAS
+    chaves = zip(*(tabela[dimensao].astype(object).where(tabela[dimensao].notna(), None) for dimensao in dimensoes))
+    snapshot = dict(zip(chaves, tabela[metricas].itertuples(index=False, name=None)))
+
+    with _TRAVA_SNAPSHOTS:
+        _CACHE_SNAPSHOTS[caminho_tabela] = (assinatura, snapshot)
+    return snapshot
+
+
+def consultar_snapshot(snapshot, tipo, filtros):
+    """Métricas da combinação de filtros (dict coluna -> valor, como em filtros_para_leitura), ou None."""
+    if snapshot is None:
+        return None
+    return snapshot.get(tuple(filtros.get(dimensao) for dimensao in DIMENSOES_SNAPSHOT[tipo]))
+
+
+def gerar_snapshots(caminho_vendas="df_vendas.csv", caminho_compras="df_compra.csv", destino=DIRETORIO_SNAPSHOTS):
+    """Gera os snapshots dos CSVs existentes e retorna quantas combinações cada um tem."""
+    combinacoes = {}
+    if os.path.exists(caminho_vendas):
+        # O cubo é montado bloco a bloco, então o histórico não precisa caber em memória
+        cubo = carregar_agregados(caminho_vendas, "vendas", {'cubo': (construir_cubo, atualizar_cubo)})['cubo']
+        tabela = snapshot_vendas(cubo)
+        gravar_snapshot(tabela, "vendas", caminho_vendas, destino)
+        combinacoes["vendas"] = len(tabela)
+    if os.path.exists(caminho_compras):
+        tabela = snapshot_compras(ler_compras(caminho_compras))
+        gravar_snapshot(tabela, "compras", caminho_compras, destino)
+        combinacoes["compras"] = len(tabela)
+    return combinacoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pré-calcula as métricas do painel para todas as combinações de filtros.")
+    parser.add_argument("--vendas", default="df_vendas.csv", help="CSV de vendas")
+    parser.add_argument("--compras", default="df_compra.csv", help="CSV de compras")
+    parser.add_argument("--destino", default=DIRETORIO_SNAPSHOTS, help="diretório dos snapshots")
+    argumentos = parser.parse_args()
+
+    for tipo, quantidade in gerar_snapshots(argumentos.vendas, argumentos.compras, argumentos.destino).items():
+        print(f"{tipo}: {quantidade} combinações -> {_caminho_snapshot(tipo, argumentos.destino)[0]}")
@@ -3,12 +3,138 @@ import numpy as np
 import streamlit as st
 from datetime import datetime
 import plotly.express as px
-
-def renderizar_pagina_compras(df):
-
-    df['data entrega prevista'] = pd.to_datetime(df['data entrega prevista'], errors='coerce')
-    df['data entrada'] = pd.to_datetime(df['data entrada'], errors='coerce')
-    df['data emissao'] = pd.to_datetime(df['data emissao'], format='%d/%m/%Y', errors='coerce')
+from cache_resultados import CACHE_RESULTADOS
+from calculos import calcular_metricas_compras, consultar_snapshot
+from consultas import metricas_compras
+from dados import concatenar
+from exportacao import TAMANHO_LOTE_EXPORTACAO, botoes_exportacao, lotes_dataframe
+from formatacao import SEPARADORES_PT_BR, TEMPLATE_MOEDA_Y, formatar_moeda_serie
+from medicao import depuracao_ativa, fase, medir_rodada
+from paralelo import exibir_em_ordem
+
+# Colunas lidas do Parquet particionado quando o histórico não cabe em memória: as dos cartões
+# e gráficos filtrados e as do comparativo de preços
+COLUNAS_FILTRADAS = ['numeropedido', 'fornecedor', 'usuario', 'situacao pedido', 'status pedido', 'tipo fornecedor',
+                     'qtd pedido item', 'valor liquido item', 'mes', 'ano']
+COLUNAS_COMPARATIVO = ['descricao produto', 'preco unitario liquido item', 'qtd pedido item', 'mes', 'ano']
+
+MESES_ABREVIADOS = {
+    1: 'Jan', 2: 'Fev', 3: 'Mar', 4: 'Abr', 5: 'Mai', 6: 'Jun',
+    7: 'Jul', 8: 'Ago', 9: 'Set', 10: 'Out', 11: 'Nov', 12: 'Dez'
+}
+
+def filtros_para_leitura(ano='todos', mes='todos', usuario='todos', situacao='todos', tipo_fornecedor='todos'):
+    # Mesma regra do aplicar_filtros: 'todos' no ano significa o ano atual
+    filtros = {'ano': datetime.now().year if ano == 'todos' else int(ano)}
+    meses_abv_para_num = {v: k for k, v in MESES_ABREVIADOS.items()}
+    if mes in meses_abv_para_num:
+        filtros['mes'] = meses_abv_para_num[mes]
+    elif isinstance(mes, int):
+        filtros['mes'] = mes
+    if usuario != 'todos':
+        filtros['usuario'] = usuario
+    if situacao != 'todos':
+        filtros['situacao pedido'] = situacao
+    if tipo_fornecedor != 'todos':
+        filtros['tipo fornecedor'] = tipo_fornecedor
+    return filtros
+
+def rotulo_periodo(periodo):
+    # Períodos são inteiros ano * 100 + mes (ex.: 202503 -> '3/2025')
+    return f"{periodo % 100}/{periodo // 100}"
+
+def periodo_anterior(periodo):
+    ano, mes = divmod(periodo, 100)
+    return (ano - 1) * 100 + 12 if mes == 1 else periodo - 1
+
+def chave_periodo(df):
+    # 'ano' é Int16 no esquema de leitura: ano * 100 estouraria sem passar para Int32 antes
+    return df['ano'].astype('Int32') * 100 + df['mes']
+
+def precos_e_quantidades_por_mes(df, periodos):
+    """Preço unitário líquido médio e quantidade comprada por produto em cada período, numa única agregação.
+
+    Retorna duas tabelas (produto x período): preços e quantidades, com 0 onde não houve compra.
+    """
+    chave = chave_periodo(df).rename('periodo')
+    selecao = chave.isin(periodos)
+    agregado = df[selecao].groupby(['descricao produto', chave[selecao]], observed=True).agg(
+        preco=('preco unitario liquido item', 'mean'),
+        quantidade=('qtd pedido item', 'sum'),
+    )
+    largo = agregado.unstack('periodo').reindex(
+        columns=pd.MultiIndex.from_product([['preco', 'quantidade'], periodos])
+    ).fillna(0)
+    return largo['preco'], largo['quantidade']
+
+def variacao_percentual(preco_anterior, preco_atual):
+    # Sem preço em um dos meses a variação é 0, como no cálculo linha a linha anterior
+    preco_anterior = np.asarray(preco_anterior, dtype='float64')
+    preco_atual = np.asarray(preco_atual, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variacao = (preco_atual - preco_anterior) / preco_anterior * 100
+    return np.where((preco_anterior == 0) | (preco_atual == 0), 0.0, variacao)
+
+def montar_comparativo_precos(df, periodos):
+    """Quantidade e preço de cada período lado a lado, com a variação do primeiro para o último."""
+    precos, quantidades = precos_e_quantidades_por_mes(df, periodos)
+
+    df_comparativo = pd.DataFrame(index=precos.index)
+    for periodo in periodos:
+        df_comparativo[f'Quantidade {rotulo_periodo(periodo)}'] = quantidades[periodo].astype(int)
+    for periodo in periodos:
+        df_comparativo[f'Preço Unitário {rotulo_periodo(periodo)}'] = precos[periodo]
+    df_comparativo['Variação Preço Unitário (%)'] = variacao_percentual(precos[periodos[0]], precos[periodos[-1]])
+
+    return df_comparativo.reset_index()
+
+# --- Visão materializada dos pedidos pendentes ---
+
+COLUNAS_PENDENTES = ['numeropedido', 'status pedido', 'data emissao', 'data entrega prevista', 'data entrada',
+                     'fornecedor', 'descricao produto', 'total itens', 'valor liquido item']
+
+def _itens_pendentes(df):
+    # Todas as linhas pendentes, como a listagem original: o arquivo pode ter mais de uma linha
+    # por pedido e produto, e cada uma entra nos totais
+    pendentes = df.loc[df['situacao pedido'] == 'pendente', COLUNAS_PENDENTES]
+    return pendentes.assign(**{
+        'prazo entrega (dias)': (pendentes['data entrega prevista'] - pendentes['data emissao']).dt.days
+    })
+
+def _resumir_fornecedores(itens):
+    return itens.groupby('fornecedor', observed=True).agg(
+        pedidos=('numeropedido', 'nunique'),
+        itens=('numeropedido', 'size'),
+        valor=('valor liquido item', 'sum'),
+        entrega_mais_antiga=('data entrega prevista', 'min'),
+    ).reset_index().sort_values('valor', ascending=False, ignore_index=True)
+
+def construir_pendentes(df):
+    """Itens de pedidos pendentes com o prazo de entrega, e o resumo por fornecedor.
+
+    Montada uma vez por versão do arquivo (dados.carregar_derivado); os dias de atraso
+    dependem da data de hoje e são calculados na exibição.
+    """
+    itens = _itens_pendentes(df).reset_index(drop=True)
+    return {'itens': itens, 'fornecedores': _resumir_fornecedores(itens)}
+
+def pendentes_das_particoes(particoes):
+    """Mesma visão de construir_pendentes, lida do Parquet particionado: só as linhas pendentes e as colunas da listagem."""
+    return construir_pendentes(particoes.ler({'situacao pedido': 'pendente'}, COLUNAS_PENDENTES + ['situacao pedido']))
+
+def atualizar_pendentes(pendentes, delta, df=None):
+    """Incorpora linhas novas: as pendentes do `delta` entram depois das já listadas, como na montagem completa."""
+    if delta.empty:
+        return pendentes
+    itens = concatenar([pendentes['itens'], _itens_pendentes(delta)])
+    return {'itens': itens, 'fornecedores': _resumir_fornecedores(itens)}
+
+def renderizar_pagina_compras(df, indice=None, pendentes=None, snapshot=None, consultas=None,
+                              versao=None, particoes=None):
+
+    # As colunas de data já chegam como datetime64, convertidas uma única vez na carga (dados.ler_compras).
+    # df é None quando o histórico passa do teto de memória: cada parte da página lê então do
+    # Parquet particionado (dados.Particoes) só as partições e colunas que os filtros pedem
 
     def formatar_moeda(valor, simbolo_moeda='R$'):
         try:
@@ -17,215 +143,265 @@ def renderizar_pagina_compras(df):
         except (ValueError, TypeError):
             return f"{simbolo_moeda} 0,00"
 
-    def aplicar_filtros(df, ano='todos', mes='todos', usuario='todos', situacao='todos', tipo_fornecedor='todos'):
-        df_filtrado = df.copy()
-        ano_atual = datetime.now().year
-        meses_abreviados_num_para_abv = {
-            1: 'Jan', 2: 'Fev', 3: 'Mar', 4: 'Abr', 5: 'Mai', 6: 'Jun',
-            7: 'Jul', 8: 'Ago', 9: 'Set', 10: 'Out', 11: 'Nov', 12: 'Dez'
-        }
-        meses_abreviados_abv_para_num = {v: k for k, v in meses_abreviados_num_para_abv.items()}
-
-        if ano == 'todos':
-            df_filtrado = df_filtrado[df_filtrado['ano'] == ano_atual]
-        elif ano != 'todos':
-            df_filtrado = df_filtrado[df_filtrado['ano'] == int(ano)]
-
-        if mes == 'todos':
-            df_filtrado['mes_nome'] = df_filtrado['mes'].map(meses_abreviados_num_para_abv)
-        elif mes != 'todos':
-            if mes in meses_abreviados_abv_para_num:
-                df_filtrado = df_filtrado[df_filtrado['mes'] == meses_abreviados_abv_para_num[mes]]
-                df_filtrado['mes_nome'] = mes
-            elif isinstance(mes, int):
-                df_filtrado = df_filtrado[df_filtrado['mes'] == mes]
-                df_filtrado['mes_nome'] = meses_abreviados_num_para_abv.get(mes)
-            else:
-                df_filtrado['mes_nome'] = None  
-
-        if usuario != 'todos':
-            df_filtrado = df_filtrado[df_filtrado['usuario'] == usuario]
+    def aplicar_filtros(df, ano='todos', mes='todos', usuario='todos', situacao='todos', tipo_fornecedor='todos', indice=None):
+        filtros = filtros_para_leitura(ano, mes, usuario, situacao, tipo_fornecedor)
 
-        if situacao != 'todos':
-            df_filtrado = df_filtrado[df_filtrado['situacao pedido'] == situacao]
+        if indice is not None:
+            # Índice montado na carga: interseção das linhas de cada valor, sem máscaras sobre o df inteiro
+            return indice.filtrar(filtros)
 
-        if tipo_fornecedor != 'todos':
-            df_filtrado = df_filtrado[df_filtrado['tipo fornecedor'] == tipo_fornecedor]
-
-        return df_filtrado
+        mascara = pd.Series(True, index=df.index)
+        for coluna, valor in filtros.items():
+            mascara &= df[coluna] == valor
+        return df[mascara]
 
     ano_atual = datetime.now().year
     meses_abreviados_num_para_abv = {
         1: 'Jan', 2: 'Fev', 3: 'Mar', 4: 'Abr', 5: 'Mai', 6: 'Jun',
         7: 'Jul', 8: 'Ago', 9: 'Set', 10: 'Out', 11: 'Nov', 12: 'Dez'
     }
-    meses_ano_atual_numericos = sorted(list(df[df['ano'] == ano_atual]['mes'].unique()))
+    if df is not None:
+        meses_ano_atual_numericos = sorted(list(df[df['ano'] == ano_atual]['mes'].unique()))
+    else:
+        meses_ano_atual_numericos = sorted(particoes.distintos(['mes'], {'ano': ano_atual})['mes'].dropna().tolist())
     meses_ano_atual_nomes = ['todos'] + [meses_abreviados_num_para_abv[mes] for mes in meses_ano_atual_numericos]
 
-    col1, col2, col3, col4, col5 = st.columns(5)
-    with col1:
-        anos_unicos = ['todos'] + sorted(list(df['ano'].unique()))
-        index_ano_atual = anos_unicos.index(ano_atual) if ano_atual in anos_unicos else 0
-        ano = st.selectbox("Ano", anos_unicos, index=index_ano_atual)
-    with col2:
-        mes = st.selectbox("Mês", meses_ano_atual_nomes)
-    with col3:
-        usuario = st.selectbox("Usuário", ['todos'] + sorted(list(df['usuario'].unique())))
-    with col4:
-        situacao = st.selectbox("Situação", ['todos'] + sorted(list(df['situacao pedido'].unique())))
-    with col5:
-        tipo_fornecedor = st.selectbox("Tipo de Fornecedor", ['todos'] + sorted(list(df['tipo fornecedor'].unique())))
-
-    df_filtrado = aplicar_filtros(df, ano, mes, usuario, situacao, tipo_fornecedor)
-
-    def calcular_metricas(df):
-        qunatidade_total_pedidos = df['numeropedido'].nunique()
-        valor_total_pedidos = df['valor liquido item'].sum()
-        quantidade_total_itens = df['qtd pedido item'].sum()
-        quantidade_pedidos_entregues = df[df['situacao pedido'] == 'fechado pedido chegou']['numeropedido'].nunique()
-        quantidade_pedidos_pendentes = df[df['situacao pedido'] == 'pendente']['numeropedido'].nunique()
-        return qunatidade_total_pedidos, valor_total_pedidos, quantidade_total_itens, quantidade_pedidos_entregues, quantidade_pedidos_pendentes
-
-    def card_style(metric_name, value, color="#FFFFFF", bg_color="#262730"):
-        return f"""
-        <div style="
-            padding: 3px;
-            border-radius: 5px;
-            background-color: {bg_color};
-            color: {color};
-            text-align: center;
-            box-shadow: 1px px 5px rgba(0,0,0,0.2);
-        ">
-            <h4 style="margin: 0; font-size: 22px;">{metric_name}</h4>
-            <h2 style="margin: 5px 0; font-size: 22px;">{value}</h2>
-        </div>
-        """
-
-    qtd_total_pedidos, valor_total, qtd_total_itens, qtd_entregues, qtd_pendentes = calcular_metricas(df_filtrado)
-
-    col1_metricas, col2_metricas, col3_metricas, col4_metricas, col5_metricas = st.columns([1, 1, 1, 1, 1])
-
-    with col1_metricas:
-        st.markdown(card_style("QTD Pedidos", qtd_total_pedidos), unsafe_allow_html=True)
-
-    with col2_metricas:
-        st.markdown(card_style("Valor Total", formatar_moeda(valor_total)), unsafe_allow_html=True)
-
-    with col3_metricas:
-        st.markdown(card_style("QTD Itens", qtd_total_itens), unsafe_allow_html=True)
-
-    with col4_metricas:
-        st.markdown(card_style("Pedidos Recebidos", qtd_entregues), unsafe_allow_html=True)
-
-    with col5_metricas:
-        st.markdown(card_style("Pedidos Pendentes", qtd_pendentes), unsafe_allow_html=True)
-
-    st.markdown("---")
-
-    # --- GRÁFICOS ---
-
-    # Gráfico de Distribuição de Status dos Pedidos
-    status_counts = df_filtrado['status pedido'].value_counts().reset_index()
-    status_counts.columns = ['status pedido', 'quantidade']
-    fig_status = px.pie(status_counts, names='status pedido', values='quantidade',
-                        title='<b>Distribuição de Status dos Pedidos</b>')
-    st.plotly_chart(fig_status, use_container_width=True)
-
-    # Gráfico de Valor Total dos Pedidos por Mês 
-    if not df_filtrado.empty:
-        valor_por_mes = df_filtrado.groupby(['ano', 'mes_nome'])['valor liquido item'].sum().reset_index()
-        valor_por_mes.rename(columns={'mes_nome': 'mes'}, inplace=True) 
-        meses_ordenados = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
-        valor_por_mes['mes_ordenado'] = pd.Categorical(valor_por_mes['mes'], categories=meses_ordenados, ordered=True)
-        valor_por_mes = valor_por_mes.sort_values('mes_ordenado')
-        valor_por_mes['valor_formatado'] = valor_por_mes['valor liquido item'].apply(formatar_moeda)
-        fig_valor_mes = px.bar(valor_por_mes, x='mes', y='valor liquido item',
-                                labels={'valor liquido item': 'Valor Total', 'mes': 'Mês'},
-                                title='<b>Valor Total dos Pedidos por Mês (Filtrado)</b>',
-                                text='valor_formatado',
-                                hover_data={'valor liquido item': ':.2f', 'mes': True},
-                                height=900, width=1100)
-        fig_valor_mes.update_traces(textposition='outside', textfont_size=28)
-        st.plotly_chart(fig_valor_mes, use_container_width=True)
-    else:
-        st.info("Não há dados para exibir o gráfico de valor por mês com os filtros aplicados.")
-
-    st.markdown("---")
-
-    # Gráfico de Top 10 Fornecedores por Valor Total
-    top_10_fornecedores_graf = df_filtrado.groupby('fornecedor')['valor liquido item'].sum().nlargest(10).reset_index()
-    top_10_fornecedores_graf['valor_formatado'] = top_10_fornecedores_graf['valor liquido item'].apply(formatar_moeda)
-    fig_top_fornecedores = px.bar(top_10_fornecedores_graf, x='fornecedor', y='valor liquido item',
-                                    labels={'valor liquido item': 'Valor Total', 'fornecedor': 'Fornecedor'},
-                                    title='<b>Top 10 Fornecedores por Valor Total</b>',
-                                    text='valor_formatado',
-                                    hover_data={'valor liquido item': ':.2f', 'fornecedor': True},
+    def opcoes(coluna):
+        if indice is not None:
+            valores = indice.valores(coluna)
+        elif df is not None:
+            valores = df[coluna].unique()
+        else:
+            valores = particoes.distintos([coluna])[coluna].dropna()
+        return sorted(list(valores))
+
+    # Filtros, cartões e gráficos formam uma seção independente: mudar um filtro
+    # reexecuta só esta parte, não a lista de pendentes nem o comparativo de preços
+    def medicao_ligada():
+        return depuracao_ativa(st.session_state)
+
+    @st.fragment
+    @medir_rodada("Compras: filtros", medicao_ligada)
+    def secao_filtrada():
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            anos_unicos = ['todos'] + opcoes('ano')
+            index_ano_atual = anos_unicos.index(ano_atual) if ano_atual in anos_unicos else 0
+            ano = st.selectbox("Ano", anos_unicos, index=index_ano_atual)
+        with col2:
+            mes = st.selectbox("Mês", meses_ano_atual_nomes)
+        with col3:
+            usuario = st.selectbox("Usuário", ['todos'] + opcoes('usuario'))
+        with col4:
+            situacao = st.selectbox("Situação", ['todos'] + opcoes('situacao pedido'))
+        with col5:
+            tipo_fornecedor = st.selectbox("Tipo de Fornecedor", ['todos'] + opcoes('tipo fornecedor'))
+
+        filtros = filtros_para_leitura(ano, mes, usuario, situacao, tipo_fornecedor)
+
+        # Combinações já exibidas saem do cache com métricas e figuras prontas, sem filtrar nem agregar
+        chave_cache = (versao, "Compras", tuple(filtros.items())) if versao is not None else None
+        em_cache = CACHE_RESULTADOS.obter(chave_cache) if chave_cache is not None else None
+        resultados = em_cache[1] if em_cache is not None else None
+
+        # No backend SQL os cartões e gráficos saem de consultas agregadas e o df não é filtrado
+        if consultas is None and em_cache is None and df is None:
+            # Os filtros vão para a leitura: partições de outros anos e meses nem são abertas
+            df_filtrado = particoes.ler(filtros, COLUNAS_FILTRADAS)
+        elif consultas is None and em_cache is None:
+            with fase("aplicar_filtros", len(df)) as medida:
+                df_filtrado = aplicar_filtros(df, ano, mes, usuario, situacao, tipo_fornecedor, indice=indice)
+                medida.linhas(len(df_filtrado))
+
+        def card_style(metric_name, value, color="#FFFFFF", bg_color="#262730"):
+            return f"""
+            <div style="
+                padding: 3px;
+                border-radius: 5px;
+                background-color: {bg_color};
+                color: {color};
+                text-align: center;
+                box-shadow: 1px px 5px rgba(0,0,0,0.2);
+            ">
+                <h4 style="margin: 0; font-size: 22px;">{metric_name}</h4>
+                <h2 style="margin: 5px 0; font-size: 22px;">{value}</h2>
+            </div>
+            """
+
+        # Cartões servidos pelo snapshot pré-calculado (python calculos.py) quando ele é da versão atual do CSV
+        metricas = em_cache[0] if em_cache is not None else consultar_snapshot(snapshot, "compras", filtros)
+        if metricas is None:
+            with fase("métricas"):
+                metricas = metricas_compras(consultas, filtros) if consultas is not None else calcular_metricas_compras(df_filtrado)
+        qtd_total_pedidos, valor_total, qtd_total_itens, qtd_entregues, qtd_pendentes = metricas
+
+        col1_metricas, col2_metricas, col3_metricas, col4_metricas, col5_metricas = st.columns([1, 1, 1, 1, 1])
+
+        with col1_metricas:
+            st.markdown(card_style("QTD Pedidos", qtd_total_pedidos), unsafe_allow_html=True)
+
+        with col2_metricas:
+            st.markdown(card_style("Valor Total", formatar_moeda(valor_total)), unsafe_allow_html=True)
+
+        with col3_metricas:
+            st.markdown(card_style("QTD Itens", qtd_total_itens), unsafe_allow_html=True)
+
+        with col4_metricas:
+            st.markdown(card_style("Pedidos Recebidos", qtd_entregues), unsafe_allow_html=True)
+
+        with col5_metricas:
+            st.markdown(card_style("Pedidos Pendentes", qtd_pendentes), unsafe_allow_html=True)
+
+        # Linhas por trás dos cartões; só são filtradas (ou consultadas) quando o usuário exporta
+        if consultas is not None:
+            botoes_exportacao(lambda: consultas.lotes(filtros, TAMANHO_LOTE_EXPORTACAO), "compras_filtradas", "exportar_compras")
+        elif df is not None:
+            botoes_exportacao(lambda: lotes_dataframe(aplicar_filtros(df, ano, mes, usuario, situacao, tipo_fornecedor, indice=indice)),
+                              "compras_filtradas", "exportar_compras")
+        else:
+            botoes_exportacao(lambda: particoes.lotes(filtros, TAMANHO_LOTE_EXPORTACAO), "compras_filtradas", "exportar_compras")
+
+        st.markdown("---")
+
+        # --- GRÁFICOS ---
+
+        # Gráfico de Distribuição de Status dos Pedidos
+        def contar_status(df):
+            # Em colunas category o value_counts lista também os status sem pedidos
+            status_counts = df['status pedido'].value_counts().loc[lambda contagem: contagem > 0].reset_index()
+            status_counts.columns = ['status pedido', 'quantidade']
+            return status_counts
+
+        def criar_grafico_status(status_counts):
+            return px.pie(status_counts, names='status pedido', values='quantidade',
+                          title='<b>Distribuição de Status dos Pedidos</b>')
+
+        # Gráfico de Valor Total dos Pedidos por Mês 
+        def somar_valor_por_mes(df):
+            return ordenar_por_mes(df.groupby(['ano', 'mes'])['valor liquido item'].sum().reset_index())
+
+        def ordenar_por_mes(valor_por_mes):
+            if valor_por_mes.empty:
+                return None
+            valor_por_mes['mes'] = valor_por_mes['mes'].map(MESES_ABREVIADOS)
+            meses_ordenados = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+            valor_por_mes['mes_ordenado'] = pd.Categorical(valor_por_mes['mes'], categories=meses_ordenados, ordered=True)
+            return valor_por_mes.sort_values('mes_ordenado')
+
+        def criar_grafico_valor_mes(valor_por_mes):
+            if valor_por_mes is None:
+                return None
+            fig_valor_mes = px.bar(valor_por_mes, x='mes', y='valor liquido item',
+                                    labels={'valor liquido item': 'Valor Total', 'mes': 'Mês'},
+                                    title='<b>Valor Total dos Pedidos por Mês (Filtrado)</b>',
+                                    hover_data={'valor liquido item': ':,.2f', 'mes': True},
                                     height=900, width=1100)
-    fig_top_fornecedores.update_traces(textposition='outside', textfont_size=28)
-    st.plotly_chart(fig_top_fornecedores, use_container_width=True)
+            fig_valor_mes.update_traces(texttemplate=TEMPLATE_MOEDA_Y, textposition='outside', textfont_size=28)
+            fig_valor_mes.update_layout(separators=SEPARADORES_PT_BR)
+            return fig_valor_mes
+
+        def exibir_valor_mes(fig_valor_mes):
+            if fig_valor_mes is not None:
+                st.plotly_chart(fig_valor_mes, use_container_width=True)
+            else:
+                st.info("Não há dados para exibir o gráfico de valor por mês com os filtros aplicados.")
+            st.markdown("---")
+
+        # Gráfico de Top 10 Fornecedores por Valor Total
+        def criar_grafico_top_fornecedores(top_10_fornecedores_graf):
+            fig_top_fornecedores = px.bar(top_10_fornecedores_graf, x='fornecedor', y='valor liquido item',
+                                            labels={'valor liquido item': 'Valor Total', 'fornecedor': 'Fornecedor'},
+                                            title='<b>Top 10 Fornecedores por Valor Total</b>',
+                                            hover_data={'valor liquido item': ':,.2f', 'fornecedor': True},
+                                            height=900, width=1100)
+            fig_top_fornecedores.update_traces(texttemplate=TEMPLATE_MOEDA_Y, textposition='outside', textfont_size=28)
+            fig_top_fornecedores.update_layout(separators=SEPARADORES_PT_BR)
+            return fig_top_fornecedores
+
+        def exibir_grafico(fig):
+            st.plotly_chart(fig, use_container_width=True)
+
+        if consultas is not None:
+            # Uma consulta por gráfico, já agregada, ordenada e cortada no motor
+            dados_status = lambda: consultas.somar_por(filtros, ['status pedido'], [], contar='quantidade', ordenar='quantidade')
+            dados_valor_mes = lambda: ordenar_por_mes(consultas.somar_por(filtros, ['ano', 'mes'], ['valor liquido item']))
+            dados_fornecedores = lambda: consultas.somar_por(filtros, ['fornecedor'], ['valor liquido item'],
+                                                             ordenar='valor liquido item', limite=10)
+        else:
+            dados_status = lambda: contar_status(df_filtrado)
+            dados_valor_mes = lambda: somar_valor_por_mes(df_filtrado)
+            dados_fornecedores = lambda: df_filtrado.groupby('fornecedor', observed=True)['valor liquido item'].sum().nlargest(10).reset_index()
+
+        # Só as agregações dos três gráficos rodam em paralelo; as figuras são montadas e exibidas em ordem
+        resultados = exibir_em_ordem([
+            (dados_status, criar_grafico_status, exibir_grafico),
+            (dados_valor_mes, criar_grafico_valor_mes, exibir_valor_mes),
+            (dados_fornecedores, criar_grafico_top_fornecedores, exibir_grafico),
+        ], resultados)
+        if chave_cache is not None and em_cache is None:
+            CACHE_RESULTADOS.guardar(chave_cache, (metricas, resultados))
 
-    st.markdown("---")
+        st.markdown("---")
 
+    secao_filtrada()
 
-    def listar_pedidos_pendentes_detalhado(df):
-        pedidos_pendentes = df[df['situacao pedido'] == 'pendente'].copy()
+
+    def listar_pedidos_pendentes_detalhado(pendentes):
+        # Tudo sai da visão materializada (só os itens pendentes), sem varrer o dataset
+        pedidos_pendentes = pendentes['itens']
         pedidos_unicos = pedidos_pendentes['numeropedido'].nunique()
         if pedidos_unicos > 0:
             st.warning(f"⚠️ Atenção! {pedidos_unicos} pedidos estão com entrega pendente:")
         if not pedidos_pendentes.empty:
             st.subheader("Pedidos Pendentes")
-            colunas_exibir_originais = ['numeropedido', 'status pedido', 'data emissao', 'data entrega prevista', 'data entrada', 'fornecedor', 'descricao produto', 'total itens', 'valor liquido item']
-            pedidos_pendentes_exibir = pedidos_pendentes[colunas_exibir_originais].copy()
 
-            # Converter as colunas de data para datetime
+            # Datas que não puderam ser convertidas na carga ficam como NaT
             for col in ['data emissao', 'data entrega prevista']:
-                if col in pedidos_pendentes_exibir.columns:
-                    pedidos_pendentes_exibir[col] = pd.to_datetime(pedidos_pendentes_exibir[col], format='%d/%m/%Y', errors='coerce')
-                    nao_datetime = pedidos_pendentes_exibir[pd.isna(pedidos_pendentes_exibir[col])]
-                    if not nao_datetime.empty:
-                        st.warning(f"⚠️ Atenção! Alguns valores na coluna '{col}' não puderam ser convertidos para data. Verifique os dados.")
-                        st.dataframe(nao_datetime[[col]])
-
-            # Calcular o prazo de entrega em dias
-            if 'data emissao' in pedidos_pendentes_exibir.columns and 'data entrega prevista' in pedidos_pendentes_exibir.columns:
-                pedidos_pendentes_exibir['prazo entrega (dias)'] = (pedidos_pendentes_exibir['data entrega prevista'] - pedidos_pendentes_exibir['data emissao']).dt.days
-                colunas_exibir = colunas_exibir_originais + ['prazo entrega (dias)']
-            else:
-                st.error("Erro: As colunas de data não foram convertidas corretamente. O cálculo do prazo de entrega não será realizado.")
-                colunas_exibir = colunas_exibir_originais
+                nao_datetime = pedidos_pendentes[pd.isna(pedidos_pendentes[col])]
+                if not nao_datetime.empty:
+                    st.warning(f"⚠️ Atenção! Alguns valores na coluna '{col}' não puderam ser convertidos para data. Verifique os dados.")
+                    st.dataframe(nao_datetime[[col]])
 
-            # 👉 Calcular o total antes de formatar os valores
-            total_valor_liquido = pedidos_pendentes_exibir['valor liquido item'].sum()
+            hoje = pd.Timestamp.today().normalize()
+            pedidos_pendentes_exibir = pedidos_pendentes[COLUNAS_PENDENTES + ['prazo entrega (dias)']].assign(**{
+                'dias em atraso': (hoje - pedidos_pendentes['data entrega prevista']).dt.days.clip(lower=0),
+            })
 
             # Formatar colunas para exibição
-            pedidos_pendentes_exibir_formatado = pedidos_pendentes_exibir[colunas_exibir].copy()
-            for col in ['data emissao', 'data entrega prevista']:
-                if col in pedidos_pendentes_exibir_formatado.columns and pd.api.types.is_datetime64_any_dtype(pedidos_pendentes_exibir_formatado[col]):
-                    pedidos_pendentes_exibir_formatado[col] = pedidos_pendentes_exibir_formatado[col].dt.strftime('%d/%m/%Y')
-
-            pedidos_pendentes_exibir_formatado['valor liquido item'] = pedidos_pendentes_exibir_formatado['valor liquido item'].apply(
-                lambda x: f'R$ {x:,.2f}'.replace(",", "X").replace(".", ",").replace("X", ".")
-            )
+            total_valor_liquido = pedidos_pendentes_exibir['valor liquido item'].sum()
+            pedidos_pendentes_exibir_formatado = pedidos_pendentes_exibir.assign(**{
+                'data emissao': pedidos_pendentes_exibir['data emissao'].dt.strftime('%d/%m/%Y'),
+                'data entrega prevista': pedidos_pendentes_exibir['data entrega prevista'].dt.strftime('%d/%m/%Y'),
+                'valor liquido item': formatar_moeda_serie(pedidos_pendentes_exibir['valor liquido item']),
+            })
 
             st.dataframe(pedidos_pendentes_exibir_formatado)
+            botoes_exportacao(lambda: lotes_dataframe(pedidos_pendentes_exibir), "pedidos_pendentes", "exportar_pendentes")
 
             # Exibir total formatado
             st.info(f"Valor Total dos Pedidos Pendentes: {formatar_moeda(total_valor_liquido)}")
 
+            st.subheader("Pendências por Fornecedor")
+            fornecedores = pendentes['fornecedores']
+            st.dataframe(pd.DataFrame({
+                'Fornecedor': fornecedores['fornecedor'],
+                'Pedidos': fornecedores['pedidos'],
+                'Itens': fornecedores['itens'],
+                'Valor Pendente': formatar_moeda_serie(fornecedores['valor']),
+                'Maior Atraso (dias)': (hoje - fornecedores['entrega_mais_antiga']).dt.days.clip(lower=0),
+            }), hide_index=True)
+
         else:
             st.info("Não há pedidos com entrega pendente.")
 
-    listar_pedidos_pendentes_detalhado(df)
+    if pendentes is None:
+        with fase("pedidos pendentes: visão"):
+            pendentes = construir_pendentes(df) if df is not None else pendentes_das_particoes(particoes)
+    with fase("pedidos pendentes: exibição", len(pendentes['itens'])):
+        listar_pedidos_pendentes_detalhado(pendentes)
 
 
 
-    def calcular_variacao_percentual(row, preco_anterior_col, preco_atual_col):
-        preco_anterior = row[preco_anterior_col]
-        preco_atual = row[preco_atual_col]
-        if preco_anterior == 0 or preco_atual == 0:
-            return 0.0
-        return ((preco_atual - preco_anterior) / preco_anterior) * 100
-
     def aplicar_cor(val):
         if isinstance(val, (int, float)):
             if val < 0:
@@ -237,81 +413,79 @@ def renderizar_pagina_compras(df):
             return f'color: {color}'
         return ''
 
-    if not df.empty:
-        ano_atual = df['ano'].max()
-        mes_atual = df[df['ano'] == ano_atual]['mes'].max()
-
-        ano_anterior = ano_atual
-        mes_anterior = mes_atual - 1
-        if mes_anterior < 1:
-            mes_anterior = 12
-            ano_anterior -= 1
-
-        df_atual = df[(df['ano'] == ano_atual) & (df['mes'] == mes_atual)]
-        df_anterior = df[(df['ano'] == ano_anterior) & (df['mes'] == mes_anterior)]
-
-        # Agrupar e obter a média do preço unitário e a soma da quantidade de cada produto no mês anterior
-        preco_anterior = df_anterior.groupby('descricao produto')['preco unitario liquido item'].mean().reset_index()
-        preco_anterior.rename(columns={'preco unitario liquido item': f'Preço Unitário {mes_anterior}/{ano_anterior}'}, inplace=True)
-        quantidade_anterior = df_anterior.groupby('descricao produto')['qtd pedido item'].sum().reset_index()
-        quantidade_anterior.rename(columns={'qtd pedido item': f'Quantidade {mes_anterior}/{ano_anterior}'}, inplace=True)
-
-        # Agrupar e obter a média do preço unitário e a soma da quantidade de cada produto no mês atual
-        preco_atual = df_atual.groupby('descricao produto')['preco unitario liquido item'].mean().reset_index()
-        preco_atual.rename(columns={'preco unitario liquido item': f'Preço Unitário {mes_atual}/{ano_atual}'}, inplace=True)
-        quantidade_atual = df_atual.groupby('descricao produto')['qtd pedido item'].sum().reset_index()
-        quantidade_atual.rename(columns={'qtd pedido item': f'Quantidade {mes_atual}/{ano_atual}'}, inplace=True)
-
-        # Merge dos DataFrames para ter a quantidade e o preço dos dois meses lado a lado
-        df_comparativo = pd.merge(quantidade_anterior, quantidade_atual, on='descricao produto', how='outer').fillna(0)
-        df_comparativo = pd.merge(df_comparativo, preco_anterior, on='descricao produto', how='left').fillna(0)
-        df_comparativo = pd.merge(df_comparativo, preco_atual, on='descricao produto', how='left').fillna(0)
-
-        # Calcular a variação percentual
-        coluna_preco_anterior = f'Preço Unitário {mes_anterior}/{ano_anterior}'
-        coluna_preco_atual = f'Preço Unitário {mes_atual}/{ano_atual}'
-
-        if coluna_preco_anterior in df_comparativo.columns and coluna_preco_atual in df_comparativo.columns:
-            df_comparativo['Variação Preço Unitário (%)'] = df_comparativo.apply(
-                lambda row: calcular_variacao_percentual(row, coluna_preco_anterior, coluna_preco_atual),
-                axis=1
-            )
-
-            # Formatar as colunas de preço
-            df_comparativo[coluna_preco_anterior] = df_comparativo[coluna_preco_anterior].apply(formatar_moeda)
-            df_comparativo[coluna_preco_atual] = df_comparativo[coluna_preco_atual].apply(formatar_moeda)
-
-            # Criar o filtro de variação percentual
-            filtro_percentual = st.radio(
-                "Filtrar Variação de Preço:",
-                ["Todos", "Positivos", "Negativos"],
-                horizontal=True
-            )
-
-            df_filtrado = df_comparativo.copy()
-            if filtro_percentual == "Negativos":
-                df_filtrado = df_filtrado[df_filtrado['Variação Preço Unitário (%)'] > 0]
-            elif filtro_percentual == "Positivos":
-                df_filtrado = df_filtrado[df_filtrado['Variação Preço Unitário (%)'] < 0]
-
-            # Aplicar formatação para remover casas decimais nas colunas de quantidade
-            coluna_quantidade_anterior = f'Quantidade {mes_anterior}/{ano_anterior}'
-            coluna_quantidade_atual = f'Quantidade {mes_atual}/{ano_atual}'
-            if coluna_quantidade_anterior in df_filtrado.columns:
-                df_filtrado[coluna_quantidade_anterior] = df_filtrado[coluna_quantidade_anterior].astype(int)
-            if coluna_quantidade_atual in df_filtrado.columns:
-                df_filtrado[coluna_quantidade_atual] = df_filtrado[coluna_quantidade_atual].astype(int)
-
-            # Aplicar estilo para colorir a coluna de variação NO DATAFRAME FILTRADO (ANTES da formatação para string)
-            df_styled = df_filtrado.style.applymap(aplicar_cor, subset=['Variação Preço Unitário (%)'])
-
-            # Formatar a coluna de variação percentual para exibição (DEPOIS da aplicação do estilo)
-            df_styled = df_styled.format({'Variação Preço Unitário (%)': '{:.2f}%'})
-
-            st.subheader(f"Comparativo de Produtos Comprados em {mes_anterior}/{ano_anterior} vs {mes_atual}/{ano_atual}:")
-            st.dataframe(df_styled)
+    # Seção independente: trocar o modo ou os meses reexecuta só o comparativo de preços
+    @st.fragment
+    @medir_rodada("Compras: comparativo de preços", medicao_ligada)
+    def secao_comparativo_precos():
+        fonte_periodos = df if df is not None else particoes.distintos(['ano', 'mes'])
+        periodos_disponiveis = sorted(chave_periodo(fonte_periodos).dropna().astype(int).unique().tolist())
+
+        if periodos_disponiveis:
+            modo_comparacao = st.radio("Comparar preços por:", ["Dois meses", "Janela móvel"], horizontal=True)
+
+            if modo_comparacao == "Dois meses":
+                # Padrão: último mês com compras vs o mês anterior do calendário (ou o anterior disponível)
+                periodo_atual = periodos_disponiveis[-1]
+                anteriores = [p for p in periodos_disponiveis if p <= periodo_anterior(periodo_atual)]
+                periodo_base = anteriores[-1] if anteriores else periodo_atual
+
+                col_base, col_comparado = st.columns(2)
+                with col_base:
+                    periodo_base = st.selectbox("Mês base", periodos_disponiveis, format_func=rotulo_periodo,
+                                                index=periodos_disponiveis.index(periodo_base))
+                with col_comparado:
+                    periodo_atual = st.selectbox("Mês comparado", periodos_disponiveis, format_func=rotulo_periodo,
+                                                 index=periodos_disponiveis.index(periodo_atual))
+                periodos = [periodo_base, periodo_atual]
+                titulo = f"Comparativo de Produtos Comprados em {rotulo_periodo(periodo_base)} vs {rotulo_periodo(periodo_atual)}:"
+            else:
+                tamanho_janela = st.slider("Meses na janela", min_value=1, max_value=len(periodos_disponiveis),
+                                           value=min(3, len(periodos_disponiveis)))
+                periodos = periodos_disponiveis[-tamanho_janela:]
+                titulo = f"Comparativo de Produtos Comprados de {rotulo_periodo(periodos[0])} a {rotulo_periodo(periodos[-1])}:"
+
+            if len(set(periodos)) < 2:
+                st.warning("Selecione dois meses diferentes para comparar os preços.")
+            else:
+                with fase("comparativo de preços") as medida:
+                    if df is not None:
+                        df_periodos = df
+                    else:
+                        # Só as partições dos anos e meses comparados; montar_comparativo_precos fica com os períodos exatos
+                        df_periodos = particoes.ler({'ano': sorted({p // 100 for p in periodos}),
+                                                     'mes': sorted({p % 100 for p in periodos})}, COLUNAS_COMPARATIVO)
+                    df_comparativo = montar_comparativo_precos(df_periodos, periodos)
+                    medida.linhas(len(df_comparativo))
+
+                # Criar o filtro de variação percentual
+                filtro_percentual = st.radio(
+                    "Filtrar Variação de Preço:",
+                    ["Todos", "Positivos", "Negativos"],
+                    horizontal=True
+                )
+
+                df_filtrado = df_comparativo
+                if filtro_percentual == "Negativos":
+                    df_filtrado = df_filtrado[df_filtrado['Variação Preço Unitário (%)'] > 0]
+                elif filtro_percentual == "Positivos":
+                    df_filtrado = df_filtrado[df_filtrado['Variação Preço Unitário (%)'] < 0]
+
+                # Formatar as colunas de preço só na cópia exibida; a exportação leva os valores numéricos
+                colunas_preco = [f'Preço Unitário {rotulo_periodo(p)}' for p in periodos]
+                df_numerico = df_filtrado
+                df_filtrado = df_filtrado.assign(**{coluna: formatar_moeda_serie(df_filtrado[coluna]) for coluna in colunas_preco})
+
+                # Aplicar estilo para colorir a coluna de variação NO DATAFRAME FILTRADO (ANTES da formatação para string)
+                df_styled = df_filtrado.style.map(aplicar_cor, subset=['Variação Preço Unitário (%)'])
+
+                # Formatar a coluna de variação percentual para exibição (DEPOIS da aplicação do estilo)
+                df_styled = df_styled.format({'Variação Preço Unitário (%)': '{:.2f}%'})
+
+                st.subheader(titulo)
+                st.dataframe(df_styled)
+                botoes_exportacao(lambda: lotes_dataframe(df_numerico), "comparativo_precos", "exportar_comparativo")
+
         else:
-            st.warning("Não foi possível encontrar as colunas de preço para comparação.")
+            st.info("Não há dados para análise de produtos com os filtros aplicados.")
 
-    else:
-        st.info("Não há dados para análise de produtos com os filtros aplicados.")
\ No newline at end of file
+    secao_comparativo_precos()
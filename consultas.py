@@ -0,0 +1,283 @@
+"""Backend opcional de consultas SQL (DuckDB) para os painéis de vendas e compras.
+
+Com BACKEND_CONSULTAS=duckdb, cada CSV é importado uma vez por versão para um banco DuckDB
+em DIRETORIO_CONSULTAS, e cada widget recebe o resultado de uma única consulta agregada
+(filtro + agrupamento + ordenação no motor) em vez de filtrar e agrupar o DataFrame inteiro
+no pandas. O motor usa no máximo LIMITE_MEMORIA_CONSULTAS e despeja em disco o que passar
+disso, então o tamanho do histórico não fica limitado pela memória do painel.
+"""
+import json
+import os
+import threading
+
+from dados import COLUNAS_DATA, ESQUEMAS, assinatura_arquivo
+from medicao import fase
+
+try:
+    import duckdb
+except ImportError:  # duckdb é opcional: sem ele as páginas continuam no pandas
+    duckdb = None
+
+
+BACKEND_CONSULTAS = os.environ.get("BACKEND_CONSULTAS", "pandas")
+DIRETORIO_CONSULTAS = "dados_duckdb"
+LIMITE_MEMORIA_CONSULTAS = os.environ.get("LIMITE_MEMORIA_CONSULTAS", "1GB")
+# Onde o DuckDB grava o que não cabe no limite de memória
+DIRETORIO_TEMPORARIO = os.path.join(DIRETORIO_CONSULTAS, "temporarios")
+
+# Tipo SQL de cada tipo do pandas em ESQUEMAS
+TIPOS_SQL = {
+    'category': 'VARCHAR',
+    'Int8': 'TINYINT',
+    'Int16': 'SMALLINT',
+    'Int32': 'INTEGER',
+    'float64': 'DOUBLE',
+}
+
+# Formatos tentados nas datas sem formato fixo (dia primeiro, como no normalizar_datas)
+FORMATOS_DATA_MISTOS = ['%d/%m/%Y', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S']
+
+MEDIDAS_VENDAS = ['Valor_Total_Item', 'Total_Custo_Compra', 'Total_Lucro_Venda_Item']
+# Vendedores fora do gráfico de metas (mesma regra de calcular_performance_vendedores)
+VENDEDORES_SEM_META = ['GERAL VENDAS', 'NATALIA SILVA', 'JORGE TOTE']
+
+# Conexão aberta por tipo: (diretório, tipo) -> (assinatura do CSV, Consultas)
+_CONEXOES = {}
+_TRAVA_CONEXOES = threading.Lock()
+
+
+def consultas_disponiveis():
+    return duckdb is not None
+
+
+def consultas_ativas():
+    return BACKEND_CONSULTAS == "duckdb" and duckdb is not None
+
+
+def _identificador(coluna):
+    # As colunas de compras têm espaços: toda coluna vai entre aspas duplas
+    return '"' + coluna.replace('"', '""') + '"'
+
+
+def _configuracao():
+    os.makedirs(DIRETORIO_TEMPORARIO, exist_ok=True)
+    # Sem preservar a ordem de inserção a importação de CSVs grandes também pode despejar em
+    # disco; as consultas ordenam explicitamente o que precisam
+    return {'memory_limit': LIMITE_MEMORIA_CONSULTAS, 'temp_directory': DIRETORIO_TEMPORARIO,
+            'preserve_insertion_order': False}
+
+
+def _caminho_origem(tipo, destino=DIRETORIO_CONSULTAS):
+    return os.path.join(destino, tipo + ".json")
+
+
+def _expressao_data(coluna, formato):
+    formatos = FORMATOS_DATA_MISTOS if formato is None else [formato]
+    lista = ", ".join("'" + f + "'" for f in formatos)
+    return f"try_strptime({_identificador(coluna)}, [{lista}]) AS {_identificador(coluna)}"
+
+
+def importar_csv(caminho_csv, tipo, destino=DIRETORIO_CONSULTAS):
+    """Importa o CSV para o banco DuckDB do tipo, com os tipos de ESQUEMAS e as datas convertidas.
+
+    O banco é gravado em um arquivo temporário deste processo e renomeado, como os snapshots;
+    conexões abertas no banco antigo continuam válidas até serem descartadas. Se outro
+    processo já gravou o banco da mesma versão, ele é reaproveitado.
+    """
+    if duckdb is None:
+        raise RuntimeError("duckdb não está instalado; não é possível importar o CSV.")
+
+    os.makedirs(destino, exist_ok=True)
+    assinatura = assinatura_arquivo(caminho_csv)
+    # Um arquivo por versão do CSV: o DuckDB mantém aberta a instância de cada caminho, então
+    # reimportar no mesmo caminho devolveria às novas conexões o banco antigo
+    caminho_banco = os.path.join(destino, f"{tipo}-{assinatura[1]}-{assinatura[2]}.duckdb")
+    caminho_origem = _caminho_origem(tipo, destino)
+
+    if not os.path.exists(caminho_banco):
+        _gravar_banco(caminho_csv, tipo, caminho_banco)
+
+    temporario = f"{caminho_origem}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump({'assinatura': list(assinatura), 'banco': os.path.basename(caminho_banco)}, arquivo)
+    os.replace(temporario, caminho_origem)
+
+    # Bancos de versões anteriores: no Linux, conexões ainda abertas neles seguem funcionando
+    for nome in os.listdir(destino):
+        if nome.startswith(tipo + "-") and nome.endswith(".duckdb") and nome != os.path.basename(caminho_banco):
+            try:
+                os.remove(os.path.join(destino, nome))
+            except OSError:  # já apagado por outro processo
+                pass
+    return caminho_banco
+
+
+def _gravar_banco(caminho_csv, tipo, caminho_banco):
+    with open(caminho_csv, encoding="utf-8") as arquivo:
+        colunas = set(arquivo.readline().strip().split(","))
+    tipos = {coluna: TIPOS_SQL[tipo_coluna] for coluna, tipo_coluna in ESQUEMAS[tipo].items() if coluna in colunas}
+    datas = {coluna: formato for coluna, formato in COLUNAS_DATA[tipo].items() if coluna in colunas}
+    tipos.update({coluna: 'VARCHAR' for coluna in datas})
+    substituir = f" REPLACE ({', '.join(_expressao_data(c, f) for c, f in datas.items())})" if datas else ""
+
+    # Temporário por processo: dois processos importando a mesma versão não escrevem no mesmo arquivo
+    temporario = f"{caminho_banco}.{os.getpid()}.tmp"
+    try:
+        conexao = duckdb.connect(temporario, config=_configuracao())
+        try:
+            conexao.execute(f"CREATE TABLE {tipo} AS SELECT *{substituir} FROM read_csv(?, header=true, types=?)",
+                            [caminho_csv, tipos])
+        finally:
+            conexao.close()
+        # Outro processo terminou a mesma versão antes: o banco dele é equivalente e fica
+        if not os.path.exists(caminho_banco):
+            os.replace(temporario, caminho_banco)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def _banco_atualizado(caminho_csv, tipo, destino):
+    """Caminho do banco importado da versão atual do CSV, ou None."""
+    try:
+        with open(_caminho_origem(tipo, destino), encoding="utf-8") as arquivo:
+            origem = json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+    caminho_banco = os.path.join(destino, origem['banco'])
+    if tuple(origem['assinatura']) != assinatura_arquivo(caminho_csv) or not os.path.exists(caminho_banco):
+        return None
+    return caminho_banco
+
+
+def abrir_consultas(caminho_csv, tipo, destino=DIRETORIO_CONSULTAS):
+    """Retorna as Consultas do CSV, importando-o de novo se mudou desde a última importação.
+
+    Retorna None quando o backend não está ativo (BACKEND_CONSULTAS) ou o duckdb não está instalado.
+    """
+    if not consultas_ativas():
+        return None
+    chave = (os.path.abspath(destino), tipo)
+    assinatura = assinatura_arquivo(caminho_csv)
+
+    # Uma importação por vez: as sessões que chegam durante a importação esperam por ela
+    with _TRAVA_CONEXOES:
+        entrada = _CONEXOES.get(chave)
+        if entrada is not None and entrada[0] == assinatura:
+            return entrada[1]
+        caminho_banco = _banco_atualizado(caminho_csv, tipo, destino)
+        if caminho_banco is None:
+            with fase(f"importação SQL: {tipo}"):
+                caminho_banco = importar_csv(caminho_csv, tipo, destino)
+        consultas = Consultas(caminho_banco, tipo)
+        _CONEXOES[chave] = (assinatura, consultas)
+        return consultas
+
+
+def _onde(filtros, extra=()):
+    """Cláusula WHERE (com parâmetros) para um dict coluna -> valor, como o de filtros_para_leitura."""
+    termos = [f"{_identificador(coluna)} = ?" for coluna in filtros] + list(extra)
+    return (" WHERE " + " AND ".join(termos) if termos else ""), list(filtros.values())
+
+
+class Consultas:
+    """Consultas agregadas sobre a tabela de um banco DuckDB (somente leitura).
+
+    A conexão é compartilhada entre sessões; cada consulta abre o próprio cursor, então as
+    threads do pool de gráficos podem consultar ao mesmo tempo.
+    """
+
+    def __init__(self, caminho_banco, tabela):
+        self.tabela = tabela
+        self._conexao = duckdb.connect(caminho_banco, read_only=True, config=_configuracao())
+
+    def consultar(self, sql, parametros=()):
+        cursor = self._conexao.cursor()
+        try:
+            return cursor.execute(sql, list(parametros)).df()
+        finally:
+            cursor.close()
+
+    def total_linhas(self):
+        return int(self.consultar(f"SELECT count(*) AS linhas FROM {self.tabela}")['linhas'].iloc[0])
+
+    def distintos(self, colunas, filtros=None):
+        """Combinações distintas das colunas (ex.: para as opções dos filtros)."""
+        selecao = ", ".join(map(_identificador, colunas))
+        onde, parametros = _onde(filtros or {})
+        return self.consultar(f"SELECT DISTINCT {selecao} FROM {self.tabela}{onde}", parametros)
+
+    def somar_por(self, filtros, dimensoes, medidas, ordenar=None, limite=None, contar=None, condicoes=()):
+        """Soma das medidas por dimensões, sobre as linhas que atendem aos filtros.
+
+        Sem `ordenar`, as linhas vêm ordenadas pelas dimensões; com `ordenar`, em ordem
+        decrescente da coluna indicada (e só as `limite` primeiras). `contar` acrescenta uma
+        coluna com esse nome e a quantidade de linhas do grupo.
+        """
+        grupo = ", ".join(map(_identificador, dimensoes))
+        agregacoes = [f"sum({_identificador(medida)}) AS {_identificador(medida)}" for medida in medidas]
+        if contar is not None:
+            agregacoes.append(f"count(*) AS {_identificador(contar)}")
+        onde, parametros = _onde(filtros, condicoes)
+        ordem = f"{_identificador(ordenar)} DESC, {grupo}" if ordenar is not None else grupo
+        sql = (f"SELECT {grupo}, {', '.join(agregacoes)} FROM {self.tabela}{onde} "
+               f"GROUP BY {grupo} ORDER BY {ordem}")
+        if limite is not None:
+            sql += f" LIMIT {int(limite)}"
+        return self.consultar(sql, parametros)
+
+    def lotes(self, filtros, tamanho_lote=100_000):
+        """Linhas que atendem aos filtros, em DataFrames de até ~`tamanho_lote` linhas (para exportação)."""
+        onde, parametros = _onde(filtros)
+        cursor = self._conexao.cursor()
+        try:
+            cursor.execute(f"SELECT * FROM {self.tabela}{onde}", parametros)
+            # O DuckDB entrega os resultados em vetores de 2048 linhas
+            vetores = max(1, tamanho_lote // 2048)
+            lote = cursor.fetch_df_chunk(vetores)
+            # O primeiro lote sai mesmo sem linhas: leva as colunas para o cabeçalho e o esquema
+            yield lote
+            while not lote.empty:
+                lote = cursor.fetch_df_chunk(vetores)
+                if not lote.empty:
+                    yield lote
+        finally:
+            cursor.close()
+
+
+# --- Consultas de cada widget ---
+
+def metricas_vendas(consultas, filtros):
+    """Mesmas métricas de calcular_metricas, numa única consulta."""
+    onde, parametros = _onde(filtros)
+    linha = consultas.consultar(
+        'SELECT count(DISTINCT "NF") AS total_nf, coalesce(sum("Qtd_Produto"), 0) AS qtd, '
+        'coalesce(sum("Valor_Total_Item"), 0) AS valor, coalesce(sum("Total_Custo_Compra"), 0) AS custo, '
+        f'coalesce(sum("Total_Lucro_Venda_Item"), 0) AS lucro FROM {consultas.tabela}{onde}', parametros).iloc[0]
+    total_nf = int(linha['total_nf'])
+    total_qtd_produto = int(linha['qtd'])
+    valor_total_item, total_custo_compra, total_lucro_venda = float(linha['valor']), float(linha['custo']), float(linha['lucro'])
+
+    ticket_medio_geral = valor_total_item / total_nf if total_nf > 0 else 0
+    porcentagem_lucro_venda = (total_lucro_venda / valor_total_item) * 100 if valor_total_item > 0 else 0
+    return total_nf, total_qtd_produto, valor_total_item, total_custo_compra, total_lucro_venda, ticket_medio_geral, porcentagem_lucro_venda
+
+
+def vendas_por_vendedor_com_meta(consultas, filtros):
+    # Entrada de calcular_performance_vendedores já sem os vendedores que ficam fora das metas
+    excluidos = ", ".join("'" + vendedor.replace("'", "''") + "'" for vendedor in VENDEDORES_SEM_META)
+    return consultas.somar_por(filtros, ['Vendedor'], ['Valor_Total_Item'],
+                               condicoes=[f'"Vendedor" NOT IN ({excluidos})'])
+
+
+def metricas_compras(consultas, filtros):
+    """Mesmas métricas de calcular_metricas_compras, numa única consulta."""
+    onde, parametros = _onde(filtros)
+    linha = consultas.consultar(
+        'SELECT count(DISTINCT numeropedido) AS pedidos, coalesce(sum("valor liquido item"), 0) AS valor, '
+        'coalesce(sum("qtd pedido item"), 0) AS itens, '
+        "count(DISTINCT numeropedido) FILTER (WHERE \"situacao pedido\" = 'fechado pedido chegou') AS entregues, "
+        "count(DISTINCT numeropedido) FILTER (WHERE \"situacao pedido\" = 'pendente') AS pendentes "
+        f'FROM {consultas.tabela}{onde}', parametros).iloc[0]
+    return (int(linha['pedidos']), float(linha['valor']), int(linha['itens']),
+            int(linha['entregues']), int(linha['pendentes']))
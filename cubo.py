@@ -0,0 +1,110 @@
+import pandas as pd
+
+from dados import concatenar
+from filtros import DIMENSOES_VENDAS, IndiceFiltros
+
+
+# Dimensões comuns a todos os cubóides: são as colunas que os filtros da Visão Geral usam
+DIMENSOES_CUBO = ['Ano', 'Mes', 'Dia', 'Vendedor', 'situacao']
+MEDIDAS_CUBO = ['Valor_Total_Item', 'Total_Custo_Compra', 'Total_Lucro_Venda_Item', 'Qtd_Produto']
+
+
+def _dimensoes_presentes(df):
+    return [coluna for coluna in DIMENSOES_CUBO if coluna in df.columns]
+
+
+def _agregar(df, dimensoes):
+    return df.groupby(dimensoes, dropna=False, sort=False, observed=True)[MEDIDAS_CUBO].sum().reset_index()
+
+
+def construir_cubo(df):
+    """Materializa as somas de vendas por Ano x Mes x Dia x Vendedor x situacao.
+
+    Além do cubóide base, guarda um cubóide por Linha, por produto e por cliente com as
+    mesmas dimensões, e os pares distintos (célula, NF) para a contagem de notas. Os cubóides
+    mantêm os nomes de coluna do dataset bruto, então aplicar_filtros, agrupar_e_somar e os
+    gráficos funcionam sobre eles sem alteração. Em 'indices' fica o IndiceFiltros de cada
+    cubóide.
+    """
+    dimensoes = _dimensoes_presentes(df)
+
+    cubo = {
+        'base': _agregar(df, dimensoes),
+        'linha': _agregar(df, dimensoes + ['Linha']),
+        'produto': _agregar(df, dimensoes + ['Descricao_produto']),
+        'cliente': _agregar(df, dimensoes + ['Cliente']),
+        # Contagem distinta não é somável; guardar os pares mantém o total de notas exato
+        'notas': df[dimensoes + ['NF']].drop_duplicates().reset_index(drop=True),
+    }
+    cubo['indices'] = _indexar(cubo)
+    return cubo
+
+
+def _indexar(cubo):
+    return {nome: IndiceFiltros(cuboide, DIMENSOES_VENDAS) for nome, cuboide in cubo.items() if nome != 'indices'}
+
+
+def atualizar_cubo(cubo, delta, df=None):
+    """Incorpora linhas novas (delta) a um cubo já montado, sem reagregar o dataset inteiro.
+
+    O delta é agregado sozinho e somado aos cubóides existentes; o custo depende do tamanho
+    do cubo e do delta, não do número de linhas do dataset.
+    """
+    if delta.empty:
+        return cubo
+
+    dimensoes = _dimensoes_presentes(delta)
+    cubo_delta = construir_cubo(delta)
+    novo = {}
+    for nome, extras in (('base', []), ('linha', ['Linha']), ('produto', ['Descricao_produto']), ('cliente', ['Cliente'])):
+        novo[nome] = _agregar(concatenar([cubo[nome], cubo_delta[nome]]), dimensoes + extras)
+    novo['notas'] = concatenar([cubo['notas'], cubo_delta['notas']]).drop_duplicates().reset_index(drop=True)
+    novo['indices'] = _indexar(novo)
+    return novo
+
+
+# --- Agregados para históricos acima do teto de memória (dados.carregar_agregados) ---
+
+COLUNAS_NOTAS_UNICAS = ['NF', 'Data_Emissao', 'Vendedor', 'Valor_Total_Nota', 'Mes', 'Ano', 'situacao']
+
+
+def construir_diario_faturado(df):
+    """Faturamento por dia das vendas faturadas, com as colunas Data_Emissao e Valor_Total_Item."""
+    faturado = df[df['situacao'] == 'Faturada']
+    return faturado.groupby(faturado['Data_Emissao'].dt.normalize())['Valor_Total_Item'].sum().reset_index()
+
+
+def atualizar_diario_faturado(diario, delta, df=None):
+    juntos = pd.concat([diario, construir_diario_faturado(delta)], ignore_index=True)
+    return juntos.groupby('Data_Emissao')['Valor_Total_Item'].sum().reset_index()
+
+
+def construir_notas_unicas(df):
+    """Primeira linha de cada NF, com as colunas da análise de tickets."""
+    return df.drop_duplicates(subset='NF')[COLUNAS_NOTAS_UNICAS].reset_index(drop=True)
+
+
+def atualizar_notas_unicas(notas, delta, df=None):
+    juntas = concatenar([notas, construir_notas_unicas(delta)])
+    return juntas.drop_duplicates(subset='NF').reset_index(drop=True)
+
+
+AGREGADOS_VENDAS = {
+    'cubo': (construir_cubo, atualizar_cubo),
+    'diario_faturado': (construir_diario_faturado, atualizar_diario_faturado),
+    'notas_unicas': (construir_notas_unicas, atualizar_notas_unicas),
+}
+
+
+def calcular_metricas_cubo(df_base, df_notas):
+    """Equivalente a calcular_metricas, a partir dos cubóides 'base' e 'notas' já filtrados."""
+    total_nf = df_notas['NF'].nunique()
+    total_qtd_produto = df_base['Qtd_Produto'].sum()
+    valor_total_item = df_base['Valor_Total_Item'].sum()
+    total_custo_compra = df_base['Total_Custo_Compra'].sum()
+    total_lucro_venda = df_base['Total_Lucro_Venda_Item'].sum()
+
+    ticket_medio_geral = valor_total_item / total_nf if total_nf > 0 else 0
+    porcentagem_lucro_venda = (total_lucro_venda / valor_total_item) * 100 if valor_total_item > 0 else 0
+
+    return total_nf, total_qtd_produto, valor_total_item, total_custo_compra, total_lucro_venda, ticket_medio_geral, porcentagem_lucro_venda
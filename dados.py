@@ -0,0 +1,1010 @@
+import hashlib
+import io
+import itertools
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from medicao import fase
+
+
+# Cache de datasets compartilhado por todas as sessões do processo.
+# A chave é (caminho absoluto, leitor); cada entrada guarda a assinatura do arquivo
+# (caminho, mtime, tamanho), o DataFrame lido e o estado da leitura incremental.
+_CACHE_DATASETS = {}
+_CACHE_DERIVADOS = {}
+_TRAVA_CACHE = threading.Lock()
+_TRAVAS_ARQUIVO = {}
+ESTATISTICAS_CACHE = {'hits': 0, 'misses': 0, 'incrementais': 0}
+
+# Bytes do fim da parte já lida que precisam continuar iguais para o arquivo contar como "só cresceu"
+_TAMANHO_IMPRESSAO = 4096
+_geracoes = itertools.count(1)
+
+
+def assinatura_arquivo(caminho):
+    info = os.stat(caminho)
+    return (os.path.abspath(caminho), info.st_mtime_ns, info.st_size)
+
+
+def _trava_do_arquivo(chave):
+    with _TRAVA_CACHE:
+        return _TRAVAS_ARQUIVO.setdefault(chave, threading.Lock())
+
+
+def _ler_trecho(caminho, inicio, fim):
+    with open(caminho, 'rb') as arquivo:
+        arquivo.seek(inicio)
+        return arquivo.read(fim - inicio)
+
+
+def _fim_linhas_completas(caminho, tamanho):
+    """Posição logo após o último '\\n' nos primeiros `tamanho` bytes do arquivo (0 se não houver)."""
+    with open(caminho, 'rb') as arquivo:
+        fim = tamanho
+        while fim > 0:
+            inicio = max(0, fim - 65536)
+            arquivo.seek(inicio)
+            posicao = arquivo.read(fim - inicio).rfind(b'\n')
+            if posicao >= 0:
+                return inicio + posicao + 1
+            fim = inicio
+    return 0
+
+
+class _TrechoArquivo(io.RawIOBase):
+    """Os primeiros `limite` bytes do arquivo, lidos do disco sob demanda (sem carregar tudo).
+
+    Linhas que o ERP acrescentar durante a leitura ficam de fora: elas são lidas depois, pela
+    leitura incremental, a partir de `limite`.
+    """
+
+    def __init__(self, caminho, limite):
+        self.name = caminho
+        self._arquivo = open(caminho, 'rb')
+        self._restante = limite
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        quantidade = min(len(destino), self._restante)
+        if quantidade <= 0:
+            return 0
+        lidos = self._arquivo.readinto(memoryview(destino)[:quantidade])
+        self._restante -= lidos
+        return lidos
+
+    def close(self):
+        self._arquivo.close()
+        super().close()
+
+
+def _ler_ate(caminho, leitor, limite):
+    with io.BufferedReader(_TrechoArquivo(caminho, limite)) as trecho:
+        return leitor(trecho)
+
+
+def _estado_leitura(caminho, cabecalho, lidos, geracao):
+    """Onde a leitura parou: bytes já lidos e a impressão (cabeçalho + final lido) que detecta reescritas."""
+    inicio = max(len(cabecalho), lidos - _TAMANHO_IMPRESSAO)
+    return {
+        'cabecalho': cabecalho,
+        'lidos': lidos,
+        'impressao': _ler_trecho(caminho, inicio, lidos),
+        'geracao': geracao,
+    }
+
+
+def _leitura_completa(caminho, leitor, assinatura):
+    with open(caminho, 'rb') as arquivo:
+        cabecalho = arquivo.readline()
+    # Outro processo do servidor (ou uma execução anterior) pode já ter mapeado esta versão
+    df = ler_versao_mapeada(caminho, leitor, assinatura)
+    mapeado = df is not None
+    # Versões mapeadas só existem para arquivos lidos até o fim
+    lidos = assinatura[2]
+    if df is None:
+        # ...ou uma versão anterior, e então basta ler as linhas acrescentadas depois dela
+        retomada = _retomar_versao_mapeada(caminho, leitor, assinatura)
+        if retomada is not None:
+            df, estado = retomada
+            return (assinatura, df, dict(estado, geracao=next(_geracoes)))
+        # Só as linhas completas dos bytes que existiam no stat: o que for acrescentado durante a
+        # leitura (ou uma última linha ainda sendo escrita) fica para a leitura incremental
+        lidos = _fim_linhas_completas(caminho, assinatura[2])
+        try:
+            df = _ler_ate(caminho, leitor, lidos)
+        except MemoriaExcedida:
+            # Fica registrado para não tentar de novo a cada acesso; só os agregados servem este arquivo
+            df = None
+    estado = _estado_leitura(caminho, cabecalho, lidos, next(_geracoes))
+    if df is not None and not mapeado and lidos == assinatura[2]:
+        df = mapear_dataset(df, caminho, leitor, assinatura, estado)
+    return (assinatura, df, estado)
+
+
+def _juntar_datas_invalidas(anteriores, novas):
+    juntas = dict(anteriores)
+    for coluna, (linhas, exemplos) in novas.items():
+        linhas_antes, exemplos_antes = juntas.get(coluna, (0, []))
+        exemplos = exemplos_antes + [valor for valor in exemplos if valor not in exemplos_antes]
+        juntas[coluna] = (linhas_antes + linhas, exemplos[:10])
+    return juntas
+
+
+def _ler_linhas_novas(caminho, leitor, estado, assinatura):
+    """Lê apenas as linhas acrescentadas ao fim do arquivo desde a última leitura.
+
+    Retorna (delta, novo estado), com delta None se ainda não há linha nova completa, ou
+    None quando o arquivo foi reescrito (encolheu, mudou o cabeçalho ou o trecho já lido),
+    caso em que é preciso reler tudo.
+    """
+    lidos = estado['lidos']
+    if assinatura[2] < lidos or lidos == 0:
+        return None
+    if _ler_trecho(caminho, 0, len(estado['cabecalho'])) != estado['cabecalho']:
+        return None
+    impressao = estado['impressao']
+    if _ler_trecho(caminho, lidos - len(impressao), lidos) != impressao or not impressao.endswith(b'\n'):
+        return None
+
+    novos = _ler_trecho(caminho, lidos, assinatura[2])
+    # Só linhas completas: uma linha ainda sendo escrita fica para a próxima leitura
+    fim_linhas = novos.rfind(b'\n') + 1
+    if fim_linhas == 0:
+        return None, estado
+
+    delta = leitor(io.BytesIO(estado['cabecalho'] + novos[:fim_linhas]))
+    return delta, _estado_leitura(caminho, estado['cabecalho'], lidos + fim_linhas, estado['geracao'])
+
+
+def _anexar(df, delta):
+    df_novo = concatenar([df, delta])
+    df_novo.attrs = dict(df.attrs)
+    if 'datas_invalidas' in df.attrs or 'datas_invalidas' in delta.attrs:
+        df_novo.attrs['datas_invalidas'] = _juntar_datas_invalidas(df.attrs.get('datas_invalidas', {}),
+                                                                   delta.attrs.get('datas_invalidas', {}))
+    return df_novo
+
+
+def _leitura_incremental(caminho, leitor, entrada, assinatura):
+    _, df, estado = entrada
+    if df is None:
+        # Já passava do teto de memória; crescendo, continua passando
+        return (assinatura, None, estado) if assinatura[2] >= estado['lidos'] else None
+    lido = _ler_linhas_novas(caminho, leitor, estado, assinatura)
+    if lido is None:
+        return None
+    delta, estado = lido
+    if delta is None:
+        return (assinatura, df, estado)
+
+    df_novo = _anexar(df, delta)
+    if estado['lidos'] == assinatura[2]:
+        # Só com o arquivo lido até o fim: outro processo que mapear esta versão a dá por completa
+        df_novo = remapear_dataset(df_novo, caminho, leitor, assinatura, estado)
+    return (assinatura, df_novo, estado)
+
+
+def _carregar_com_assinatura(caminho, leitor):
+    assinatura = assinatura_arquivo(caminho)
+    chave_dataset = (assinatura[0], leitor)
+
+    # Uma trava por arquivo evita que várias sessões leiam o mesmo CSV ao mesmo tempo
+    with _trava_do_arquivo(chave_dataset):
+        entrada = _CACHE_DATASETS.get(chave_dataset)
+        if entrada is not None and entrada[0] == assinatura:
+            with _TRAVA_CACHE:
+                ESTATISTICAS_CACHE['hits'] += 1
+            return entrada
+
+        # O ERP só acrescenta linhas ao longo do dia: primeiro tenta ler apenas o final novo
+        nova_entrada = _leitura_incremental(caminho, leitor, entrada, assinatura) if entrada is not None else None
+        incremental = nova_entrada is not None
+        if not incremental:
+            nova_entrada = _leitura_completa(caminho, leitor, assinatura)
+
+        with _TRAVA_CACHE:
+            ESTATISTICAS_CACHE['incrementais' if incremental else 'misses'] += 1
+            _CACHE_DATASETS[chave_dataset] = nova_entrada
+            if not incremental:
+                # Estruturas derivadas da versão anterior do arquivo deixam de valer
+                for chave in [c for c in _CACHE_DERIVADOS if c[0] == chave_dataset]:
+                    del _CACHE_DERIVADOS[chave]
+        return nova_entrada
+
+
+def carregar_dataset(caminho, leitor=pd.read_csv):
+    """Retorna o DataFrame do arquivo, relendo do disco apenas quando mtime ou tamanho mudam.
+
+    Se o arquivo apenas cresceu, só as linhas novas são lidas e anexadas ao DataFrame em
+    cache. O leitor precisa aceitar tanto um caminho quanto um buffer de bytes (como o
+    pd.read_csv). Retorna None quando o leitor lança MemoriaExcedida; nesse caso use
+    carregar_agregados. O DataFrame retornado é compartilhado entre sessões e não deve ser
+    alterado in-place.
+    """
+    return _carregar_com_assinatura(caminho, leitor)[1]
+
+
+def carregar_derivado(caminho, nome, construir, leitor=pd.read_csv, atualizar=None):
+    """Retorna `construir(df)` para o dataset do arquivo, calculado uma vez por versão do arquivo.
+
+    Usado para estruturas montadas na carga (cubos, índices) que também são compartilhadas
+    entre sessões e, portanto, somente leitura. Quando o dataset só ganhou linhas novas e
+    `atualizar(valor, delta, df)` é informado, a estrutura é atualizada com o delta em vez
+    de reconstruída.
+    """
+    assinatura, df, estado = _carregar_com_assinatura(caminho, leitor)
+    if df is None:
+        return None
+    chave = ((assinatura[0], leitor), nome)
+    with _trava_do_arquivo(chave):
+        entrada = _CACHE_DERIVADOS.get(chave)
+        if entrada is not None and entrada[0] == assinatura:
+            return entrada[1]
+
+        if (atualizar is not None and entrada is not None and entrada[2] == estado['geracao']
+                and entrada[3] <= len(df)):
+            valor = atualizar(entrada[1], df.iloc[entrada[3]:], df)
+        else:
+            valor = construir(df)
+        with _TRAVA_CACHE:
+            _CACHE_DERIVADOS[chave] = (assinatura, valor, estado['geracao'], len(df))
+        return valor
+
+
+# --- Esquema das colunas ---
+
+# Tipos aplicados na leitura: textos repetidos como category, inteiros pequenos reduzidos e
+# com suporte a vazios (Int8/Int16/Int32), valores monetários em float64 para não perder
+# centavos nas somas. As datas ficam fora: são convertidas por normalizar_datas.
+ESQUEMAS = {
+    "vendas": {
+        'NF': 'Int32',
+        'Vendedor': 'category',
+        'Cliente': 'category',
+        'Descricao_produto': 'category',
+        'Linha': 'category',
+        'Qtd_Produto': 'Int32',
+        'Valor_Total_Item': 'float64',
+        'Total_Custo_Compra': 'float64',
+        'Total_Lucro_Venda_Item': 'float64',
+        'Valor_Total_Nota': 'float64',
+        'situacao': 'category',
+        'Dia': 'Int8',
+        'Mes': 'Int8',
+        'Ano': 'Int16',
+    },
+    "compras": {
+        'numeropedido': 'Int32',
+        'codigofornecedor': 'Int32',
+        'fornecedor': 'category',
+        'cidade fornecedor': 'category',
+        'total itens': 'Int16',
+        'valor bruto total itens': 'float64',
+        'situacao pedido': 'category',
+        'usuario': 'category',
+        'prazo': 'category',
+        'codigoprodutoitem': 'Int32',
+        'descricao produto': 'category',
+        'qtd pedido item': 'Int32',
+        'qtd bonificacao item': 'Int32',
+        'qtd pendente item': 'Int32',
+        'preco unitario item': 'float64',
+        'qtd falta item': 'float64',
+        'qtd faturada item': 'Int32',
+        'valor desconto item': 'float64',
+        'valor bruto item': 'float64',
+        'valor liquido item': 'float64',
+        'preco unitario liquido item': 'float64',
+        'tipo produto': 'category',
+        'mes': 'Int8',
+        'ano': 'Int16',
+        'status pedido': 'category',
+        'tipo fornecedor': 'category',
+    },
+}
+
+
+def concatenar(partes):
+    """pd.concat que mantém as colunas category: as categorias das partes são unidas antes.
+
+    Blocos lidos separadamente têm categorias diferentes, e o pd.concat simples devolveria
+    essas colunas como texto (object).
+    """
+    partes = list(partes)
+    if len(partes) > 1:
+        for coluna, tipo in partes[0].dtypes.items():
+            if not isinstance(tipo, pd.CategoricalDtype):
+                continue
+            if not all(isinstance(parte[coluna].dtype, pd.CategoricalDtype) for parte in partes if coluna in parte):
+                continue
+            categorias = tipo.categories
+            for parte in partes[1:]:
+                if coluna in parte:
+                    categorias = categorias.union(parte[coluna].cat.categories)
+            partes = [parte.assign(**{coluna: parte[coluna].cat.set_categories(categorias)}) if coluna in parte else parte
+                      for parte in partes]
+    return pd.concat(partes, ignore_index=True)
+
+
+def relatorio_memoria(caminho, tipo):
+    """Memória por coluna (MB) do arquivo lido com os tipos padrão do pandas e com ESQUEMAS.
+
+    A leitura "antes" carrega o CSV inteiro de uma vez, como era feito sem o esquema; use em
+    arquivos que caibam em memória.
+    """
+    antes = normalizar_datas(pd.read_csv(caminho), COLUNAS_DATA[tipo])
+    depois = ler_em_blocos(caminho, tipo)
+    relatorio = pd.DataFrame({
+        'tipo antes': antes.dtypes.astype(str),
+        'MB antes': antes.memory_usage(deep=True, index=False) / 1024 ** 2,
+        'tipo depois': depois.dtypes.astype(str),
+        'MB depois': depois.memory_usage(deep=True, index=False) / 1024 ** 2,
+    })
+    relatorio.loc['TOTAL'] = ['', relatorio['MB antes'].sum(), '', relatorio['MB depois'].sum()]
+    relatorio['redução'] = relatorio['MB antes'] / relatorio['MB depois']
+    return relatorio
+
+
+# --- Datas normalizadas na carga ---
+
+# Formato de cada coluna de data; None aceita formatos mistos (dia primeiro)
+COLUNAS_DATA = {
+    "vendas": {"Data_Emissao": None},
+    "compras": {"data emissao": "%d/%m/%Y", "data entrega prevista": "%d/%m/%Y", "data entrada": "%d/%m/%Y"},
+}
+
+# Texto -> data já convertido, por formato; preservado entre recargas dos arquivos
+_CACHE_DATAS = {}
+
+
+def converter_datas(serie, formato=None):
+    """Converte uma coluna de datas em texto para datetime64 analisando cada valor distinto uma única vez.
+
+    Retorna a coluna convertida e a lista de valores distintos que não puderam ser convertidos.
+    """
+    codigos, unicos = pd.factorize(serie)
+    conhecidos = _CACHE_DATAS.setdefault(formato, {})
+
+    novos = [valor for valor in unicos if valor not in conhecidos]
+    if novos:
+        if formato is None:
+            convertidos = pd.to_datetime(pd.Series(novos, dtype=object), format='mixed', dayfirst=True, errors='coerce')
+        else:
+            convertidos = pd.to_datetime(pd.Series(novos, dtype=object), format=formato, errors='coerce')
+        with _TRAVA_CACHE:
+            conhecidos.update(zip(novos, convertidos))
+
+    datas_unicas = pd.DatetimeIndex([conhecidos[valor] for valor in unicos])
+    datas = datas_unicas.take(codigos, allow_fill=True, fill_value=pd.NaT)
+    invalidos = [valor for valor, data in zip(unicos, datas_unicas) if pd.isna(data)]
+    return pd.Series(datas, index=serie.index, name=serie.name), invalidos
+
+
+def normalizar_datas(df, colunas_data):
+    """Converte as colunas de data do DataFrame recém-lido (in-place).
+
+    O resumo do que não virou data fica em df.attrs['datas_invalidas']:
+    coluna -> (quantidade de linhas, alguns dos valores).
+    """
+    datas_invalidas = {}
+    for coluna, formato in colunas_data.items():
+        if coluna not in df.columns or pd.api.types.is_datetime64_any_dtype(df[coluna]):
+            continue
+        with fase(f"conversão de datas: {coluna}", len(df)):
+            datas, invalidos = converter_datas(df[coluna], formato)
+            if invalidos:
+                linhas_invalidas = int((datas.isna() & df[coluna].notna()).sum())
+                datas_invalidas[coluna] = (linhas_invalidas, invalidos[:10])
+            df[coluna] = datas
+    df.attrs['datas_invalidas'] = datas_invalidas
+    return df
+
+
+# --- Leitura em blocos com teto de memória ---
+
+# Linhas por bloco lido do CSV
+TAMANHO_BLOCO = 200_000
+# Teto, em MB, para o dataset detalhado mantido em memória; acima dele só os agregados ficam
+LIMITE_MEMORIA_MB = float(os.environ.get("LIMITE_MEMORIA_MB", 2048))
+
+
+class MemoriaExcedida(MemoryError):
+    """O dataset detalhado passaria do teto de memória configurado."""
+
+
+def ler_blocos(caminho, tipo, tamanho_bloco=None):
+    """Gera o CSV em blocos de `tamanho_bloco` linhas, com as datas já convertidas em cada bloco."""
+    with pd.read_csv(caminho, chunksize=tamanho_bloco or TAMANHO_BLOCO, dtype=ESQUEMAS[tipo]) as leitor:
+        while True:
+            # A leitura de cada bloco é medida à parte da conversão das datas
+            with fase("leitura do CSV") as medida:
+                bloco = next(leitor, None)
+                if bloco is not None:
+                    medida.linhas(len(bloco))
+            if bloco is None:
+                return
+            yield normalizar_datas(bloco, COLUNAS_DATA[tipo])
+
+
+def _concatenar_blocos(blocos):
+    if len(blocos) == 1:
+        return blocos[0]
+    df = concatenar(blocos)
+    datas_invalidas = {}
+    for bloco in blocos:
+        datas_invalidas = _juntar_datas_invalidas(datas_invalidas, bloco.attrs.get('datas_invalidas', {}))
+    df.attrs['datas_invalidas'] = datas_invalidas
+    return df
+
+
+def ler_em_blocos(caminho, tipo, limite_memoria_mb=None, tamanho_bloco=None):
+    """Lê o CSV inteiro bloco a bloco, convertendo as datas por bloco.
+
+    A coluna de texto das datas nunca existe inteira em memória ao lado da convertida. Se a
+    soma dos blocos passar do teto (LIMITE_MEMORIA_MB por padrão), lança MemoriaExcedida.
+    """
+    limite = (limite_memoria_mb or LIMITE_MEMORIA_MB) * 1024 ** 2
+    blocos = []
+    usado = 0
+    for bloco in ler_blocos(caminho, tipo, tamanho_bloco):
+        usado += bloco.memory_usage(deep=True).sum()
+        if usado > limite:
+            raise MemoriaExcedida(f"{getattr(caminho, 'name', caminho)} ocupa mais de {limite / 1024 ** 2:.0f} MB em memória.")
+        blocos.append(bloco)
+    return _concatenar_blocos(blocos)
+
+
+def ler_vendas(caminho):
+    return ler_em_blocos(caminho, "vendas")
+
+
+def ler_compras(caminho):
+    return ler_em_blocos(caminho, "compras")
+
+
+LEITORES = {"vendas": ler_vendas, "compras": ler_compras}
+
+
+_CACHE_AGREGADOS = {}
+
+
+def _agregar_blocos(blocos, agregados, valores=None):
+    valores = dict(valores or {})
+    for bloco in blocos:
+        for nome, (construir, atualizar) in agregados.items():
+            valores[nome] = construir(bloco) if nome not in valores else atualizar(valores[nome], bloco, None)
+    return valores
+
+
+def carregar_agregados(caminho, tipo, agregados, tamanho_bloco=None):
+    """Monta só as estruturas agregadas do arquivo, lendo-o em blocos e sem guardar as linhas.
+
+    `agregados` é um dict nome -> (construir(bloco), atualizar(valor, bloco, df)): o primeiro
+    bloco é construído e os seguintes são incorporados com atualizar, então a memória usada
+    depende do tamanho dos agregados e de um bloco. Como em carregar_dataset, o resultado é
+    compartilhado entre sessões e, se o arquivo só cresceu, apenas as linhas novas são lidas.
+    """
+    assinatura = assinatura_arquivo(caminho)
+    chave = (assinatura[0], tipo, tuple(agregados))
+    with _trava_do_arquivo(chave):
+        entrada = _CACHE_AGREGADOS.get(chave)
+        if entrada is not None and entrada[0] == assinatura:
+            with _TRAVA_CACHE:
+                ESTATISTICAS_CACHE['hits'] += 1
+            return entrada[1]
+
+        lido = None
+        if entrada is not None:
+            lido = _ler_linhas_novas(caminho, LEITORES[tipo], entrada[2], assinatura)
+        if lido is not None:
+            delta, estado = lido
+            valores = _agregar_blocos([delta] if delta is not None else [], agregados, entrada[1])
+            contador = 'incrementais'
+        else:
+            # Como em _leitura_completa: só as linhas completas que existiam no stat
+            lidos = _fim_linhas_completas(caminho, assinatura[2])
+            with io.BufferedReader(_TrechoArquivo(caminho, lidos)) as trecho:
+                valores = _agregar_blocos(ler_blocos(trecho, tipo, tamanho_bloco), agregados)
+            with open(caminho, 'rb') as arquivo:
+                cabecalho = arquivo.readline()
+            estado = _estado_leitura(caminho, cabecalho, lidos, next(_geracoes))
+            contador = 'misses'
+
+        with _TRAVA_CACHE:
+            ESTATISTICAS_CACHE[contador] += 1
+            _CACHE_AGREGADOS[chave] = (assinatura, valores, estado)
+        return valores
+
+
+def estatisticas_cache():
+    with _TRAVA_CACHE:
+        hits = ESTATISTICAS_CACHE['hits']
+        misses = ESTATISTICAS_CACHE['misses']
+        incrementais = ESTATISTICAS_CACHE['incrementais']
+        datasets = len(_CACHE_DATASETS) + len(_CACHE_AGREGADOS)
+    total = hits + misses
+    taxa_acerto = hits / total * 100 if total > 0 else 0
+    return {'hits': hits, 'misses': misses, 'incrementais': incrementais, 'taxa_acerto': taxa_acerto, 'datasets': datasets}
+
+
+def limpar_cache():
+    with _TRAVA_CACHE:
+        _CACHE_DATASETS.clear()
+        _CACHE_DERIVADOS.clear()
+        _CACHE_AGREGADOS.clear()
+        _PARTICOES.clear()
+        ESTATISTICAS_CACHE['hits'] = 0
+        ESTATISTICAS_CACHE['misses'] = 0
+        ESTATISTICAS_CACHE['incrementais'] = 0
+
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow é opcional: sem ele os datasets ficam só em memória e os snapshots em pickle
+    pa = ds = feather = None
+
+
+def parquet_disponivel():
+    return pa is not None
+
+
+# --- Datasets compartilhados em memória mapeada ---
+
+# Cada versão lida de um CSV também é gravada como um arquivo Arrow (IPC sem compressão, em um
+# único bloco) e o DataFrame servido às sessões é o mapeado desse arquivo: colunas numéricas,
+# datas e os códigos das category apontam para as páginas do arquivo, somente leitura. O
+# sistema operacional mantém uma só cópia dessas páginas para todos os processos do servidor
+# que mapeiam a mesma versão, e qualquer escrita nelas falha (ValueError: read-only).
+#
+# Linhas acrescentadas pelo ERP não regravam o arquivo a cada acréscimo: enquanto houver um
+# arquivo deste CSV gravado há menos de INTERVALO_REMAPEAMENTO segundos (por qualquer processo),
+# o DataFrame com as linhas novas fica só na memória do processo. Cada arquivo guarda nos
+# metadados do esquema onde a leitura parou, então um processo novo mapeia o mais recente e
+# lê do CSV só as linhas acrescentadas depois dele.
+DIRETORIO_MAPEADOS = "dados_mapeados"
+MAPEAR_DATASETS = os.environ.get("MAPEAR_DATASETS", "1") == "1"
+INTERVALO_REMAPEAMENTO = float(os.environ.get("INTERVALO_REMAPEAMENTO_S", 600))
+_METADADO_LEITURA = b'leitura'
+
+
+def _prefixo_mapeado(caminho, leitor):
+    # O hash do caminho absoluto separa CSVs de mesmo nome em pastas diferentes; o nome fica
+    # no arquivo só para facilitar a identificação
+    origem = hashlib.sha1(os.path.abspath(caminho).encode("utf-8")).hexdigest()[:12]
+    return f"{os.path.basename(caminho)}.{origem}.{leitor.__name__}-"
+
+
+def _caminho_mapeado(caminho, leitor, assinatura):
+    prefixo = _prefixo_mapeado(caminho, leitor)
+    return os.path.join(DIRETORIO_MAPEADOS, f"{prefixo}{assinatura[1]}-{assinatura[2]}.arrow"), prefixo
+
+
+def _versoes_mapeadas(caminho, leitor):
+    """(mtime, caminho) dos arquivos Arrow já gravados do CSV, do mais recente para o mais antigo."""
+    prefixo = _prefixo_mapeado(caminho, leitor)
+    versoes = []
+    try:
+        nomes = os.listdir(DIRETORIO_MAPEADOS)
+    except OSError:
+        return versoes
+    for nome in nomes:
+        if nome.startswith(prefixo) and nome.endswith(".arrow"):
+            caminho_arrow = os.path.join(DIRETORIO_MAPEADOS, nome)
+            try:
+                versoes.append((os.stat(caminho_arrow).st_mtime, caminho_arrow))
+            except OSError:
+                pass
+    return sorted(versoes, reverse=True)
+
+
+def _mapeamento_ativo(leitor):
+    # Só os leitores do esquema (ler_vendas/ler_compras) têm nome estável para identificar o arquivo
+    return pa is not None and MAPEAR_DATASETS and leitor in LEITORES.values()
+
+
+def ler_mapeado(caminho_arrow):
+    tabela = pa.ipc.open_file(pa.memory_map(caminho_arrow, 'r')).read_all()
+    # split_blocks evita juntar colunas em blocos 2D, o que copiaria os dados para fora do mapa
+    return tabela.to_pandas(split_blocks=True)
+
+
+def estado_mapeado(caminho_arrow):
+    """Estado da leitura (cabeçalho, bytes lidos, impressão) gravado no arquivo Arrow, ou None."""
+    try:
+        metadados = pa.ipc.open_file(pa.memory_map(caminho_arrow, 'r')).schema.metadata or {}
+        estado = json.loads(metadados[_METADADO_LEITURA])
+        return {
+            'cabecalho': bytes.fromhex(estado['cabecalho']),
+            'lidos': estado['lidos'],
+            'impressao': bytes.fromhex(estado['impressao']),
+            'geracao': None,
+        }
+    except (OSError, pa.ArrowInvalid, KeyError, ValueError):
+        return None
+
+
+def _retomar_versao_mapeada(caminho, leitor, assinatura):
+    """(df, estado) da versão mapeada mais recente do CSV mais as linhas acrescentadas depois dela.
+
+    Retorna None se nenhuma versão mapeada guarda o estado da leitura ou se o CSV foi reescrito
+    desde então.
+    """
+    if not _mapeamento_ativo(leitor):
+        return None
+    for _, caminho_arrow in _versoes_mapeadas(caminho, leitor):
+        estado = estado_mapeado(caminho_arrow)
+        if estado is None:
+            continue
+        lido = _ler_linhas_novas(caminho, leitor, estado, assinatura)
+        if lido is None:
+            continue
+        try:
+            with fase(f"mapeamento: {os.path.basename(caminho)}"):
+                df = ler_mapeado(caminho_arrow)
+        except (OSError, pa.ArrowInvalid):
+            continue
+        delta, estado = lido
+        if delta is not None:
+            df = _anexar(df, delta)
+            if estado['lidos'] == assinatura[2]:
+                df = remapear_dataset(df, caminho, leitor, assinatura, estado)
+        return df, estado
+    return None
+
+
+def ler_versao_mapeada(caminho, leitor, assinatura):
+    """DataFrame mapeado da versão do arquivo, se ela já foi gravada; senão None."""
+    if not _mapeamento_ativo(leitor):
+        return None
+    caminho_arrow, _ = _caminho_mapeado(caminho, leitor, assinatura)
+    try:
+        with fase(f"mapeamento: {os.path.basename(caminho)}"):
+            return ler_mapeado(caminho_arrow)
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def mapear_dataset(df, caminho, leitor, assinatura, estado=None):
+    """Grava o df como o arquivo Arrow da versão e retorna o DataFrame mapeado dele.
+
+    Sem pyarrow, com MAPEAR_DATASETS=0 ou se a gravação falhar, retorna o próprio df. Se a
+    versão já foi gravada (por outro processo), o arquivo existente é mapeado, sem regravar.
+    `estado` (onde a leitura parou) vai para os metadados, para a retomada por outro processo.
+    Arquivos de versões anteriores do mesmo CSV são apagados; no Linux, processos que
+    ainda os mapeiam continuam lendo normalmente.
+    """
+    if not _mapeamento_ativo(leitor):
+        return df
+    mapeado = ler_versao_mapeada(caminho, leitor, assinatura)
+    if mapeado is not None:
+        return mapeado
+    caminho_arrow, prefixo = _caminho_mapeado(caminho, leitor, assinatura)
+    temporario = f"{caminho_arrow}.{os.getpid()}.tmp"
+    try:
+        with fase(f"mapeamento: gravação de {os.path.basename(caminho)}", len(df)):
+            os.makedirs(DIRETORIO_MAPEADOS, exist_ok=True)
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            if estado is not None:
+                metadado = json.dumps({'cabecalho': estado['cabecalho'].hex(), 'lidos': estado['lidos'],
+                                       'impressao': estado['impressao'].hex()})
+                tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}),
+                                                         _METADADO_LEITURA: metadado.encode("utf-8")})
+            feather.write_feather(tabela, temporario, compression='uncompressed', chunksize=max(len(df), 1))
+            os.replace(temporario, caminho_arrow)
+        mapeado = ler_mapeado(caminho_arrow)
+    except (OSError, pa.ArrowException):
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        return df
+
+    for nome in os.listdir(DIRETORIO_MAPEADOS):
+        caminho_antigo = os.path.join(DIRETORIO_MAPEADOS, nome)
+        if nome.startswith(prefixo) and nome.endswith(".arrow") and caminho_antigo != caminho_arrow:
+            try:
+                os.remove(caminho_antigo)
+            except OSError:
+                pass
+    return mapeado
+
+
+def remapear_dataset(df, caminho, leitor, assinatura, estado):
+    """mapear_dataset para um CSV que só cresceu, no máximo uma gravação a cada INTERVALO_REMAPEAMENTO.
+
+    Dentro do intervalo retorna a versão já mapeada por outro processo, se houver, ou o df.
+    """
+    if not _mapeamento_ativo(leitor):
+        return df
+    versoes = _versoes_mapeadas(caminho, leitor)
+    if versoes and time.time() - versoes[0][0] < INTERVALO_REMAPEAMENTO:
+        mapeado = ler_versao_mapeada(caminho, leitor, assinatura)
+        return mapeado if mapeado is not None else df
+    return mapear_dataset(df, caminho, leitor, assinatura, estado)
+
+
+# --- Armazenamento particionado em Parquet ---
+
+# Históricos acima do teto de memória (e o backend SQL) não mantêm o DataFrame: as páginas leem
+# do Parquet particionado por ano/mês só as partições e colunas que os filtros pedem. Cada CSV
+# tem um diretório (hash do caminho absoluto, como nos mapeados) com o manifesto _origem.json e
+# uma geração por reescrita do CSV; linhas acrescentadas pelo ERP viram arquivos novos na
+# geração atual, sem regravar os anteriores. O manifesto lista os arquivos de cada versão e é
+# trocado de uma vez (os.replace), então um leitor nunca vê um arquivo pela metade.
+DIRETORIO_PARQUET = "dados_parquet"
+COLUNAS_PARTICAO = {
+    "vendas": ["Ano", "Mes"],
+    "compras": ["ano", "mes"],
+}
+_MANIFESTO = "_origem.json"
+_TIPOS_ARROW = {'category': 'string', 'Int8': 'int8', 'Int16': 'int16', 'Int32': 'int32', 'float64': 'float64'}
+
+# Leitores abertos no processo: diretório -> (assinatura do CSV, Particoes)
+_PARTICOES = {}
+
+
+def caminho_parquet(caminho_csv, tipo):
+    origem = hashlib.sha1(os.path.abspath(caminho_csv).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(DIRETORIO_PARQUET, f"{os.path.basename(caminho_csv)}.{origem}.{tipo}")
+
+
+def _esquema_parquet(bloco, tipo):
+    # Fixo para todos os blocos e acréscimos: category vira texto (cada bloco teria as próprias
+    # categorias) e as datas ficam em timestamp mesmo num bloco só com vazios
+    campos = []
+    for campo in pa.Schema.from_pandas(bloco, preserve_index=False):
+        if campo.name in ESQUEMAS[tipo]:
+            tipo_arrow = pa.type_for_alias(_TIPOS_ARROW[ESQUEMAS[tipo][campo.name]])
+        elif campo.name in COLUNAS_DATA[tipo]:
+            tipo_arrow = pa.timestamp('ns')
+        else:
+            tipo_arrow = campo.type
+        campos.append(pa.field(campo.name, tipo_arrow))
+    return pa.schema(campos)
+
+
+def _particionamento(esquema, tipo):
+    return ds.partitioning(pa.schema([esquema.field(coluna) for coluna in COLUNAS_PARTICAO[tipo]]), flavor="hive")
+
+
+def _gravar_blocos(blocos, diretorio, tipo, esquema, nome):
+    """Grava os blocos como arquivos Parquet particionados em `diretorio`; retorna os caminhos relativos."""
+    arquivos = []
+    lotes = (lote for bloco in blocos
+             for lote in pa.Table.from_pandas(bloco, preserve_index=False).cast(esquema).to_batches())
+    ds.write_dataset(pa.RecordBatchReader.from_batches(esquema, lotes), diretorio, format="parquet",
+                     partitioning=_particionamento(esquema, tipo), basename_template=f"{nome}-{{i}}.parquet",
+                     existing_data_behavior="overwrite_or_ignore",
+                     file_visitor=lambda arquivo: arquivos.append(os.path.relpath(arquivo.path, diretorio)))
+    return arquivos
+
+
+def _ler_manifesto(destino):
+    try:
+        with open(os.path.join(destino, _MANIFESTO), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_manifesto(destino, assinatura, geracao, estado, esquema, arquivos):
+    manifesto = {
+        'assinatura': list(assinatura),
+        'geracao': geracao,
+        'estado': {'cabecalho': estado['cabecalho'].hex(), 'lidos': estado['lidos'],
+                   'impressao': estado['impressao'].hex()},
+        'esquema': esquema.serialize().to_pybytes().hex(),
+        'arquivos': arquivos,
+    }
+    temporario = os.path.join(destino, f"{_MANIFESTO}.{os.getpid()}.tmp")
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo)
+    os.replace(temporario, os.path.join(destino, _MANIFESTO))
+    return manifesto
+
+
+def _esquema_do_manifesto(manifesto):
+    return pa.ipc.read_schema(pa.py_buffer(bytes.fromhex(manifesto['esquema'])))
+
+
+def converter_para_parquet(caminho_csv, tipo, destino=None):
+    """Converte o CSV inteiro numa nova geração do Parquet particionado e retorna o manifesto.
+
+    O CSV é lido em blocos (ler_blocos) e cada bloco vai para o disco antes do próximo, então
+    a conversão funciona com históricos acima do teto de memória. Gerações antigas são
+    apagadas, menos a anterior, que leitores da versão passada ainda podem estar usando.
+    """
+    if ds is None:
+        raise RuntimeError("pyarrow não está instalado; não é possível gerar os arquivos Parquet.")
+    destino = destino or caminho_parquet(caminho_csv, tipo)
+    anterior = _ler_manifesto(destino)
+    assinatura = assinatura_arquivo(caminho_csv)
+    # Como em _leitura_completa: só as linhas completas que existiam no stat
+    lidos = _fim_linhas_completas(caminho_csv, assinatura[2])
+    geracao = f"{assinatura[1]}-{assinatura[2]}"
+    diretorio = os.path.join(destino, geracao)
+    # Outro processo pode estar convertendo a mesma versão: cada um grava a sua cópia
+    temporario = f"{diretorio}.{os.getpid()}.tmp"
+    shutil.rmtree(temporario, ignore_errors=True)
+
+    with fase(f"Parquet: conversão de {os.path.basename(caminho_csv)}"):
+        with io.BufferedReader(_TrechoArquivo(caminho_csv, lidos)) as trecho:
+            blocos = ler_blocos(trecho, tipo)
+            primeiro = next(blocos)
+            esquema = _esquema_parquet(primeiro, tipo)
+            arquivos = _gravar_blocos(itertools.chain([primeiro], blocos), temporario, tipo, esquema, "parte-0")
+    shutil.rmtree(diretorio, ignore_errors=True)
+    os.replace(temporario, diretorio)
+
+    with open(caminho_csv, 'rb') as arquivo:
+        cabecalho = arquivo.readline()
+    manifesto = _gravar_manifesto(destino, assinatura, geracao, _estado_leitura(caminho_csv, cabecalho, lidos, 0),
+                                  esquema, arquivos)
+
+    manter = {geracao, anterior['geracao'] if anterior else None}
+    for nome in os.listdir(destino):
+        if nome not in manter and os.path.isdir(os.path.join(destino, nome)) and not nome.endswith(".tmp"):
+            shutil.rmtree(os.path.join(destino, nome), ignore_errors=True)
+    return manifesto
+
+
+def _acrescentar_parquet(caminho_csv, tipo, destino, manifesto, assinatura):
+    """Grava só as linhas acrescentadas ao CSV desde o manifesto, em arquivos novos da mesma geração.
+
+    Retorna o manifesto novo, ou None quando o CSV foi reescrito e é preciso converter tudo.
+    """
+    estado = {'cabecalho': bytes.fromhex(manifesto['estado']['cabecalho']), 'lidos': manifesto['estado']['lidos'],
+              'impressao': bytes.fromhex(manifesto['estado']['impressao']), 'geracao': 0}
+    try:
+        lido = _ler_linhas_novas(caminho_csv, LEITORES[tipo], estado, assinatura)
+    except MemoriaExcedida:
+        return None
+    if lido is None:
+        return None
+    delta, estado_novo = lido
+    arquivos = list(manifesto['arquivos'])
+    if delta is not None and not delta.empty:
+        esquema = _esquema_do_manifesto(manifesto)
+        diretorio = os.path.join(destino, manifesto['geracao'])
+        with fase(f"Parquet: acréscimo a {os.path.basename(caminho_csv)}", len(delta)):
+            # Nome pelo ponto do CSV onde o acréscimo começa e pelo processo: nunca sobrescreve
+            # um arquivo que um manifesto já publicado lista
+            arquivos += _gravar_blocos([delta], diretorio, tipo, esquema, f"parte-{estado['lidos']}-{os.getpid()}")
+    return _gravar_manifesto(destino, assinatura, manifesto['geracao'], estado_novo,
+                             _esquema_do_manifesto(manifesto), arquivos)
+
+
+def garantir_parquet(caminho_csv, tipo):
+    """Manifesto do Parquet particionado da versão atual do CSV, convertendo ou acrescentando o que faltar.
+
+    Retorna None quando o pyarrow não está disponível.
+    """
+    if ds is None:
+        return None
+    destino = caminho_parquet(caminho_csv, tipo)
+    with _trava_do_arquivo(os.path.abspath(destino)):
+        os.makedirs(destino, exist_ok=True)
+        assinatura = assinatura_arquivo(caminho_csv)
+        manifesto = _ler_manifesto(destino)
+        if manifesto is not None and tuple(manifesto['assinatura']) == assinatura:
+            return manifesto
+        if manifesto is not None:
+            # O ERP só acrescenta linhas ao longo do dia: primeiro tenta gravar apenas o final novo
+            acrescentado = _acrescentar_parquet(caminho_csv, tipo, destino, manifesto, assinatura)
+            if acrescentado is not None:
+                return acrescentado
+        return converter_para_parquet(caminho_csv, tipo, destino)
+
+
+class Particoes:
+    """Leituras do Parquet particionado de um CSV, só das partições e colunas pedidas.
+
+    Segue a interface de consultas.Consultas no que as páginas usam (distintos e lotes), mais
+    ler(). `filtros` é um dict coluna -> valor, ou coluna -> lista de valores aceitos:
+    filtros nas colunas de partição descartam diretórios inteiros sem abri-los, e os demais são
+    aplicados pelo pyarrow durante a leitura. Os DataFrames saem com os tipos de ESQUEMAS.
+    Uma instância corresponde a uma versão do CSV e é compartilhada entre sessões.
+    """
+
+    def __init__(self, destino, manifesto, tipo):
+        self.tipo = tipo
+        diretorio = os.path.join(destino, manifesto['geracao'])
+        esquema = _esquema_do_manifesto(manifesto)
+        self._dataset = ds.dataset([os.path.join(diretorio, arquivo) for arquivo in manifesto['arquivos']],
+                                   schema=esquema, format="parquet", partitioning=_particionamento(esquema, tipo),
+                                   partition_base_dir=diretorio)
+        self._distintos = {}
+        self._trava = threading.Lock()
+
+    @staticmethod
+    def _expressao(filtros):
+        expressao = None
+        for coluna, valor in (filtros or {}).items():
+            termo = ds.field(coluna).isin(list(valor)) if isinstance(valor, (list, tuple, set)) else ds.field(coluna) == valor
+            expressao = termo if expressao is None else expressao & termo
+        return expressao
+
+    def _para_pandas(self, tabela, categorias=True):
+        df = tabela.to_pandas()
+        # Sem as categorias (exportação), os lotes mantêm o mesmo esquema do primeiro ao último
+        tipos = {coluna: tipo for coluna, tipo in ESQUEMAS[self.tipo].items()
+                 if coluna in df.columns and (categorias or tipo != 'category')}
+        return df.astype(tipos)
+
+    def ler(self, filtros=None, colunas=None):
+        with fase(f"Parquet: leitura de {self.tipo}") as medida:
+            df = self._para_pandas(self._dataset.to_table(columns=colunas, filter=self._expressao(filtros)))
+            medida.linhas(len(df))
+        return df
+
+    def distintos(self, colunas, filtros=None):
+        """Combinações distintas das colunas (ex.: para as opções dos filtros), guardadas por instância."""
+        chave = (tuple(colunas), repr(sorted((filtros or {}).items())))
+        with self._trava:
+            if chave in self._distintos:
+                return self._distintos[chave]
+        tabela = self._dataset.to_table(columns=list(colunas), filter=self._expressao(filtros))
+        df = self._para_pandas(tabela.group_by(list(colunas)).aggregate([]).select(list(colunas)))
+        with self._trava:
+            self._distintos[chave] = df
+        return df
+
+    def lotes(self, filtros=None, tamanho_lote=100_000):
+        """Linhas que atendem aos filtros, em DataFrames de ~`tamanho_lote` linhas (para exportação)."""
+        leitor = self._dataset.scanner(filter=self._expressao(filtros), batch_size=tamanho_lote).to_reader()
+        acumulados, linhas, primeiro = [], 0, True
+        for lote in leitor:
+            acumulados.append(lote)
+            linhas += lote.num_rows
+            if linhas >= tamanho_lote:
+                yield self._para_pandas(pa.Table.from_batches(acumulados, leitor.schema), categorias=False)
+                acumulados, linhas, primeiro = [], 0, False
+        # O primeiro lote sai mesmo sem linhas: leva as colunas para o cabeçalho e o esquema
+        if acumulados or primeiro:
+            yield self._para_pandas(pa.Table.from_batches(acumulados, leitor.schema), categorias=False)
+
+
+def abrir_particoes(caminho_csv, tipo):
+    """Particoes da versão atual do CSV, gerando ou atualizando o Parquet antes se preciso.
+
+    Retorna None quando o pyarrow não está instalado.
+    """
+    manifesto = garantir_parquet(caminho_csv, tipo)
+    if manifesto is None:
+        return None
+    destino = caminho_parquet(caminho_csv, tipo)
+    assinatura = tuple(manifesto['assinatura'])
+    with _TRAVA_CACHE:
+        entrada = _PARTICOES.get(destino)
+        if entrada is not None and entrada[0] == assinatura:
+            return entrada[1]
+    particoes = Particoes(destino, manifesto, tipo)
+    with _TRAVA_CACHE:
+        _PARTICOES[destino] = (assinatura, particoes)
+    return particoes
+
+
+if __name__ == "__main__":
+    # Ingestão em Parquet particionado: python dados.py --parquet
+    # Relatório de memória por coluna: python dados.py --memoria
+    opcoes = set(sys.argv[1:])
+    if not opcoes or not opcoes <= {"--parquet", "--memoria"}:
+        sys.exit("uso: python dados.py [--parquet] [--memoria]")
+    for tipo, caminho_csv in (("vendas", "df_vendas.csv"), ("compras", "df_compra.csv")):
+        if not os.path.exists(caminho_csv):
+            print(f"Arquivo {caminho_csv} não encontrado, ignorando.")
+            continue
+        if "--parquet" in opcoes:
+            manifesto = garantir_parquet(caminho_csv, tipo)
+            print(f"{caminho_csv} -> {caminho_parquet(caminho_csv, tipo)} ({len(manifesto['arquivos'])} arquivos)")
+        if "--memoria" in opcoes:
+            print(f"{caminho_csv}:")
+            print(relatorio_memoria(caminho_csv, tipo).to_string(float_format=lambda valor: f"{valor:.2f}"))
@@ -0,0 +1,153 @@
+"""Download das linhas por trás das tabelas e gráficos, em CSV ou Parquet, gerado em lotes.
+
+O arquivo só é montado quando o usuário clica no botão: o Streamlit executa o download
+adiado numa thread própria, fora do rerun, então a página não espera pela exportação. As
+linhas chegam em lotes de TAMANHO_LOTE_EXPORTACAO (fatias do DataFrame ou blocos lidos do
+banco SQL); cada lote é convertido, escrito no arquivo de saída e descartado.
+
+Não dá para transmitir o arquivo em fluxo: o download_button adiado só aceita o conteúdo
+pronto, e o MediaFileManager do Streamlit guarda esses bytes em memória para servi-los. O
+arquivo de saída fica, portanto, inteiro em memória; o pico de cada exportação é o arquivo
+mais um lote convertido. MEMORIA_EXPORTACAO_MB é o orçamento das exportações em andamento no
+processo: no máximo EXPORTACOES_SIMULTANEAS rodam ao mesmo tempo (as outras esperam a vez) e
+cada uma é interrompida ao passar de LIMITE_EXPORTACAO_MB, a parte do orçamento que cabe a
+ela. Os arquivos já entregues ao MediaFileManager ficam fora dessa conta até o Streamlit
+descartá-los. Os valores saem numéricos, sem formatação de moeda, e as datas no mesmo
+formato dos CSVs de origem.
+"""
+import io
+import os
+import threading
+
+import streamlit as st
+
+from medicao import fase, rodada
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional: sem ele só o CSV é oferecido
+    pa = pq = None
+
+
+TAMANHO_LOTE_EXPORTACAO = int(os.environ.get("TAMANHO_LOTE_EXPORTACAO", 100_000))
+EXPORTACOES_SIMULTANEAS = int(os.environ.get("EXPORTACOES_SIMULTANEAS", 2))
+MEMORIA_EXPORTACAO_MB = float(os.environ.get("MEMORIA_EXPORTACAO_MB", 400))
+# Com todas as vagas ocupadas, as exportações em andamento somam no máximo o orçamento
+LIMITE_EXPORTACAO_MB = MEMORIA_EXPORTACAO_MB / EXPORTACOES_SIMULTANEAS
+FORMATO_DATA_EXPORTACAO = "%d/%m/%Y"
+
+_VEZ_EXPORTACAO = threading.BoundedSemaphore(EXPORTACOES_SIMULTANEAS)
+
+
+class ExportacaoExcedida(MemoryError):
+    """O arquivo exportado passaria de LIMITE_EXPORTACAO_MB."""
+
+
+def lotes_dataframe(df, tamanho_lote=None):
+    """Fatias consecutivas do DataFrame (views, sem cópia das linhas); vazio, sai uma fatia vazia."""
+    tamanho_lote = tamanho_lote or TAMANHO_LOTE_EXPORTACAO
+    # A primeira fatia sai mesmo sem linhas: leva as colunas para o cabeçalho e o esquema
+    for inicio in range(0, max(len(df), 1), tamanho_lote):
+        yield df.iloc[inicio:inicio + tamanho_lote]
+
+
+def gerar_csv(lotes):
+    """Bytes do CSV (UTF-8, separado por vírgula), um pedaço por lote; o cabeçalho vai no primeiro."""
+    cabecalho = True
+    for lote in lotes:
+        yield lote.to_csv(index=False, header=cabecalho, date_format=FORMATO_DATA_EXPORTACAO).encode("utf-8")
+        cabecalho = False
+
+
+class _SaidaParcial(io.RawIOBase):
+    """Destino do ParquetWriter que guarda só o que foi escrito desde a última retirada."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        parte = bytes(dados)
+        self._partes.append(parte)
+        self._posicao += len(parte)
+        return len(parte)
+
+    def tell(self):
+        return self._posicao
+
+    def retirar(self):
+        partes, self._partes = self._partes, []
+        return b"".join(partes)
+
+
+def gerar_parquet(lotes):
+    """Bytes do Parquet, um row group por lote; o esquema é o do primeiro lote."""
+    saida = _SaidaParcial()
+    escritor = None
+    esquema = None
+    for lote in lotes:
+        tabela = pa.Table.from_pandas(lote, schema=esquema, preserve_index=False)
+        if escritor is None:
+            esquema = tabela.schema
+            escritor = pq.ParquetWriter(saida, esquema)
+        escritor.write_table(tabela)
+        yield saida.retirar()
+    if escritor is None:
+        return
+    escritor.close()
+    yield saida.retirar()
+
+
+GERADORES = {"csv": gerar_csv}
+if pa is not None:
+    GERADORES["parquet"] = gerar_parquet
+
+TIPOS_MIME = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+ROTULOS_FORMATO = {"csv": "CSV", "parquet": "Parquet"}
+
+
+def montar_arquivo(obter_lotes, formato, rotulo):
+    """Arquivo completo da exportação; chamado pelo Streamlit no clique, fora do rerun.
+
+    Levanta ExportacaoExcedida assim que o arquivo passaria de LIMITE_EXPORTACAO_MB.
+    """
+    limite = int(LIMITE_EXPORTACAO_MB * 1024 ** 2)
+    with _VEZ_EXPORTACAO, rodada(f"exportação: {rotulo} ({formato})", True):
+        linhas = 0
+
+        def contar(lotes):
+            nonlocal linhas
+            for lote in lotes:
+                linhas += len(lote)
+                yield lote
+
+        saida = io.BytesIO()
+        with fase(f"exportação {formato}") as medida:
+            for parte in GERADORES[formato](contar(obter_lotes())):
+                if saida.tell() + len(parte) > limite:
+                    raise ExportacaoExcedida(f"A exportação {rotulo} ({formato}) passa de {LIMITE_EXPORTACAO_MB:g} MB; "
+                                             "aplique mais filtros para exportar menos linhas.")
+                saida.write(parte)
+            medida.linhas(linhas)
+        return saida
+
+
+def botoes_exportacao(obter_lotes, nome_arquivo, chave):
+    """Botões de download das linhas de `obter_lotes()` (iterável de DataFrames), um por formato.
+
+    `obter_lotes` só é chamado no clique; ele deve filtrar ou consultar as linhas ali, para
+    que um rerun sem exportação não pague por elas. Como o tamanho só é conhecido no clique,
+    o limite fica avisado ao lado dos botões: acima dele, o download falha.
+    """
+    colunas = st.columns(len(GERADORES) + 2)
+    colunas[len(GERADORES)].caption(f"Até {LIMITE_EXPORTACAO_MB:g} MB por arquivo; para mais, aplique filtros.")
+    for coluna, formato in zip(colunas, GERADORES):
+        coluna.download_button(
+            f"Exportar {ROTULOS_FORMATO[formato]}",
+            lambda formato=formato: montar_arquivo(obter_lotes, formato, nome_arquivo),
+            file_name=f"{nome_arquivo}.{formato}", mime=TIPOS_MIME[formato],
+            key=f"{chave}_{formato}", on_click="ignore")
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+
+# Dimensões usadas pelos filtros das páginas de vendas e de compras
+DIMENSOES_VENDAS = ['Vendedor', 'Mes', 'Ano', 'situacao']
+DIMENSOES_COMPRAS = ['ano', 'mes', 'usuario', 'situacao pedido', 'tipo fornecedor']
+
+
+class IndiceFiltros:
+    """Índice de filtros de igualdade montado uma vez por dataset.
+
+    Cada dimensão é codificada em dicionário (valor -> código) e guarda, por valor, as
+    posições das linhas que o contêm. Um filtro parte da menor lista de linhas e confere as
+    demais dimensões pelos códigos, então o custo cresce com as linhas selecionadas e não
+    com o tamanho do dataset.
+    """
+
+    def __init__(self, df, colunas):
+        self.df = df
+        self._codigos = {}
+        self._valores = {}
+        self._linhas = {}
+
+        for coluna in colunas:
+            if coluna not in df.columns:
+                continue
+            codigos, valores = pd.factorize(df[coluna])
+            # Valores nulos recebem código -1 e ficam fora do índice
+            ordem = np.argsort(codigos, kind='stable')
+            limites = np.searchsorted(codigos, np.arange(len(valores) + 1), sorter=ordem)
+
+            self._codigos[coluna] = codigos
+            self._valores[coluna] = {valor: codigo for codigo, valor in enumerate(valores)}
+            self._linhas[coluna] = [ordem[limites[codigo]:limites[codigo + 1]] for codigo in range(len(valores))]
+
+    def valores(self, coluna):
+        return list(self._valores[coluna])
+
+    def linhas(self, filtros):
+        """Posições das linhas que atendem a todos os filtros (dict coluna -> valor).
+
+        Retorna None quando não há filtro, isto é, quando todas as linhas atendem.
+        """
+        selecionados = []
+        for coluna, valor in filtros.items():
+            codigo = self._valores[coluna].get(valor)
+            if codigo is None:
+                return np.empty(0, dtype=np.intp)
+            selecionados.append((coluna, codigo))
+
+        if not selecionados:
+            return None
+
+        selecionados.sort(key=lambda item: len(self._linhas[item[0]][item[1]]))
+        coluna, codigo = selecionados[0]
+        linhas = self._linhas[coluna][codigo]
+        for coluna, codigo in selecionados[1:]:
+            linhas = linhas[self._codigos[coluna][linhas] == codigo]
+        return linhas
+
+    def filtrar(self, filtros):
+        """Retorna as linhas filtradas sem copiar o dataset inteiro.
+
+        Sem filtros o próprio DataFrame indexado é retornado; em ambos os casos o resultado
+        deve ser tratado como somente leitura.
+        """
+        linhas = self.linhas(filtros)
+        if linhas is None:
+            return self.df
+        return self.df.take(linhas)
+
+
+class IndiceDatas:
+    """Linhas ordenadas por data, com somas acumuladas ao lado, para consultas por período.
+
+    O total de um período sai de duas buscas binárias nas datas ordenadas e da diferença
+    entre duas somas acumuladas; as linhas do período formam uma fatia contígua.
+    """
+
+    def __init__(self, df, coluna_data, coluna_valor):
+        self.coluna_data = coluna_data
+        self.coluna_valor = coluna_valor
+        self.df = df[df[coluna_data].notna()].sort_values(coluna_data, kind='stable')
+
+        self._datas = self.df[coluna_data].to_numpy()
+        valores = self.df[coluna_valor].fillna(0).to_numpy()
+        self._acumulado = np.concatenate([[0], np.cumsum(valores)])
+
+        # Série diária já somada; só é usada diretamente quando as datas não têm horário
+        dias = self.df[coluna_data].dt.normalize()
+        diario = self.df.groupby(dias)[coluna_valor].sum()
+        self._dias = diario.index.to_numpy()
+        self._acumulado_diario = np.concatenate([[0], np.cumsum(diario.to_numpy())])
+        self._somente_dias = bool((dias.to_numpy() == self._datas).all())
+
+    def _limites(self, inicio, fim):
+        # Período fechado [inicio, fim], como no filtro >= inicio & <= fim
+        inicio = np.datetime64(pd.Timestamp(inicio))
+        fim = np.datetime64(pd.Timestamp(fim))
+        return np.searchsorted(self._datas, inicio, side='left'), np.searchsorted(self._datas, fim, side='right')
+
+    def soma(self, inicio, fim):
+        posicao_inicio, posicao_fim = self._limites(inicio, fim)
+        if posicao_fim <= posicao_inicio:
+            return 0.0
+        return self._acumulado[posicao_fim] - self._acumulado[posicao_inicio]
+
+    def fatia(self, inicio, fim):
+        posicao_inicio, posicao_fim = self._limites(inicio, fim)
+        return self.df.iloc[posicao_inicio:max(posicao_inicio, posicao_fim)]
+
+    def vendas_diarias(self, inicio, fim):
+        """Soma por dia dentro do período, com as colunas 'Data' e a coluna de valor."""
+        if not self._somente_dias:
+            fatia = self.fatia(inicio, fim)
+            diario = fatia.groupby(fatia[self.coluna_data].dt.normalize())[self.coluna_valor].sum()
+            return diario.rename_axis('Data').reset_index()
+
+        inicio = np.datetime64(pd.Timestamp(inicio))
+        fim = np.datetime64(pd.Timestamp(fim))
+        posicao_inicio = np.searchsorted(self._dias, inicio, side='left')
+        posicao_fim = max(posicao_inicio, np.searchsorted(self._dias, fim, side='right'))
+        return pd.DataFrame({
+            'Data': self._dias[posicao_inicio:posicao_fim],
+            self.coluna_valor: np.diff(self._acumulado_diario[posicao_inicio:posicao_fim + 1]),
+        })
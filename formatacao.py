@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow é opcional; sem ele a formatação usa f-strings
+    pa = pc = None
+
+
+# Separadores decimal e de milhar do pt-BR para o d3-format usado pelo Plotly (layout.separators)
+SEPARADORES_PT_BR = ',.'
+
+# Formatação feita no navegador: o Plotly aplica o template a cada barra/ponto
+TEMPLATE_MOEDA_Y = 'R$ %{y:,.2f}'
+
+
+def _grupos_de_milhar(inteiros):
+    """Quebra inteiros não negativos em grupos de 3 dígitos, do mais significativo ao menos."""
+    maior = int(inteiros.max()) if len(inteiros) else 0
+    quantidade = max(1, (len(str(maior)) + 2) // 3)
+    return [(inteiros // 1000 ** posicao) % 1000 for posicao in reversed(range(quantidade))]
+
+
+def _montar_textos_pyarrow(simbolo_moeda, negativos, inteiros, decimais):
+    # Todos os passos rodam nos kernels de string do Arrow, sem laço Python por valor
+    grupos = [pc.utf8_lpad(pc.cast(pa.array(grupo), pa.string()), 3, '0') for grupo in _grupos_de_milhar(inteiros)]
+    # '000.001.234' -> '1.234'; zero vira vazio e é tratado no if_else
+    parte_inteira = pc.utf8_ltrim(pc.binary_join_element_wise(*grupos, '.'), '0.')
+    parte_inteira = pc.if_else(pa.array(inteiros == 0), '0', parte_inteira)
+    parte_decimal = pc.utf8_lpad(pc.cast(pa.array(decimais), pa.string()), 2, '0')
+    sinal = pc.if_else(pa.array(negativos), '-', '')
+    textos = pc.binary_join_element_wise(f"{simbolo_moeda} ", sinal, parte_inteira, ',', parte_decimal, '')
+    return textos.to_numpy(zero_copy_only=False)
+
+
+def formatar_moeda_serie(valores, simbolo_moeda='R$'):
+    """Versão vetorizada de formatar_moeda: formata uma Series ou array inteiro de uma vez.
+
+    Valores nulos viram ''. O índice de uma Series de entrada é preservado.
+    """
+    serie = pd.Series(valores, dtype='float64')
+    nulos = serie.isna().to_numpy()
+
+    if pc is None:
+        # Sem pyarrow: laço simples com '_' como separador de milhar, evitando o replace por 'X'
+        textos = np.array([f"{simbolo_moeda} {valor:_.2f}".replace('.', ',').replace('_', '.')
+                           for valor in serie.fillna(0).tolist()], dtype=object)
+    else:
+        # Em longdouble o produto por 100 é exato (onde a plataforma tem 80 bits), e o
+        # arredondamento fica igual ao do f-string de formatar_moeda
+        absolutos = serie.abs().fillna(0).to_numpy(dtype=np.longdouble)
+        centavos = np.rint(absolutos * 100).astype('int64')
+        textos = _montar_textos_pyarrow(simbolo_moeda, serie.to_numpy() < 0, centavos // 100, centavos % 100)
+
+    textos[nulos] = ''
+    return pd.Series(textos, index=serie.index, dtype=object)
+
+
+def aplicar_moeda_no_grafico(fig):
+    """Formata rótulos e hover (eixo y) de um gráfico como R$ no próprio navegador, em pt-BR."""
+    fig.update_traces(texttemplate=TEMPLATE_MOEDA_Y, hovertemplate=TEMPLATE_MOEDA_Y + '<extra></extra>')
+    fig.update_layout(separators=SEPARADORES_PT_BR)
+    return fig
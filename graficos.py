@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+
+# Pontos por série a partir dos quais uma linha é reduzida antes de ir para o navegador
+MAX_PONTOS_LINHA = 1500
+# Outliers enviados por caixa; ficam os mais distantes da mediana
+MAX_OUTLIERS_CAIXA = 100
+
+
+def resumir_caixas(grupos, valores):
+    """Quartis, cercas e outliers de `valores` por grupo, como o Plotly calcularia no navegador.
+
+    As cercas seguem a regra de 1,5 IQR: são o menor e o maior valor dentro de
+    [Q1 - 1,5 IQR, Q3 + 1,5 IQR]. Retorna um DataFrame indexado pelo grupo, com as colunas
+    q1, mediana, q3, cerca_inferior, cerca_superior e outliers (array por grupo).
+    """
+    valores = pd.Series(np.asarray(valores, dtype='float64'))
+    grupos = pd.Series(np.asarray(grupos))
+    validos = valores.notna()
+    valores, grupos = valores[validos], grupos[validos]
+
+    quartis = valores.groupby(grupos).quantile([0.25, 0.5, 0.75]).unstack()
+    resumo = pd.DataFrame({'q1': quartis[0.25], 'mediana': quartis[0.5], 'q3': quartis[0.75]})
+
+    iqr = resumo['q3'] - resumo['q1']
+    limite_inferior = grupos.map(resumo['q1'] - 1.5 * iqr)
+    limite_superior = grupos.map(resumo['q3'] + 1.5 * iqr)
+    dentro = (valores >= limite_inferior) & (valores <= limite_superior)
+    resumo['cerca_inferior'] = valores[dentro].groupby(grupos[dentro]).min()
+    resumo['cerca_superior'] = valores[dentro].groupby(grupos[dentro]).max()
+
+    outliers = {}
+    for grupo, fora in valores[~dentro].groupby(grupos[~dentro]):
+        distancia = (fora - resumo.at[grupo, 'mediana']).abs()
+        outliers[grupo] = fora[distancia.nlargest(MAX_OUTLIERS_CAIXA).index].to_numpy()
+    resumo['outliers'] = [outliers.get(grupo, np.empty(0)) for grupo in resumo.index]
+    return resumo
+
+
+def traco_caixa(grupos, valores, nome, rotulos=None, **kwargs):
+    """go.Box com as estatísticas já calculadas: o navegador recebe 5 números e os outliers por caixa.
+
+    `rotulos` mapeia cada grupo para o texto do eixo x; sem ele, o próprio grupo é usado.
+    """
+    resumo = resumir_caixas(grupos, valores)
+    x = [rotulos[grupo] if rotulos is not None else grupo for grupo in resumo.index]
+    return go.Box(
+        x=x,
+        q1=resumo['q1'].tolist(),
+        median=resumo['mediana'].tolist(),
+        q3=resumo['q3'].tolist(),
+        lowerfence=resumo['cerca_inferior'].tolist(),
+        upperfence=resumo['cerca_superior'].tolist(),
+        # Com q1/median/q3 informados, y traz só os pontos a desenhar de cada caixa
+        y=[outliers.tolist() for outliers in resumo['outliers']],
+        boxpoints='outliers',
+        name=nome,
+        **kwargs,
+    )
+
+
+def reduzir_pontos(df, coluna_valor, max_pontos=None):
+    """Reduz uma série ordenada a no máximo `max_pontos` linhas, mantendo mínimo e máximo de cada trecho.
+
+    Picos e vales continuam visíveis no gráfico, mas o tamanho enviado ao navegador deixa
+    de crescer com o período. Séries curtas são retornadas sem alteração.
+    """
+    max_pontos = max_pontos or MAX_PONTOS_LINHA
+    if len(df) <= max_pontos:
+        return df
+
+    trechos = max_pontos // 2
+    valores = df[coluna_valor].to_numpy(dtype='float64')
+    limites = np.linspace(0, len(valores), trechos + 1).astype(int)
+    inicios = limites[:-1]
+    # Posição do mínimo e do máximo de cada trecho, sem laço por ponto
+    tamanhos = np.diff(limites)
+    maior_trecho = tamanhos.max()
+    posicoes = inicios[:, None] + np.minimum(np.arange(maior_trecho), tamanhos[:, None] - 1)
+    janelas = valores[posicoes]
+    # Valores vazios não podem ser escolhidos como mínimo ou máximo do trecho
+    minimos = posicoes[np.arange(trechos), np.nan_to_num(janelas, nan=np.inf).argmin(axis=1)]
+    maximos = posicoes[np.arange(trechos), np.nan_to_num(janelas, nan=-np.inf).argmax(axis=1)]
+    return df.iloc[np.unique(np.concatenate([minimos, maximos]))]
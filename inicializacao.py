@@ -0,0 +1,109 @@
+"""Partida a frio do painel: medição do tempo até a primeira página e aquecimento opcional.
+
+A primeira execução do script em um processo abre a medição da partida; ficam registradas as
+importações, a primeira carga dos dados (thread de atualização), o aquecimento e a primeira
+página exibida com dados. Ao fim, o registro vai para o logger 'desempenho' como uma rodada
+("partida a frio") e fica disponível em medicao_partida() para o painel de depuração.
+
+Com AQUECIMENTO=1 (padrão), a thread de atualização, antes da primeira carga, importa os
+módulos das páginas e monta uma figura de cada tipo usado, para que o primeiro usuário não
+pague a inicialização do plotly. Antes de subir o servidor, `python inicializacao.py` faz o
+aquecimento em disco: grava as versões mapeadas dos CSVs, os snapshots de métricas e, com
+BACKEND_CONSULTAS=duckdb, os bancos SQL; o primeiro processo só mapeia o que já está pronto.
+"""
+import os
+import threading
+import time
+
+from medicao import Medicao
+
+
+AQUECIMENTO = os.environ.get("AQUECIMENTO", "1") == "1"
+
+_PARTIDA = None
+_TRAVA_PARTIDA = threading.Lock()
+
+
+def iniciar_partida():
+    """Abre a medição da partida na primeira execução do script do processo; nas demais não faz nada."""
+    global _PARTIDA
+    with _TRAVA_PARTIDA:
+        if _PARTIDA is None:
+            _PARTIDA = Medicao("partida a frio")
+
+
+def registrar_partida(nome, inicio=None):
+    """Registra, uma vez por processo, a etapa `nome` da partida, de `inicio` (padrão: início da partida) até agora."""
+    partida = _PARTIDA
+    if partida is None or partida.fim is not None:
+        return
+    with _TRAVA_PARTIDA:
+        if any(etapa['fase'] == nome for etapa in partida.fases):
+            return
+        partida.registrar(nome, partida.inicio if inicio is None else inicio, time.perf_counter())
+
+
+def concluir_partida():
+    """Fecha e exporta a medição da partida (chamada ao fim de cada rerun que exibiu dados)."""
+    partida = _PARTIDA
+    if partida is None or partida.fim is not None:
+        return
+    registrar_partida("primeira página")
+    with _TRAVA_PARTIDA:
+        if partida.fim is not None:
+            return
+        partida.fim = time.perf_counter()
+    partida.exportar()
+
+
+def medicao_partida():
+    """Medição da partida deste processo (None antes da primeira execução do script)."""
+    return _PARTIDA
+
+
+def aquecer_figuras():
+    """Importa as páginas e monta uma figura de cada tipo usado (barras, pizza, linhas, caixas)."""
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    import compras  # noqa: F401 -- só para deixar o módulo importado
+    from graficos import traco_caixa
+    from meu_app import criar_grafico_barras
+
+    exemplo = pd.DataFrame({'Linha': ['A', 'B'], 'Valor_Total_Item': [1.0, 2.0]})
+    figuras = [
+        criar_grafico_barras(exemplo, 'Linha', 'Valor_Total_Item', '', {}),
+        px.pie(exemplo, names='Linha', values='Valor_Total_Item'),
+        px.line(exemplo, x='Linha', y='Valor_Total_Item', template="plotly_white"),
+        go.Figure(traco_caixa(exemplo['Linha'], exemplo['Valor_Total_Item'], 'Valor_Total_Item')),
+    ]
+    # A serialização é a mesma feita pelo st.plotly_chart na exibição
+    for figura in figuras:
+        pio.to_json(figura, validate=False)
+
+
+def aquecer_disco(caminhos):
+    """Deixa prontos em disco os artefatos que a primeira carga de cada processo reaproveita."""
+    from calculos import gerar_snapshots
+    from consultas import abrir_consultas
+    from dados import LEITORES, carregar_dataset
+
+    prontos = {}
+    for tipo, caminho in caminhos.items():
+        if not os.path.exists(caminho):
+            continue
+        inicio = time.perf_counter()
+        # A leitura completa grava a versão mapeada (dados_mapeados/) quando o pyarrow está instalado
+        carregar_dataset(caminho, LEITORES[tipo])
+        abrir_consultas(caminho, tipo)
+        prontos[tipo] = time.perf_counter() - inicio
+    gerar_snapshots(caminhos.get("vendas", ""), caminhos.get("compras", ""))
+    return prontos
+
+
+if __name__ == "__main__":
+    # Passo de implantação, antes de subir o servidor: python inicializacao.py
+    for tipo, segundos in aquecer_disco({"vendas": "df_vendas.csv", "compras": "df_compra.csv"}).items():
+        print(f"{tipo}: pronto em {segundos:.2f} s")
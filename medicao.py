@@ -0,0 +1,202 @@
+"""Medição do tempo de cada fase da renderização (carga, datas, filtros, agregações, figuras, exibição).
+
+Cada rerun (ou rerun de fragmento) abre uma rodada; com a medição ligada (painel de
+depuração), `with fase(nome) as f:` registra a duração e, com f.linhas(n), quantas linhas a
+fase produziu. Com ela desligada a rodada só guarda o instante de início, e fase() devolve
+um objeto nulo compartilhado: o custo é uma leitura do relógio por rodada e uma leitura de
+ContextVar por fase.
+
+Ao fim de toda rodada, ligada ou não, o registro vai para o logger 'desempenho' como uma
+linha JSON (sem as fases, se desligada) e, se LOG_DESEMPENHO apontar para um arquivo, é
+acrescentado a ele. Se a aplicação não configurar esse logger, ele escreve em stderr no
+nível NIVEL_LOG_DESEMPENHO (INFO; WARNING silencia os registros).
+"""
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+# Estado inicial do painel de depuração; o usuário pode ligá-lo e desligá-lo na barra lateral
+ATIVA_POR_PADRAO = os.environ.get("DEPURACAO_DESEMPENHO", "0") == "1"
+CHAVE_ESTADO = "depuracao_desempenho"
+ARQUIVO_LOG = os.environ.get("LOG_DESEMPENHO")
+NIVEL_LOG = os.environ.get("NIVEL_LOG_DESEMPENHO", "INFO")
+
+_logger = logging.getLogger("desempenho")
+if not _logger.handlers:
+    # Sem handler, os registros INFO iriam para o handler de último recurso, que só mostra WARNING
+    _manipulador = logging.StreamHandler()
+    _manipulador.setFormatter(logging.Formatter("%(message)s"))
+    _logger.addHandler(_manipulador)
+    _logger.setLevel(NIVEL_LOG)
+    _logger.propagate = False
+_atual = contextvars.ContextVar("medicao", default=None)
+_rodadas = itertools.count(1)
+_TRAVA_LOG = threading.Lock()
+
+
+class _FaseNula:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        return False
+
+    def linhas(self, quantidade):
+        pass
+
+
+_NULA = _FaseNula()
+
+
+def _exportar(registro):
+    linha = json.dumps(registro, ensure_ascii=False, default=str)
+    _logger.info(linha)
+    if ARQUIVO_LOG:
+        with _TRAVA_LOG, open(ARQUIVO_LOG, "a", encoding="utf-8") as arquivo:
+            arquivo.write(linha + "\n")
+
+
+class _Fase:
+    __slots__ = ('_medicao', '_nome', '_linhas', '_inicio')
+
+    def __init__(self, medicao, nome, linhas):
+        self._medicao = medicao
+        self._nome = nome
+        self._linhas = linhas
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        self._medicao.registrar(self._nome, self._inicio, time.perf_counter(), self._linhas)
+        return False
+
+    def linhas(self, quantidade):
+        self._linhas = None if quantidade is None else int(quantidade)
+
+
+class Medicao:
+    """Fases medidas em uma rodada; as fases podem vir das threads do pool de gráficos."""
+
+    def __init__(self, rotulo):
+        self.rotulo = rotulo
+        self.rodada = next(_rodadas)
+        self.data = datetime.now().isoformat(timespec='milliseconds')
+        self.inicio = time.perf_counter()
+        self.fim = None
+        self.fases = []
+
+    def fase(self, nome, linhas=None):
+        return _Fase(self, nome, linhas)
+
+    def registrar(self, nome, inicio, fim, linhas=None):
+        # list.append é atômico; as threads do pool registram sem trava
+        self.fases.append({
+            'fase': nome,
+            'inicio_ms': round((inicio - self.inicio) * 1000, 3),
+            'duracao_ms': round((fim - inicio) * 1000, 3),
+            'linhas': linhas,
+            'thread': threading.current_thread().name,
+        })
+
+    @property
+    def total_ms(self):
+        fim = self.fim if self.fim is not None else time.perf_counter()
+        return round((fim - self.inicio) * 1000, 3)
+
+    def como_dict(self):
+        return {
+            'rodada': self.rodada,
+            'data': self.data,
+            'rotulo': self.rotulo,
+            'total_ms': self.total_ms,
+            'fases': sorted(self.fases, key=lambda fase: fase['inicio_ms']),
+        }
+
+    def exportar(self):
+        _exportar(self.como_dict())
+
+
+class _RodadaSimples:
+    """Rodada com a medição desligada: só o tempo total, sem fases."""
+
+    __slots__ = ('rotulo', 'inicio')
+
+    def __init__(self, rotulo):
+        self.rotulo = rotulo
+        self.inicio = time.perf_counter()
+
+    def fase(self, nome, linhas=None):
+        return _NULA
+
+    def registrar(self, nome, inicio, fim, linhas=None):
+        pass
+
+    def exportar(self):
+        _exportar({
+            'rodada': next(_rodadas),
+            'data': datetime.now().isoformat(timespec='milliseconds'),
+            'rotulo': self.rotulo,
+            'total_ms': round((time.perf_counter() - self.inicio) * 1000, 3),
+            'fases': None,
+        })
+
+
+def medicao_atual():
+    return _atual.get()
+
+
+def fase(nome, linhas=None):
+    medicao = _atual.get()
+    if medicao is None:
+        return _NULA
+    return medicao.fase(nome, linhas)
+
+
+def depuracao_ativa(estado):
+    """Se a medição está ligada, a partir do session_state (ou outro dict) da sessão."""
+    return bool(estado.get(CHAVE_ESTADO, ATIVA_POR_PADRAO))
+
+
+@contextmanager
+def rodada(rotulo, ativa):
+    """Abre uma rodada de medição, se não houver outra aberta nesta thread.
+
+    Dentro de uma rodada já aberta (ex.: a página chamada pelo app) não faz nada, então a
+    mesma função pode ser ponto de entrada de um rerun completo ou de um rerun de fragmento.
+    Sem `ativa`, a rodada registra só o tempo total. Produz a Medicao aberta, ou None se a
+    rodada não mede as fases.
+    """
+    if _atual.get() is not None:
+        yield None
+        return
+
+    medicao = Medicao(rotulo) if ativa else _RodadaSimples(rotulo)
+    token = _atual.set(medicao)
+    try:
+        yield medicao if ativa else None
+    finally:
+        _atual.reset(token)
+        if ativa:
+            medicao.fim = time.perf_counter()
+        medicao.exportar()
+
+
+def medir_rodada(rotulo, ativa):
+    """Decorador para fragmentos: `ativa()` decide a cada chamada se a rodada é medida."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with rodada(rotulo, ativa()):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
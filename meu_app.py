@@ -1,50 +1,46 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import streamlit.components.v1 as components
 import plotly.graph_objects as go
+from cache_resultados import CACHE_RESULTADOS
+from calculos import (agrupar_e_somar, calcular_metricas, calcular_performance_vendedores, consultar_snapshot,
+                      produtos_mais_vendidos)
+from consultas import MEDIDAS_VENDAS, metricas_vendas, vendas_por_vendedor_com_meta
+from cubo import calcular_metricas_cubo
+from exportacao import TAMANHO_LOTE_EXPORTACAO, botoes_exportacao, lotes_dataframe
+from filtros import IndiceDatas
+from formatacao import SEPARADORES_PT_BR, TEMPLATE_MOEDA_Y, aplicar_moeda_no_grafico, formatar_moeda_serie
+from graficos import reduzir_pontos, traco_caixa
+from medicao import depuracao_ativa, fase, medir_rodada
+from paralelo import exibir_em_ordem
+from tabelas import exibir_tabela_paginada
 
 
-METAS_VENDEDORES = {
-    "VERIDIANA SERRA": 600000.00,
-    "CESAR GAMA": 450000.00,
-    "FABIAN SILVA": 400000.00,
-    "DENIS SOUSA": 1050000.00,
-    "THIAGO SOUSA": 200000.00
-}
-
 def formatar_moeda(valor, simbolo_moeda="R$"):
     if pd.isna(valor):
         return ''
     return f"{simbolo_moeda} {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
-def calcular_metricas(df):
-    total_nf = len(df['NF'].unique())
-    total_qtd_produto = df['Qtd_Produto'].sum()
-    valor_total_item = df['Valor_Total_Item'].sum()
-    total_custo_compra = df['Total_Custo_Compra'].sum()
-    total_lucro_venda = df['Total_Lucro_Venda_Item'].sum()
-
-    ticket_medio_geral = valor_total_item / total_nf if total_nf > 0 else 0
-    porcentagem_lucro_venda = (total_lucro_venda / valor_total_item) * 100 if valor_total_item > 0 else 0
-
-    return total_nf, total_qtd_produto, valor_total_item, total_custo_compra, total_lucro_venda, ticket_medio_geral, porcentagem_lucro_venda
-
-def agrupar_e_somar(df, coluna_agrupamento):
-    return df.groupby(coluna_agrupamento).agg(
-        {'Valor_Total_Item': 'sum', 'Total_Custo_Compra': 'sum', 'Total_Lucro_Venda_Item': 'sum'}
-    ).reset_index()
-
-def produtos_mais_vendidos(df, top_n=10, ordenar_por='Valor_Total_Item'):
-    df_agrupado = df.groupby('Descricao_produto')[ordenar_por].sum().reset_index()
-    df_ordenado = df_agrupado.sort_values(by=ordenar_por, ascending=False)
-    return df_ordenado.head(top_n)
+def filtros_para_leitura(vendedor='Todos', mes='Todos', ano='Todos', situacao='Faturada'):
+    filtros = {}
+    if vendedor != 'Todos':
+        filtros['Vendedor'] = vendedor
+    if mes != 'Todos':
+        filtros['Mes'] = int(mes)
+    if ano != 'Todos':
+        filtros['Ano'] = int(ano)
+    if situacao != 'Todos':
+        filtros['situacao'] = situacao
+    return filtros
 
+def aplicar_filtros(df, vendedor='Todos', mes='Todos', ano='Todos', situacao='Faturada', indice=None):
 
-def aplicar_filtros(df, vendedor='Todos', mes='Todos', ano='Todos', situacao='Faturada'):
+    if indice is not None:
+        # Índice montado na carga: interseção das linhas de cada valor, sem máscaras sobre o df inteiro
+        return indice.filtrar(filtros_para_leitura(vendedor, mes, ano, situacao))
 
-    df_filtrado = df.copy()
+    df_filtrado = df
 
     if vendedor != 'Todos':
         df_filtrado = df_filtrado[df_filtrado['Vendedor'] == vendedor]
@@ -58,16 +54,14 @@ def aplicar_filtros(df, vendedor='Todos', mes='Todos', ano='Todos', situacao='Fa
     return df_filtrado
 
 def criar_grafico_barras(df, x, y, title, labels):
-    
-    df['Valor_Monetario'] = df[y].apply(formatar_moeda)
 
     fig = px.bar(df, x=x, y=y, title=title, labels=labels, 
-                 color=y, text=df['Valor_Monetario'], template="plotly_white", 
-                 hover_data={x: False, y: False, 'Valor_Monetario': True})  
+                 color=y, template="plotly_white")
 
     fig.update_traces(marker=dict(line=dict(color='black', width=1)), 
                       hoverlabel=dict(bgcolor="black", font_size=22, 
                                       font_family="Arial, sans-serif"))
+    aplicar_moeda_no_grafico(fig)
 
     fig.update_layout(yaxis_title=labels.get(y, y), 
                       xaxis_title=labels.get(x, x), 
@@ -80,17 +74,15 @@ def criar_grafico_vendas_diarias(df, mes, ano):
 
     vendas_diarias = df_filtrado.groupby('Dia')['Valor_Total_Item'].sum().reset_index()
 
-    vendas_diarias["Valor_Monetario"] = vendas_diarias["Valor_Total_Item"].apply(formatar_moeda)
-
     fig = px.bar(vendas_diarias, x='Dia', y='Valor_Total_Item',
                  title=f'Vendas Diárias em {mes}/{ano}',
                  labels={'Dia': 'Dia', 'Valor_Total_Item': 'Valor Total de Venda'},
-                 color='Valor_Total_Item', text=vendas_diarias["Valor_Monetario"],
-                 template="plotly_white", hover_data={'Valor_Total_Item': False,'Valor_Monetario': True})
+                 color='Valor_Total_Item', template="plotly_white")
 
     fig.update_traces(marker=dict(line=dict(color='black', width=1)),
                       hoverlabel=dict(bgcolor="black", font_size=22,
                                        font_family="Arial-bold, sans-serif"))
+    aplicar_moeda_no_grafico(fig)
     
 
     fig.update_layout(yaxis_title='Valor Total de Venda',
@@ -100,23 +92,6 @@ def criar_grafico_vendas_diarias(df, mes, ano):
     return fig
 
 
-def calcular_performance_vendedores(df_vendas):
-    vendas_por_vendedor_filtrado = df_vendas[
-        (df_vendas['Vendedor'] != 'GERAL VENDAS') & (df_vendas['Vendedor'] != 'NATALIA SILVA') & (df_vendas['Vendedor'] != 'JORGE TOTE')
-    ].copy()
-
-    # Realizar o groupby e os cálculos no DataFrame filtrado
-    vendas_por_vendedor = vendas_por_vendedor_filtrado.groupby('Vendedor')['Valor_Total_Item'].sum().reset_index()
-    vendas_por_vendedor = vendas_por_vendedor.rename(columns={'Valor_Total_Item': 'Total_Vendido'})
-
-    vendas_por_vendedor['Meta'] = vendas_por_vendedor['Vendedor'].map(METAS_VENDEDORES).fillna(0)
-    vendas_por_vendedor['Porcentagem_Atingida'] = (vendas_por_vendedor['Total_Vendido'] / vendas_por_vendedor['Meta'] * 100).fillna(0).round(2)
-    vendas_por_vendedor['Meta_Formatada'] = vendas_por_vendedor['Meta'].apply(formatar_moeda)
-    vendas_por_vendedor['Total_Vendido_Formatado'] = vendas_por_vendedor['Total_Vendido'].apply(formatar_moeda)
-    vendas_por_vendedor['Porcentagem_Texto'] = vendas_por_vendedor['Porcentagem_Atingida'].astype(str) + '%'
-
-    return vendas_por_vendedor
-
 def criar_grafico_performance_vendedores(df_performance):
     fig = go.Figure()
 
@@ -129,7 +104,7 @@ def criar_grafico_performance_vendedores(df_performance):
         y=df_performance['Meta'],
         name='Meta',
         marker=dict(color='lightgrey'),
-        text=df_performance['Meta_Formatada'],
+        texttemplate=TEMPLATE_MOEDA_Y,
         textposition='outside',
         insidetextanchor='end',
         textfont=dict(size=32, color='#fff', family="Arial, sans-serif")
@@ -140,7 +115,7 @@ def criar_grafico_performance_vendedores(df_performance):
         y=df_performance['Total_Vendido'],
         name='Total Vendido',
         marker_color='skyblue',
-        text=df_performance['Total_Vendido_Formatado'],
+        texttemplate=TEMPLATE_MOEDA_Y,
         textposition='inside',
         insidetextanchor='middle',
         textfont=dict(size=28, color='#000', family="Arial, sans-serif")
@@ -174,6 +149,7 @@ def criar_grafico_performance_vendedores(df_performance):
         yaxis_title='Valor (R$)',
         yaxis=dict(tickformat=',.2f'),
         template='plotly_white',
+        separators=SEPARADORES_PT_BR,
         barmode='overlay', # sobrepor as barras
         showlegend=True,
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
@@ -189,21 +165,35 @@ def criar_grafico_performance_vendedores(df_performance):
 
 
 
-def renderizar_pagina_vendas(df):
-    
-    print(f"Número de valores NaN na coluna 'Mes': {df['Mes'].isnull().sum()}")
+def medicao_ligada():
+    return depuracao_ativa(st.session_state)
 
-    vendedores = df['Vendedor'].unique().tolist()
+
+# As páginas são fragmentos: um widget da página reexecuta só a própria página, não o script todo;
+# cada rerun de fragmento é uma rodada de medição própria quando a depuração está ligada
+@st.fragment
+@medir_rodada("Visão Geral", medicao_ligada)
+def renderizar_pagina_vendas(df, cubo=None, snapshot=None, consultas=None, versao=None, particoes=None):
+
+    # Com o cubo, as opções dos filtros saem do cubóide base em vez do dataset bruto
+    # (df pode ser None quando o histórico só está disponível agregado ou no backend SQL)
+    if consultas is not None:
+        df_opcoes = consultas.distintos(['Vendedor', 'Mes', 'Ano', 'situacao'])
+    else:
+        df_opcoes = cubo['base'] if cubo is not None else df
+
+    print(f"Número de valores NaN na coluna 'Mes': {df_opcoes['Mes'].isnull().sum()}")
+
+    vendedores = df_opcoes['Vendedor'].unique().tolist()
     meses_abreviados = {
         1: 'Jan', 2: 'Fev', 3: 'Mar', 4: 'Abr', 5: 'Mai', 6: 'Jun',
         7: 'Jul', 8: 'Ago', 9: 'Set', 10: 'Out', 11: 'Nov', 12: 'Dez'
     }
     
-    meses_numericos = sorted(df['Mes'].unique().tolist(), key=int)
+    meses_numericos = sorted(df_opcoes['Mes'].unique().tolist(), key=int)
     meses_para_exibir = [meses_abreviados[mes] for mes in meses_numericos]
-    ano = sorted(df['Ano'].unique().tolist(), key=int)
-    situacao = df['situacao'].unique().tolist()
-    cliente = df['Cliente'].unique().tolist()
+    ano = sorted(df_opcoes['Ano'].unique().tolist(), key=int)
+    situacao = df_opcoes['situacao'].unique().tolist()
 
     with st.expander("Filtros"):
         col1, col2, col3, col4 = st.columns(4)
@@ -227,9 +217,50 @@ def renderizar_pagina_vendas(df):
     else:
         mes_selecionado_num = 'Todos'
 
-    df_filtrado = aplicar_filtros(df, vendedor_selecionado, mes_selecionado_num, ano_selecionado, situacao_selecionada)
-  
-    total_nf, total_qtd_produto, valor_total_item, total_custo_compra, total_lucro_venda, ticket_medio_geral, porcentagem_lucro_venda = calcular_metricas(df_filtrado)
+    filtros_selecionados = (vendedor_selecionado, mes_selecionado_num, ano_selecionado, situacao_selecionada)
+
+    # Combinações já exibidas (nesta ou em outra sessão) saem do cache com métricas e figuras
+    # prontas, sem filtrar nem agregar; `versao` (assinatura do arquivo) separa as versões do dataset
+    chave_cache = (versao, "Visão Geral", filtros_selecionados) if versao is not None else None
+    em_cache = CACHE_RESULTADOS.obter(chave_cache) if chave_cache is not None else None
+    if em_cache is not None:
+        metricas, resultados = em_cache
+    else:
+        resultados = None
+        # Cartões servidos pelo snapshot pré-calculado (python calculos.py) quando ele é da versão atual do CSV
+        metricas = consultar_snapshot(snapshot, "vendas", filtros_para_leitura(*filtros_selecionados))
+
+        if consultas is not None:
+            # Backend SQL: cartões e cada gráfico saem de uma consulta agregada no DuckDB
+            filtros = filtros_para_leitura(*filtros_selecionados)
+            if metricas is None:
+                with fase("métricas"):
+                    metricas = metricas_vendas(consultas, filtros)
+        elif cubo is not None:
+            # Cartões e gráficos respondidos pelos cubóides pré-agregados na carga
+            def filtrar_cuboide(nome):
+                return aplicar_filtros(cubo[nome], *filtros_selecionados, indice=cubo['indices'][nome])
+
+            with fase("aplicar_filtros") as medida:
+                df_filtrado = filtrar_cuboide('base')
+                df_notas = filtrar_cuboide('notas')
+                df_linhas = filtrar_cuboide('linha')
+                df_produtos = filtrar_cuboide('produto')
+                df_clientes = filtrar_cuboide('cliente')
+                medida.linhas(len(df_filtrado))
+            if metricas is None:
+                with fase("métricas"):
+                    metricas = calcular_metricas_cubo(df_filtrado, df_notas)
+        else:
+            with fase("aplicar_filtros", len(df)) as medida:
+                df_filtrado = aplicar_filtros(df, *filtros_selecionados)
+                medida.linhas(len(df_filtrado))
+            df_linhas = df_produtos = df_clientes = df_filtrado
+            if metricas is None:
+                with fase("métricas"):
+                    metricas = calcular_metricas(df_filtrado)
+
+    total_nf, total_qtd_produto, valor_total_item, total_custo_compra, total_lucro_venda, ticket_medio_geral, porcentagem_lucro_venda = metricas
 
     col1, col2, col3, col4, col5 = st.columns(5)
     col1.metric("Total de Notas", f"{total_nf}")
@@ -238,90 +269,136 @@ def renderizar_pagina_vendas(df):
     col4.metric("Custo Total", formatar_moeda(total_custo_compra))
     col5.metric("Margem Bruta", formatar_moeda(total_lucro_venda))
 
+    # Linhas por trás dos cartões; só são filtradas (ou consultadas) quando o usuário exporta
+    if consultas is not None:
+        botoes_exportacao(lambda: consultas.lotes(filtros_para_leitura(*filtros_selecionados), TAMANHO_LOTE_EXPORTACAO),
+                          "vendas_filtradas", "exportar_vendas")
+    elif df is not None:
+        botoes_exportacao(lambda: lotes_dataframe(aplicar_filtros(df, *filtros_selecionados)),
+                          "vendas_filtradas", "exportar_vendas")
+    elif particoes is not None:
+        # Histórico acima do teto de memória: as linhas saem do Parquet, lidas só das partições filtradas
+        botoes_exportacao(lambda: particoes.lotes(filtros_para_leitura(*filtros_selecionados), TAMANHO_LOTE_EXPORTACAO),
+                          "vendas_filtradas", "exportar_vendas")
+
     
 
-    if mes_selecionado != 'Todos' and ano_selecionado != 'Todos':
-        mes_numero = meses_revertidos[mes_selecionado]
+    def vendas_por_mes(df):
+        df_meses = df.groupby('Mes').agg({'Valor_Total_Item': 'sum'}).reset_index()
+        return df_meses.sort_values(by='Mes') 
 
-        if 'Dia' in df.columns:
-            fig_vendas_diarias = criar_grafico_vendas_diarias(df_filtrado, mes_numero, ano_selecionado)
-            st.plotly_chart(fig_vendas_diarias)
-            df_performance_vendedores = calcular_performance_vendedores(df_filtrado)
-            df_performance_vendedores['Vendedor'] = df_performance_vendedores['Vendedor'].replace('THIAGO SOUSA', 'LICITAÇÃO')
-            fig_performance = criar_grafico_performance_vendedores(df_performance_vendedores)
-            st.plotly_chart(fig_performance)
-        else:
-            st.warning("A coluna 'Dia' não está presente nos dados. Impossível gerar gráfico de vendas diárias.")
-    else:
-        def criar_grafico_meses(df):
-            df_meses = df.groupby('Mes').agg({'Valor_Total_Item': 'sum'}).reset_index()
-            df_meses = df_meses.sort_values(by='Mes') 
-            df_meses["Valor_Monetario"] = df_meses["Valor_Total_Item"].apply(formatar_moeda)
-
-            labels = {'Mes': 'Mês', 'Valor_Total_Item': 'Valor Total de Venda'}
-            
-            fig = px.bar(df_meses, x='Mes', y='Valor_Total_Item', title='Vendas por Mês', 
-                        labels=labels, color='Valor_Total_Item', text=df_meses["Valor_Monetario"], 
-                        template="plotly_white", hover_data={'Valor_Total_Item': False, 'Valor_Monetario': True})
-
-            fig.update_traces(marker=dict(line=dict(color='black', width=1)),
-                                hoverlabel=dict(bgcolor="black", font_size=22,
-                                                font_family="Arial, sans-serif"))
-
-            fig.update_layout(
-                yaxis_title=labels['Valor_Total_Item'],
-                xaxis_title=labels['Mes'],
-                showlegend=False,
-                height=400,
-                xaxis=dict(
-                    tickmode='array',
-                    tickvals=list(range(1, 13)),
-                    ticktext=['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 
-                                'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
-                )
+    def criar_grafico_meses(df_meses):
+        labels = {'Mes': 'Mês', 'Valor_Total_Item': 'Valor Total de Venda'}
+        
+        fig = px.bar(df_meses, x='Mes', y='Valor_Total_Item', title='Vendas por Mês', 
+                    labels=labels, color='Valor_Total_Item', template="plotly_white")
+
+        fig.update_traces(marker=dict(line=dict(color='black', width=1)),
+                            hoverlabel=dict(bgcolor="black", font_size=22,
+                                            font_family="Arial, sans-serif"))
+        aplicar_moeda_no_grafico(fig)
+
+        fig.update_layout(
+            yaxis_title=labels['Valor_Total_Item'],
+            xaxis_title=labels['Mes'],
+            showlegend=False,
+            height=400,
+            xaxis=dict(
+                tickmode='array',
+                tickvals=list(range(1, 13)),
+                ticktext=['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 
+                            'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
             )
+        )
 
-            return fig
-        
-        fig_meses = criar_grafico_meses(df_filtrado)
-        st.plotly_chart(fig_meses)
+        return fig
+
+    def performance_vendedores(df):
+        df_performance_vendedores = calcular_performance_vendedores(df)
+        df_performance_vendedores['Vendedor'] = df_performance_vendedores['Vendedor'].replace('THIAGO SOUSA', 'LICITAÇÃO')
+        return df_performance_vendedores
 
-    
-    
-        
     def ranking_clientes(df, top_n=20):
         """Retorna os top N clientes com maior faturamento total, incluindo o número do ranking."""
-        df_clientes = df.groupby('Cliente').agg({'Valor_Total_Item': 'sum'}).reset_index()
+        df_clientes = df.groupby('Cliente', observed=True).agg({'Valor_Total_Item': 'sum'}).reset_index()
         df_clientes = df_clientes.sort_values(by='Valor_Total_Item', ascending=False).head(top_n)
         df_clientes['Ranking'] = range(1, len(df_clientes) + 1)  
-        df_clientes['Valor_Total_Item'] = df_clientes['Valor_Total_Item'].apply(formatar_moeda)  
+        df_clientes['Valor_Total_Item'] = formatar_moeda_serie(df_clientes['Valor_Total_Item'])
         df_clientes = df_clientes[['Ranking', 'Cliente', 'Valor_Total_Item']] 
-        return df_clientes
-
-    fig_linha = criar_grafico_barras(agrupar_e_somar(df_filtrado, 'Linha'), 'Linha', 'Valor_Total_Item',
-                                    'Vendas por Linha de Produto', {'Valor_Total_Item': 'Valor Total de Venda'})
-    st.plotly_chart(fig_linha)
-
-    fig_vendedor = criar_grafico_barras(agrupar_e_somar(df_filtrado, 'Vendedor'), 'Vendedor', 'Valor_Total_Item',
-                                        'Vendas por Vendedor', {'Valor_Total_Item': 'Valor Total de Venda'})
-    st.plotly_chart(fig_vendedor)
-    
-    fig_produtos = criar_grafico_barras(produtos_mais_vendidos(df_filtrado), 'Descricao_produto', 'Valor_Total_Item',
-                                        'Top 10 Produtos Mais Vendidos',
-                                        {'Descricao_produto': 'Produto', 'Valor_Total_Item': 'Valor Total de Venda'})
-    st.plotly_chart(fig_produtos)
-
-    st.subheader("Top 20 Clientes por Faturamento Total")
-    df_ranking = ranking_clientes(df_filtrado)
-    df_ranking = df_ranking.reset_index(drop=True)
+        return df_clientes.reset_index(drop=True)
+
+    def exibir_ranking(df_ranking):
+        st.subheader("Top 20 Clientes por Faturamento Total")
+        st.dataframe(df_ranking, use_container_width=True)
+
+    if consultas is not None:
+        def somar(dimensoes, medidas=MEDIDAS_VENDAS, **opcoes):
+            return consultas.somar_por(filtros, dimensoes, medidas, **opcoes)
+
+        # O motor já devolve cada gráfico agregado, ordenado e cortado no top N
+        dados_meses = lambda: somar(['Mes'], ['Valor_Total_Item'])
+        dados_diarios = lambda: somar(['Mes', 'Ano', 'Dia'], ['Valor_Total_Item'])
+        dados_performance = lambda: performance_vendedores(vendas_por_vendedor_com_meta(consultas, filtros))
+        dados_linhas = lambda: somar(['Linha'])
+        dados_vendedores = lambda: somar(['Vendedor'])
+        dados_produtos = lambda: somar(['Descricao_produto'], ['Valor_Total_Item'], ordenar='Valor_Total_Item', limite=10)
+        dados_clientes = lambda: ranking_clientes(somar(['Cliente'], ['Valor_Total_Item'], ordenar='Valor_Total_Item', limite=20))
+        tem_dia = True
+    else:
+        dados_meses = lambda: vendas_por_mes(df_filtrado)
+        dados_diarios = lambda: df_filtrado
+        dados_performance = lambda: performance_vendedores(df_filtrado)
+        dados_linhas = lambda: agrupar_e_somar(df_linhas, 'Linha')
+        dados_vendedores = lambda: agrupar_e_somar(df_filtrado, 'Vendedor')
+        dados_produtos = lambda: produtos_mais_vendidos(df_produtos)
+        dados_clientes = lambda: ranking_clientes(df_clientes)
+        tem_dia = 'Dia' in df_opcoes.columns
+
+    # Cada gráfico é independente: as agregações rodam no pool de threads, a montagem das
+    # figuras logo em seguida, e tudo é exibido na ordem abaixo à medida que fica pronto.
+    # Etapas: (agregação, montagem da figura ou None, exibição)
+    etapas = []
+    if mes_selecionado != 'Todos' and ano_selecionado != 'Todos':
+        mes_numero = meses_revertidos[mes_selecionado]
 
-    st.dataframe(df_ranking, use_container_width=True)
+        if tem_dia:
+            etapas.append((dados_diarios,
+                           lambda df: criar_grafico_vendas_diarias(df, mes_numero, ano_selecionado), st.plotly_chart))
+            etapas.append((dados_performance, criar_grafico_performance_vendedores, st.plotly_chart))
+        else:
+            st.warning("A coluna 'Dia' não está presente nos dados. Impossível gerar gráfico de vendas diárias.")
+    else:
+        etapas.append((dados_meses, criar_grafico_meses, st.plotly_chart))
+
+    etapas += [
+        (dados_linhas,
+         lambda dados: criar_grafico_barras(dados, 'Linha', 'Valor_Total_Item', 'Vendas por Linha de Produto',
+                                            {'Valor_Total_Item': 'Valor Total de Venda'}),
+         st.plotly_chart),
+        (dados_vendedores,
+         lambda dados: criar_grafico_barras(dados, 'Vendedor', 'Valor_Total_Item', 'Vendas por Vendedor',
+                                            {'Valor_Total_Item': 'Valor Total de Venda'}),
+         st.plotly_chart),
+        (dados_produtos,
+         lambda dados: criar_grafico_barras(dados, 'Descricao_produto', 'Valor_Total_Item', 'Top 10 Produtos Mais Vendidos',
+                                            {'Descricao_produto': 'Produto', 'Valor_Total_Item': 'Valor Total de Venda'}),
+         st.plotly_chart),
+        (dados_clientes, None, exibir_ranking),
+    ]
+    resultados = exibir_em_ordem(etapas, resultados)
+    if chave_cache is not None and em_cache is None:
+        CACHE_RESULTADOS.guardar(chave_cache, (metricas, resultados))
 
 
 ######################################################################################################################
 
 
-def renderizar_pagina_comparativo(df):
+def criar_indice_faturado(df):
+    return IndiceDatas(df[df['situacao'] == 'Faturada'], 'Data_Emissao', 'Valor_Total_Item')
+
+@st.fragment
+@medir_rodada("Comparativo de Períodos", medicao_ligada)
+def renderizar_pagina_comparativo(df, indice_faturado=None):
     st.title('Dashboard de Vendas Comparativo de Períodos')
 
     col1, col2 = st.columns(2)
@@ -378,16 +455,14 @@ def renderizar_pagina_comparativo(df):
             st.error("Datas inválidas. Verifique os formatos.")
             return
 
-        df['Data_Emissao'] = pd.to_datetime(df['Data_Emissao'], format='mixed', dayfirst=True)
-        df_faturado = df[df['situacao'] == 'Faturada'].copy()
-
-        def filtrar_soma_vendas(df, data_col, valor_col, data_inicio, data_fim):
-            df_filtrado = df[(df[data_col] >= data_inicio) & (df[data_col] <= data_fim)]
-            return df_filtrado[valor_col].sum()
+        # Faturadas ordenadas por Data_Emissao com somas acumuladas (montado uma vez por versão do arquivo)
+        if indice_faturado is None:
+            with fase("índice de datas"):
+                indice_faturado = criar_indice_faturado(df)
 
-        def comparar_periodos(df, data_col, valor_col, periodo1, periodo2):
-            soma_periodo1 = filtrar_soma_vendas(df, data_col, valor_col, *periodo1)
-            soma_periodo2 = filtrar_soma_vendas(df, data_col, valor_col, *periodo2)
+        def comparar_periodos(indice, periodo1, periodo2):
+            soma_periodo1 = indice.soma(*periodo1)
+            soma_periodo2 = indice.soma(*periodo2)
 
             if soma_periodo1 == 0:
                 variacao = "Indefinida" if soma_periodo2 != 0 else "Sem variação"
@@ -396,7 +471,8 @@ def renderizar_pagina_comparativo(df):
 
             return soma_periodo1, soma_periodo2, variacao
 
-        soma_periodo1, soma_periodo2, variacao = comparar_periodos(df_faturado, 'Data_Emissao', 'Valor_Total_Item', (data_inicio_1, data_fim_1), (data_inicio_2, data_fim_2))
+        with fase("somas dos períodos"):
+            soma_periodo1, soma_periodo2, variacao = comparar_periodos(indice_faturado, (data_inicio_1, data_fim_1), (data_inicio_2, data_fim_2))
 
         st.subheader("Comparação entre os períodos selecionados:")
         col3, col4, col5 = st.columns(3)
@@ -418,17 +494,17 @@ def renderizar_pagina_comparativo(df):
 
         st.subheader("Tendências Temporais")
 
-        df_periodo1 = df_faturado[(df_faturado['Data_Emissao'] >= data_inicio_1) & (df_faturado['Data_Emissao'] <= data_fim_1)].copy()
-        df_periodo2 = df_faturado[(df_faturado['Data_Emissao'] >= data_inicio_2) & (df_faturado['Data_Emissao'] <= data_fim_2)].copy()
+        with fase("vendas diárias") as medida:
+            vendas_diarias_periodo1 = indice_faturado.vendas_diarias(data_inicio_1, data_fim_1)
+            vendas_diarias_periodo2 = indice_faturado.vendas_diarias(data_inicio_2, data_fim_2)
 
-        df_periodo1['Data'] = df_periodo1['Data_Emissao'].dt.date
-        df_periodo2['Data'] = df_periodo2['Data_Emissao'].dt.date
+            vendas_diarias_periodo1['Média Móvel'] = vendas_diarias_periodo1['Valor_Total_Item'].rolling(window=7, min_periods=1).mean()
+            vendas_diarias_periodo2['Média Móvel'] = vendas_diarias_periodo2['Valor_Total_Item'].rolling(window=7, min_periods=1).mean()
 
-        vendas_diarias_periodo1 = df_periodo1.groupby('Data')['Valor_Total_Item'].sum().reset_index()
-        vendas_diarias_periodo2 = df_periodo2.groupby('Data')['Valor_Total_Item'].sum().reset_index()
-
-        vendas_diarias_periodo1['Média Móvel'] = vendas_diarias_periodo1['Valor_Total_Item'].rolling(window=7, min_periods=1).mean()
-        vendas_diarias_periodo2['Média Móvel'] = vendas_diarias_periodo2['Valor_Total_Item'].rolling(window=7, min_periods=1).mean()
+            # Períodos longos: a média móvel é calculada sobre todos os dias e só então a série é reduzida
+            vendas_diarias_periodo1 = reduzir_pontos(vendas_diarias_periodo1, 'Valor_Total_Item')
+            vendas_diarias_periodo2 = reduzir_pontos(vendas_diarias_periodo2, 'Valor_Total_Item')
+            medida.linhas(len(vendas_diarias_periodo1) + len(vendas_diarias_periodo2))
 
         col_linha1, col_linha2 = st.columns(2)
 
@@ -480,42 +556,30 @@ def renderizar_pagina_comparativo(df):
 
         st.subheader("📅 Análise de Sazonalidade")
 
-        traducao_dias = {
-            "Monday": "Segunda", "Tuesday": "Terça", "Wednesday": "Quarta",
-            "Thursday": "Quinta", "Friday": "Sexta", "Saturday": "Sábado", "Sunday": "Domingo"
-        }
-
         dias_da_semana_ordem = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
 
-        for df in [df_periodo1, df_periodo2]:
-            df['Dia_da_Semana'] = df['Data_Emissao'].dt.day_name().map(traducao_dias)
-            df['Período'] = 'Período 1' if df is df_periodo1 else 'Período 2'
-
-        df_sazonalidade_combinada = pd.concat([
-            df_periodo1[['Dia_da_Semana', 'Valor_Total_Item', 'Período']],
-            df_periodo2[['Dia_da_Semana', 'Valor_Total_Item', 'Período']]
-        ])
-
-        df_sazonalidade_combinada['Dia_da_Semana'] = pd.Categorical(
-            df_sazonalidade_combinada['Dia_da_Semana'], categories=dias_da_semana_ordem, ordered=True
-        )
-
-        df_sazonalidade_combinada['Total Vendido'] = df_sazonalidade_combinada['Valor_Total_Item'].apply(formatar_moeda)
+        # Quartis, cercas e outliers calculados aqui por dia da semana e período; o navegador
+        # recebe só as estatísticas de cada caixa em vez de todas as linhas dos dois períodos
+        fig_boxplot_combinado = go.Figure()
+        with fase("sazonalidade"):
+            for nome, (data_inicio, data_fim) in (('Período 1', (data_inicio_1, data_fim_1)), ('Período 2', (data_inicio_2, data_fim_2))):
+                df_periodo = indice_faturado.fatia(data_inicio, data_fim)
+                if df_periodo.empty:
+                    continue
+                fig_boxplot_combinado.add_trace(traco_caixa(df_periodo['Data_Emissao'].dt.dayofweek, df_periodo['Valor_Total_Item'],
+                                                            nome, rotulos=dias_da_semana_ordem, offsetgroup=nome))
 
-        fig_boxplot_combinado = px.box(
-            df_sazonalidade_combinada,
-            x='Dia_da_Semana',
-            y='Valor_Total_Item',
-            color='Período',
+        fig_boxplot_combinado.update_layout(
             title='Comparação da Sazonalidade das Vendas por Dia da Semana',
-            labels={'Valor_Total_Item': 'Valor Total de Vendas', 'Dia_da_Semana': 'Dia da Semana'},
-            hover_data={'Dia_da_Semana': False, 'Período': False, 'Valor_Total_Item': False, 'Total Vendido': True}
+            xaxis_title='Dia da Semana',
+            yaxis_title='Valor Total de Vendas',
+            legend_title_text='Período'
         )
-
-        fig_boxplot_combinado.update_yaxes(tickprefix="R$ ", tickformat=",.2f")
+        fig_boxplot_combinado.update_yaxes(tickprefix="R$ ", tickformat=",.2f", hoverformat=",.2f")
         fig_boxplot_combinado.update_xaxes(categoryorder='array', categoryarray=dias_da_semana_ordem)
         fig_boxplot_combinado.update_layout(
             boxmode='group',
+            separators=SEPARADORES_PT_BR,
             margin=dict(l=40, r=40, t=60, b=40)
         )
 
@@ -526,18 +590,22 @@ def renderizar_pagina_comparativo(df):
                 font_family="Arial, sans-serif"
             )
         )
-        st.plotly_chart(fig_boxplot_combinado, use_container_width=True)
+        with fase("exibição: sazonalidade"):
+            st.plotly_chart(fig_boxplot_combinado, use_container_width=True)
 
 
 
 ################################################################################################################################################
 
+@st.fragment
+@medir_rodada("Analise de tickets", medicao_ligada)
 def renderizar_pagina_vendedor(df):
     def processar_dados(df):
-        df['Data_Emissao'] = pd.to_datetime(df['Data_Emissao'], format='mixed', dayfirst=True)
         colunas_nf_unicas = ['NF', 'Data_Emissao', 'Vendedor', 'Valor_Total_Nota', 'Mes', 'Ano', 'situacao']
-        df_nf_unicas = df.drop_duplicates(subset='NF')[colunas_nf_unicas].copy()
-        df_nf_unicas = df_nf_unicas[df_nf_unicas['situacao'] == 'Faturada']
+        with fase("notas únicas", len(df)) as medida:
+            df_nf_unicas = df.drop_duplicates(subset='NF')[colunas_nf_unicas].copy()
+            df_nf_unicas = df_nf_unicas[df_nf_unicas['situacao'] == 'Faturada']
+            medida.linhas(len(df_nf_unicas))
 
         meses_abreviados = {
             1: 'Jan', 2: 'Fev', 3: 'Mar', 4: 'Abr', 5: 'Mai', 6: 'Jun',
@@ -565,7 +633,9 @@ def renderizar_pagina_vendedor(df):
                 df = df[df['Ano'] == ano_selecionado]
             return df
 
-        df_nf_unicas = aplicar_filtros(df_nf_unicas, mes_selecionado, ano_selecionado)
+        with fase("aplicar_filtros") as medida:
+            df_nf_unicas = aplicar_filtros(df_nf_unicas, mes_selecionado, ano_selecionado)
+            medida.linhas(len(df_nf_unicas))
 
         total_notas = df_nf_unicas['NF'].nunique()
         faturamento_total = df_nf_unicas['Valor_Total_Nota'].sum()
@@ -575,8 +645,9 @@ def renderizar_pagina_vendedor(df):
         col2.metric("Faturamento Total", formatar_moeda(faturamento_total))
 
         # Cálculo do ticket médio por vendedor (sem semana)
-        df_ticket_medio = df_nf_unicas.groupby('Vendedor')['Valor_Total_Nota'].mean().reset_index(name='Ticket_Medio')
-        df_ticket_medio['Ticket Medio'] = df_ticket_medio['Ticket_Medio'].apply(formatar_moeda)
+        with fase("ticket médio por vendedor"):
+            df_ticket_medio = df_nf_unicas.groupby('Vendedor', observed=True)['Valor_Total_Nota'].mean().reset_index(name='Ticket_Medio')
+        df_ticket_medio['Ticket Medio'] = formatar_moeda_serie(df_ticket_medio['Ticket_Medio'])
 
         st.subheader("Ticket Médio por Vendedor (Tabela)")
         st.dataframe(df_ticket_medio[['Vendedor', 'Ticket Medio']])
@@ -584,9 +655,7 @@ def renderizar_pagina_vendedor(df):
         st.subheader("Ticket Médio por Vendedor (Gráfico de Barras)")
         fig = px.bar(df_ticket_medio, x='Vendedor', y='Ticket_Medio',
                     title='Ticket Médio por Vendedor',
-                    labels={'Ticket_Medio': 'Ticket Médio'},
-                    text='Ticket Medio',
-                    hover_data={'Vendedor': False, 'Ticket_Medio': False, 'Ticket Medio': True})
+                    labels={'Ticket_Medio': 'Ticket Médio'})
 
         fig.update_traces(marker=dict(line=dict(color='black', width=1)),
                         hoverlabel=dict(bgcolor="black", font_size=22, font_family="Arial, sans-serif"),
@@ -594,6 +663,7 @@ def renderizar_pagina_vendedor(df):
                         textposition='outside',
                         cliponaxis=False
                         )
+        aplicar_moeda_no_grafico(fig)
 
         fig.update_layout(
             yaxis_title='Ticket Médio',
@@ -616,11 +686,16 @@ def renderizar_pagina_vendedor(df):
 
     df = processar_dados(df)
 
-    df_styled = df.style.format({
-        'Data_Emissao': lambda x: x.strftime('%d/%m/%Y') if pd.notnull(x) else '',
-        'Valor_Total_Nota': formatar_moeda,
-        'Soma_Venda_Semana': formatar_moeda,
-        'Quantidade_Notas_Semana': '{:,.0f}'
-    }).applymap(lambda val: 'background-color: #ADD8E6; color: black' if isinstance(val, (int, float)) and val > 10000 else '', subset=['Valor_Total_Nota'])
-
-    st.dataframe(df_styled, use_container_width=True)
+    # O formato de moeda pt-BR e o destaque das notas altas só são aplicados na página exibida
+    def estilizar_notas(df_pagina):
+        return df_pagina.style.format({'Valor_Total_Nota': formatar_moeda}).map(
+            lambda val: 'background-color: #ADD8E6; color: black' if isinstance(val, (int, float)) and val > 10000 else '',
+            subset=['Valor_Total_Nota'])
+
+    exibir_tabela_paginada(
+        df, "notas_vendedor", colunas_busca=['NF', 'Vendedor'],
+        column_config={
+            'NF': st.column_config.NumberColumn('NF', format='%d'),
+            'Data_Emissao': st.column_config.DatetimeColumn('Data_Emissao', format='DD/MM/YYYY'),
+        },
+        estilizar=estilizar_notas)
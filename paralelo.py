@@ -0,0 +1,70 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from medicao import fase, medicao_atual
+
+
+# Pool compartilhado por todas as sessões. Só as agregações rodam nele: a montagem e a
+# exibição das figuras continuam em sequência na thread do script
+MAX_TRABALHADORES = min(8, (os.cpu_count() or 1) + 2)
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_TRABALHADORES, thread_name_prefix="graficos")
+
+
+def _tamanho(dados):
+    return len(dados) if hasattr(dados, '__len__') else None
+
+
+def _agregar(preparar, medicao=None, nome=None):
+    if medicao is None:
+        return preparar()
+    # A medição da rodada vem da thread do script; as threads do pool não a herdam
+    with medicao.fase(f"agregação: {nome}") as medida:
+        dados = preparar()
+        medida.linhas(_tamanho(dados))
+    return dados
+
+
+def _nome_etapa(posicao, preparar, montar):
+    for funcao in (montar, preparar):
+        nome = getattr(funcao, '__name__', '<lambda>')
+        if nome != '<lambda>':
+            return nome
+    return f"etapa {posicao + 1}"
+
+
+def agregar_em_paralelo(tarefas):
+    """Agrega no pool as tarefas (preparar, montar) e gera os resultados na ordem da lista.
+
+    Só `preparar()`, a agregação, é paralela: todas rodam no pool ao mesmo tempo. `montar(dados)`
+    monta a figura (ou é None, se o resultado já é o próprio dado) em sequência, na thread que
+    consome os resultados; o ganho é só sobrepor a montagem de uma figura às agregações
+    seguintes. O Plotly preenche seus caches de validadores e templates sem trava, então as
+    figuras não são montadas no pool compartilhado. `preparar` não pode chamar st.*: os
+    elementos do Streamlit só podem ser criados na thread do script.
+    """
+    medicao = medicao_atual()
+    nomes = [_nome_etapa(posicao, preparar, montar) for posicao, (preparar, montar) in enumerate(tarefas)]
+    futuros = [_EXECUTOR.submit(_agregar, preparar, medicao, nome) for (preparar, _), nome in zip(tarefas, nomes)]
+    for (_, montar), nome, futuro in zip(tarefas, nomes, futuros):
+        dados = futuro.result()
+        if montar is not None:
+            with fase(f"figura: {nome}"):
+                dados = montar(dados)
+        yield dados
+
+
+def exibir_em_ordem(etapas, resultados=None):
+    """Recebe trios (preparar, montar, exibir): agrega tudo no pool e, um a um na ordem dada, monta e exibe cada resultado.
+
+    Com `resultados` já prontos (ex.: do cache de uma exibição anterior das mesmas etapas), nada
+    é montado, só exibido. Retorna a lista de resultados exibidos.
+    """
+    if resultados is None:
+        resultados = agregar_em_paralelo([(preparar, montar) for preparar, montar, _ in etapas])
+    exibidos = []
+    for posicao, ((preparar, montar, exibir), resultado) in enumerate(zip(etapas, resultados)):
+        # Exibir inclui a serialização da figura para o navegador
+        with fase(f"exibição: {_nome_etapa(posicao, preparar, montar)}"):
+            exibir(resultado)
+        exibidos.append(resultado)
+    return exibidos
@@ -0,0 +1,223 @@
+"""Dados sintéticos com o esquema de df_vendas.csv e df_compra.csv, para benchmarks.
+
+As cardinalidades crescem com o número de linhas (clientes, produtos, fornecedores) e as
+escolhas de cliente e produto são concentradas em poucos valores, como nos dados reais.
+Os arquivos são gerados e gravados em blocos, então 10^8 linhas não precisam caber em memória.
+Uso: python sinteticos.py --linhas 1000000 --destino bench_dados
+"""
+import argparse
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from dados import TAMANHO_BLOCO
+
+
+COLUNAS_VENDAS = ['NF', 'Data_Emissao', 'Vendedor', 'Cliente', 'Descricao_produto', 'Linha', 'Qtd_Produto',
+                  'Valor_Total_Item', 'Total_Custo_Compra', 'Total_Lucro_Venda_Item', 'Valor_Total_Nota',
+                  'situacao', 'Dia', 'Mes', 'Ano']
+COLUNAS_COMPRAS = ['numeropedido', 'data emissao', 'data entrega prevista', 'data entrada', 'codigofornecedor',
+                   'fornecedor', 'cidade fornecedor', 'total itens', 'valor bruto total itens', 'situacao pedido',
+                   'usuario', 'prazo', 'codigoprodutoitem', 'descricao produto', 'qtd pedido item',
+                   'qtd bonificacao item', 'qtd pendente item', 'preco unitario item', 'qtd falta item',
+                   'qtd faturada item', 'valor desconto item', 'valor bruto item', 'valor liquido item',
+                   'preco unitario liquido item', 'tipo produto', 'mes', 'ano', 'status pedido', 'tipo fornecedor']
+
+VENDEDORES = ['GERAL VENDAS', 'FABIAN SILVA', 'DENIS SOUSA', 'THIAGO SOUSA', 'VERIDIANA SERRA', 'JORGE TOTE', 'CESAR GAMA']
+LINHAS = ['ODONTO', 'FARMA', 'LAB', 'HOSPITALAR']
+USUARIOS = ['WARLEY', 'NATALIA', 'YAGO']
+TIPOS_PRODUTO = ['MATERIAL HOSPITALAR', 'MEDICAMENTOS', 'OUTROS', 'PRODUTOS NATURAIS']
+PRAZOS = ['28/35/42/49', '30/60/90', '28', '30', 'A VISTA']
+
+# Proporções observadas nos CSVs reais
+SITUACOES_VENDA = (['Faturada', 'Cancelada'], [0.9, 0.1])
+SITUACOES_PEDIDO = (['fechado pedido chegou', 'aguardando faturamento', 'pendente'], [0.95, 0.045, 0.005])
+PESOS_TIPO_PRODUTO = [0.54, 0.44, 0.015, 0.005]
+
+ITENS_POR_NOTA = 4
+ITENS_POR_PEDIDO = 5
+ANOS_DE_HISTORICO = 3
+
+
+def cardinalidades(linhas):
+    """Quantos clientes, produtos, fornecedores e vendedores um dataset de `linhas` linhas tem."""
+    return {
+        'clientes': int(np.clip(linhas // 40, 500, 200_000)),
+        'produtos': int(np.clip(linhas // 70, 300, 50_000)),
+        'fornecedores': int(np.clip(linhas // 15, 60, 5_000)),
+        'vendedores': int(np.clip(linhas // 1_000_000, len(VENDEDORES), 60)),
+    }
+
+
+def _concentrado(rng, quantidade, tamanho):
+    # Poucos valores concentram a maior parte das linhas (clientes e produtos mais frequentes)
+    return np.minimum((quantidade * rng.random(tamanho) ** 3).astype('int64'), quantidade - 1)
+
+
+def _dias(hoje):
+    dias = pd.date_range(end=pd.Timestamp(hoje), periods=365 * ANOS_DE_HISTORICO, freq='D')
+    return dias, dias.strftime('%d/%m/%Y').to_numpy()
+
+
+def _nomes(prefixo, ids):
+    return np.char.add(prefixo, ids.astype(str))
+
+
+def gerar_vendas(tamanho, total_linhas=None, primeira_nf=1, semente=0, hoje=None):
+    """Um bloco de `tamanho` linhas de vendas, com NFs a partir de `primeira_nf`.
+
+    `total_linhas` é o tamanho do dataset inteiro e define as cardinalidades.
+    """
+    rng = np.random.default_rng(semente)
+    card = cardinalidades(total_linhas or tamanho)
+    dias, rotulos_dias = _dias(hoje or date.today())
+
+    # Itens de uma mesma NF ficam juntos e compartilham data, vendedor, cliente e situação
+    nota = np.sort(rng.integers(0, max(1, tamanho // ITENS_POR_NOTA), tamanho))
+    _, nota = np.unique(nota, return_inverse=True)
+    notas = nota.max() + 1 if tamanho else 0
+
+    dia_nota = rng.integers(0, len(dias), notas)
+    vendedores = np.array(VENDEDORES + [f'VENDEDOR {i}' for i in range(len(VENDEDORES), card['vendedores'])])
+    vendedor_nota = vendedores[rng.integers(0, len(vendedores), notas)]
+    cliente_nota = _nomes('CLIENTE ', _concentrado(rng, card['clientes'], notas))
+    situacao_nota = rng.choice(SITUACOES_VENDA[0], notas, p=SITUACOES_VENDA[1])
+
+    produto = _concentrado(rng, card['produtos'], tamanho)
+    preco_produto = np.random.default_rng(1).lognormal(4, 1, card['produtos'])
+    quantidade = rng.integers(1, 50, tamanho)
+    valor = np.round(preco_produto[produto] * quantidade, 2)
+    custo = np.round(valor * rng.uniform(0.35, 0.7, tamanho), 2)
+
+    dia = dias[dia_nota[nota]]
+    return pd.DataFrame({
+        'NF': primeira_nf + nota,
+        'Data_Emissao': rotulos_dias[dia_nota[nota]],
+        'Vendedor': vendedor_nota[nota],
+        'Cliente': cliente_nota[nota],
+        'Descricao_produto': _nomes('PRODUTO ', produto),
+        'Linha': np.array(LINHAS)[produto % len(LINHAS)],
+        'Qtd_Produto': quantidade,
+        'Valor_Total_Item': valor,
+        'Total_Custo_Compra': custo,
+        'Total_Lucro_Venda_Item': np.round(valor - custo, 2),
+        'Valor_Total_Nota': np.round(np.bincount(nota, weights=valor)[nota], 2),
+        'situacao': situacao_nota[nota],
+        'Dia': dia.day,
+        'Mes': dia.month,
+        'Ano': dia.year,
+    })
+
+
+def gerar_compras(tamanho, total_linhas=None, primeiro_pedido=1, semente=0, hoje=None):
+    """Um bloco de `tamanho` linhas (itens de pedido) de compras, com pedidos a partir de `primeiro_pedido`."""
+    rng = np.random.default_rng(semente)
+    card = cardinalidades(total_linhas or tamanho)
+    dias, rotulos_dias = _dias(hoje or date.today())
+
+    pedido = np.sort(rng.integers(0, max(1, tamanho // ITENS_POR_PEDIDO), tamanho))
+    _, pedido = np.unique(pedido, return_inverse=True)
+    pedidos = pedido.max() + 1 if tamanho else 0
+
+    # Entrega prevista de 2 a 8 semanas depois da emissão; sem data de entrada se não chegou
+    emissao = rng.integers(0, len(dias) - 60, pedidos)
+    prevista = emissao + rng.integers(14, 60, pedidos)
+    situacao = rng.choice(SITUACOES_PEDIDO[0], pedidos, p=SITUACOES_PEDIDO[1])
+    chegou = situacao == 'fechado pedido chegou'
+    entrada = np.where(chegou, np.minimum(prevista + rng.integers(-10, 10, pedidos), len(dias) - 1), -1)
+
+    fornecedor = _concentrado(rng, card['fornecedores'], pedidos)
+    tipo_fornecedor = np.where(fornecedor % 4 == 0, 'interno', 'externo')
+    usuario = np.array(USUARIOS)[rng.integers(0, len(USUARIOS), pedidos)]
+    prazo = np.array(PRAZOS)[fornecedor % len(PRAZOS)]
+
+    produto = _concentrado(rng, card['produtos'], tamanho)
+    preco = np.round(np.random.default_rng(2).lognormal(1, 1.2, card['produtos'])[produto] * rng.uniform(0.9, 1.1, tamanho), 2)
+    quantidade = rng.integers(1, 500, tamanho) * 10
+    faturada = np.where(chegou[pedido], quantidade, 0)
+    bruto = np.round(preco * quantidade, 2)
+    desconto = np.round(np.where(rng.random(tamanho) < 0.1, bruto * 0.05, 0.0), 2)
+    liquido = np.round(bruto - desconto, 2)
+
+    rotulos_entrada = np.append(rotulos_dias, '')[entrada]
+    data_emissao = dias[emissao[pedido]]
+    return pd.DataFrame({
+        'numeropedido': primeiro_pedido + pedido,
+        'data emissao': rotulos_dias[emissao[pedido]],
+        'data entrega prevista': rotulos_dias[prevista[pedido]],
+        'data entrada': rotulos_entrada[pedido],
+        'codigofornecedor': fornecedor[pedido] + 1,
+        'fornecedor': _nomes('FORNECEDOR ', fornecedor)[pedido],
+        'cidade fornecedor': _nomes('CIDADE ', fornecedor % 500)[pedido],
+        'total itens': np.bincount(pedido)[pedido],
+        'valor bruto total itens': np.round(np.bincount(pedido, weights=bruto)[pedido], 2),
+        'situacao pedido': situacao[pedido],
+        'usuario': usuario[pedido],
+        'prazo': prazo[pedido],
+        'codigoprodutoitem': produto + 1,
+        'descricao produto': _nomes('PRODUTO ', produto),
+        'qtd pedido item': quantidade,
+        'qtd bonificacao item': 0,
+        'qtd pendente item': quantidade - faturada,
+        'preco unitario item': preco,
+        'qtd falta item': (quantidade - faturada).astype('float64'),
+        'qtd faturada item': faturada,
+        'valor desconto item': desconto,
+        'valor bruto item': bruto,
+        'valor liquido item': liquido,
+        'preco unitario liquido item': np.round(liquido / quantidade, 4),
+        'tipo produto': rng.choice(TIPOS_PRODUTO, tamanho, p=PESOS_TIPO_PRODUTO),
+        'mes': data_emissao.month,
+        'ano': data_emissao.year,
+        'status pedido': np.where(chegou, 'recebido', 'entrega pendente')[pedido],
+        'tipo fornecedor': tipo_fornecedor[pedido],
+    })
+
+
+GERADORES = {"vendas": (gerar_vendas, 'NF'), "compras": (gerar_compras, 'numeropedido')}
+
+
+def gravar_sintetico(caminho, tipo, linhas, semente=0, tamanho_bloco=None):
+    """Grava um CSV sintético de `linhas` linhas do tipo, bloco a bloco, e retorna o caminho."""
+    gerar, coluna_chave = GERADORES[tipo]
+    tamanho_bloco = tamanho_bloco or TAMANHO_BLOCO
+    temporario = caminho + ".tmp"
+    proxima_chave = 1
+    with open(temporario, "w", encoding="utf-8", newline="") as arquivo:
+        for numero, inicio in enumerate(range(0, max(linhas, 1), tamanho_bloco)):
+            bloco = gerar(min(tamanho_bloco, linhas - inicio), linhas, proxima_chave, semente * 100_003 + numero)
+            bloco.to_csv(arquivo, header=numero == 0, index=False)
+            if not bloco.empty:
+                proxima_chave = int(bloco[coluna_chave].max()) + 1
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def caminho_sintetico(destino, tipo, linhas):
+    return os.path.join(destino, f"{tipo}_{linhas}.csv")
+
+
+def garantir_sintetico(destino, tipo, linhas, semente=0):
+    """Caminho do CSV sintético, gerando-o só se ainda não existir."""
+    caminho = caminho_sintetico(destino, tipo, linhas)
+    if not os.path.exists(caminho):
+        os.makedirs(destino, exist_ok=True)
+        gravar_sintetico(caminho, tipo, linhas, semente)
+    return caminho
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera CSVs sintéticos de vendas e compras.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000], help="linhas de cada arquivo (ex.: 10000 1000000)")
+    parser.add_argument("--tipos", nargs="+", default=list(GERADORES), choices=list(GERADORES))
+    parser.add_argument("--destino", default="bench_dados", help="diretório dos CSVs gerados")
+    parser.add_argument("--semente", type=int, default=0)
+    argumentos = parser.parse_args()
+
+    os.makedirs(argumentos.destino, exist_ok=True)
+    for linhas in argumentos.linhas:
+        for tipo in argumentos.tipos:
+            caminho = gravar_sintetico(caminho_sintetico(argumentos.destino, tipo, linhas), tipo, linhas, argumentos.semente)
+            print(f"{caminho}: {linhas} linhas")
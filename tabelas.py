@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+import streamlit as st
+
+
+TAMANHOS_PAGINA = [25, 50, 100, 200]
+
+
+def buscar(df, termo, colunas):
+    """Linhas em que alguma das `colunas` contém `termo` (sem diferenciar maiúsculas)."""
+    termo = termo.strip()
+    if not termo:
+        return df
+    encontrado = np.zeros(len(df), dtype=bool)
+    for coluna in colunas:
+        encontrado |= df[coluna].astype(str).str.contains(termo, case=False, regex=False, na=False).to_numpy()
+    return df[encontrado]
+
+
+def paginar(df, pagina, tamanho_pagina):
+    inicio = (pagina - 1) * tamanho_pagina
+    return df.iloc[inicio:inicio + tamanho_pagina]
+
+
+def exibir_tabela_paginada(df, chave, colunas_busca, column_config=None, estilizar=None):
+    """Tabela com busca, ordenação e paginação feitas no servidor.
+
+    Só a página visível é enviada ao navegador. Os valores continuam numéricos para a busca e
+    a ordenação; `estilizar(df_pagina)`, se dado, devolve o Styler da página (formatação e
+    destaques), então o Styler só percorre as linhas exibidas.
+    """
+    col_busca, col_ordem, col_sentido, col_tamanho = st.columns([3, 2, 1, 1])
+    with col_busca:
+        termo = st.text_input("Buscar", key=f"{chave}_busca")
+    with col_ordem:
+        coluna_ordem = st.selectbox("Ordenar por", list(df.columns), key=f"{chave}_ordem")
+    with col_sentido:
+        decrescente = st.toggle("Decrescente", key=f"{chave}_decrescente")
+    with col_tamanho:
+        tamanho_pagina = st.selectbox("Linhas por página", TAMANHOS_PAGINA, key=f"{chave}_tamanho")
+
+    df_tabela = buscar(df, termo, colunas_busca)
+    df_tabela = df_tabela.sort_values(coluna_ordem, ascending=not decrescente, kind='stable', na_position='last')
+
+    total_paginas = max(1, math.ceil(len(df_tabela) / tamanho_pagina))
+    pagina = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, value=1,
+                             step=1, key=f"{chave}_pagina")
+    df_pagina = paginar(df_tabela, min(pagina, total_paginas), tamanho_pagina)
+
+    tabela = estilizar(df_pagina) if estilizar is not None else df_pagina
+    st.dataframe(tabela, column_config=column_config, hide_index=True, use_container_width=True)
+
+    inicio = (min(pagina, total_paginas) - 1) * tamanho_pagina
+    st.caption(f"Linhas {inicio + 1 if len(df_tabela) else 0}–{inicio + len(df_pagina)} de {len(df_tabela)}")
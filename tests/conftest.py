@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do painel ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dados  # noqa: E402
+from sinteticos import gravar_sintetico  # noqa: E402
+
+
+CABECALHO_VENDAS = ("NF,Data_Emissao,Vendedor,Cliente,Descricao_produto,Linha,Qtd_Produto,Valor_Total_Item,"
+                    "Total_Custo_Compra,Total_Lucro_Venda_Item,Valor_Total_Nota,situacao,Dia,Mes,Ano\n")
+VENDEDORES = ['DENIS SOUSA', 'FABIAN SILVA', 'CESAR GAMA']
+
+
+def linhas_vendas(quantidade, inicio=0):
+    """Linhas do CSV de vendas, numeradas a partir de `inicio` (a NF é o número da linha)."""
+    linhas = []
+    for numero in range(inicio, inicio + quantidade):
+        dia, mes = numero % 28 + 1, numero % 12 + 1
+        valor = 100 + numero * 1.5
+        situacao = 'Cancelada' if numero % 10 == 0 else 'Faturada'
+        linhas.append(f"{numero},{dia:02d}/{mes:02d}/2025,{VENDEDORES[numero % 3]},CLIENTE {numero % 7},"
+                      f"PRODUTO {numero % 5},LAB,{numero % 4 + 1},{valor:.2f},{valor / 2:.2f},{valor / 2:.2f},"
+                      f"{valor * 3:.2f},{situacao},{dia},{mes},2025\n")
+    return "".join(linhas)
+
+
+@pytest.fixture(autouse=True)
+def cache_limpo(tmp_path, monkeypatch):
+    # Cada teste começa sem datasets em cache e grava as versões mapeadas no próprio diretório
+    monkeypatch.setattr(dados, "DIRETORIO_MAPEADOS", str(tmp_path / "mapeados"))
+    monkeypatch.setattr(dados, "DIRETORIO_PARQUET", str(tmp_path / "parquet"))
+    dados.limpar_cache()
+    yield
+    dados.limpar_cache()
+
+
+@pytest.fixture
+def csv_vendas(tmp_path):
+    """Cria o CSV de vendas com `quantidade` linhas e retorna o caminho."""
+    def criar(quantidade, nome="df_vendas.csv"):
+        caminho = tmp_path / nome
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        caminho.write_text(CABECALHO_VENDAS + linhas_vendas(quantidade), encoding="utf-8")
+        return str(caminho)
+    return criar
+
+
+@pytest.fixture
+def csv_sintetico(tmp_path):
+    """Grava um CSV sintético (sinteticos.py) do tipo, com `linhas` linhas, e retorna o caminho."""
+    def criar(tipo, linhas, semente=0):
+        return gravar_sintetico(str(tmp_path / f"{tipo}_{linhas}.csv"), tipo, linhas, semente)
+    return criar
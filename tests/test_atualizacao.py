@@ -0,0 +1,89 @@
+import pytest
+
+import atualizacao
+import consultas
+import dados
+from sinteticos import gravar_sintetico
+
+
+@pytest.fixture(autouse=True)
+def versao_limpa(monkeypatch):
+    monkeypatch.setattr(atualizacao, '_ATUAL', {})
+
+
+def test_estrutura_opcional_que_falha_fica_vazia(tmp_path, monkeypatch):
+    caminho = gravar_sintetico(str(tmp_path / "df_compra.csv"), "compras", 500)
+
+    def falhar(*args):
+        raise OSError("snapshot corrompido")
+
+    monkeypatch.setattr(atualizacao, 'carregar_snapshot', falhar)
+    monkeypatch.setattr(atualizacao, 'abrir_consultas', falhar)
+
+    assert atualizacao.atualizar({"compras": caminho}) == ["compras"]
+    dados = atualizacao.dados_atuais()["compras"]
+    assert 'erro' not in dados
+    assert len(dados['df']) == 500
+    assert dados['snapshot'] is None and dados['consultas'] is None
+    assert dados['pendentes'] is not None and dados['indice'] is not None
+
+
+def test_falha_na_carga_repete_com_espera_crescente(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "df_compra.csv")
+    with open(caminho, "w") as arquivo:
+        arquivo.write("numeropedido\n1\n")
+    agora = [1000.0]
+    chamadas = []
+
+    def falhar(caminho):
+        chamadas.append(agora[0])
+        raise ValueError("CSV inválido")
+
+    monkeypatch.setattr(atualizacao.time, 'monotonic', lambda: agora[0])
+    monkeypatch.setitem(atualizacao.PREPARADORES, "compras", falhar)
+    monkeypatch.setattr(atualizacao, 'ESPERA_NOVA_TENTATIVA', 5)
+    monkeypatch.setattr(atualizacao, 'ESPERA_MAXIMA_TENTATIVA', 12)
+
+    for passo in range(40):
+        atualizacao.atualizar({"compras": caminho})
+        agora[0] += 1
+
+    # Esperas de 5, 10 e depois 12 s (o máximo) entre as tentativas com o mesmo arquivo
+    assert [chamada - chamadas[0] for chamada in chamadas] == [0, 5, 15, 27, 39]
+    dados = atualizacao.dados_atuais()["compras"]
+    assert dados['erro'] == "CSV inválido" and dados['tentativas'] == 5
+
+    # Arquivo novo: tenta na hora, com a contagem zerada
+    with open(caminho, "a") as arquivo:
+        arquivo.write("2\n")
+    atualizacao.atualizar({"compras": caminho})
+    assert chamadas[-1] == agora[0]
+    assert atualizacao.dados_atuais()["compras"]['tentativas'] == 1
+
+
+@pytest.mark.skipif(not consultas.consultas_disponiveis() or dados.ds is None, reason="duckdb ou pyarrow não instalado")
+def test_backend_sql_nao_carrega_o_csv_no_pandas(tmp_path, monkeypatch):
+    caminhos = {"vendas": gravar_sintetico(str(tmp_path / "df_vendas.csv"), "vendas", 2000),
+                "compras": gravar_sintetico(str(tmp_path / "df_compra.csv"), "compras", 2000)}
+    # O banco é gravado no diretório padrão, relativo ao diretório atual
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(consultas, 'BACKEND_CONSULTAS', "duckdb")
+
+    def falhar(*args):
+        raise AssertionError("o CSV inteiro foi carregado no pandas")
+
+    monkeypatch.setattr(atualizacao, 'carregar_dataset', falhar)
+    monkeypatch.setattr(atualizacao, 'ler_vendas', falhar)
+    monkeypatch.setattr(atualizacao, 'ler_compras', falhar)
+
+    assert sorted(atualizacao.atualizar(caminhos)) == ["compras", "vendas"]
+    vendas = atualizacao.dados_atuais()["vendas"]
+    assert 'erro' not in vendas and vendas['df'] is None and not vendas['agregado']
+    assert vendas['consultas'] is not None
+    assert vendas['cubo'] is not None and vendas['indice_faturado'] is not None
+    assert vendas['df_tickets']['NF'].is_unique
+
+    compras = atualizacao.dados_atuais()["compras"]
+    assert 'erro' not in compras and compras['df'] is None and not compras['agregado']
+    assert compras['consultas'] is not None and compras['particoes'] is not None
+    assert compras['pendentes'] is not None
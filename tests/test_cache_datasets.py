@@ -0,0 +1,34 @@
+import pandas as pd
+
+from dados import carregar_dataset, estatisticas_cache
+
+
+def test_segunda_leitura_vem_do_cache(csv_vendas):
+    caminho = csv_vendas(50)
+    primeiro = carregar_dataset(caminho)
+    segundo = carregar_dataset(caminho)
+
+    assert segundo is primeiro
+    pd.testing.assert_frame_equal(primeiro, pd.read_csv(caminho))
+    assert estatisticas_cache()['hits'] == 1
+    assert estatisticas_cache()['misses'] == 1
+
+
+def test_arquivo_reescrito_e_relido(csv_vendas):
+    caminho = csv_vendas(50)
+    carregar_dataset(caminho)
+    # Reescrito com outro conteúdo (e outro tamanho): não pode servir a versão anterior
+    csv_vendas(20)
+
+    df = carregar_dataset(caminho)
+    pd.testing.assert_frame_equal(df, pd.read_csv(caminho))
+    assert estatisticas_cache()['misses'] == 2
+
+
+def test_caminhos_diferentes_nao_dividem_entrada(csv_vendas):
+    caminho_a = csv_vendas(30, "a/df_vendas.csv")
+    caminho_b = csv_vendas(40, "b/df_vendas.csv")
+
+    assert len(carregar_dataset(caminho_a)) == 30
+    assert len(carregar_dataset(caminho_b)) == 40
+    assert len(carregar_dataset(caminho_a)) == 30
@@ -0,0 +1,51 @@
+import json
+
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+from cache_resultados import CacheLRU, tamanho_em_bytes
+
+
+def figura():
+    return px.bar(pd.DataFrame({'Linha': ['A', 'B'], 'Valor': [1.0, 2.0]}), x='Linha', y='Valor', title='Vendas')
+
+
+def test_figura_do_cache_e_independente():
+    cache = CacheLRU(10 * 1024 ** 2)
+    original = figura()
+    esperado = json.loads(pio.to_json(original, validate=False))
+    tabela = pd.DataFrame({'Valor': [1.0]})
+    cache.guardar('chave', ({'total': 3}, [tabela, original]))
+
+    # Quem guardou ou leu pode alterar a figura sem mudar o que o cache entrega depois
+    original.update_layout(title='alterada')
+    metricas, resultados = cache.obter('chave')
+    resultados[1].update_layout(title='alterada de novo')
+    _, de_novo = cache.obter('chave')
+
+    assert metricas == {'total': 3}
+    assert de_novo[0] is tabela
+    assert de_novo[1] is not resultados[1]
+    assert json.loads(pio.to_json(de_novo[1], validate=False)) == esperado
+
+
+def test_tamanho_e_o_do_json_guardado():
+    cache = CacheLRU(10 * 1024 ** 2)
+    cache.guardar('chave', (None, [figura()]))
+
+    tamanho_json = len(pio.to_json(figura(), validate=False))
+    assert tamanho_json <= cache.estatisticas()['mb'] * 1024 ** 2 <= tamanho_json + 1024
+
+
+def test_remove_as_entradas_mais_antigas():
+    tabela = pd.DataFrame({'Valor': range(1000)})
+    cache = CacheLRU(int(tamanho_em_bytes(tabela) * 2.5))
+    for chave in 'abc':
+        cache.guardar(chave, tabela)
+    cache.obter('b')
+    cache.guardar('d', tabela)
+
+    assert cache.obter('a') is None and cache.obter('c') is None
+    assert cache.obter('b') is tabela and cache.obter('d') is tabela
+    assert cache.estatisticas()['removidas'] == 2
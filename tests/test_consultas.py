@@ -0,0 +1,68 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+import consultas
+from calculos import agrupar_e_somar, calcular_metricas, calcular_metricas_compras
+from compras import filtros_para_leitura as filtros_compras
+from consultas import abrir_consultas, metricas_compras, metricas_vendas
+from dados import ler_compras, ler_vendas
+from meu_app import aplicar_filtros, filtros_para_leitura
+
+pytestmark = pytest.mark.skipif(not consultas.consultas_disponiveis(), reason="duckdb não instalado")
+
+
+@pytest.fixture
+def abrir(tmp_path, monkeypatch):
+    monkeypatch.setattr(consultas, 'BACKEND_CONSULTAS', "duckdb")
+
+    def abrir(caminho, tipo):
+        return abrir_consultas(caminho, tipo, destino=str(tmp_path / "duckdb"))
+    return abrir
+
+
+def test_metricas_de_vendas_iguais_as_do_pandas(csv_sintetico, abrir):
+    caminho = csv_sintetico("vendas", 3000)
+    df = ler_vendas(caminho)
+    banco = abrir(caminho, "vendas")
+
+    for filtros in itertools.product(['Todos', df['Vendedor'].iloc[0]], ['Todos', int(df['Mes'].iloc[0])],
+                                     ['Todos', int(df['Ano'].iloc[0])], ['Faturada', 'Cancelada', 'Todos']):
+        df_filtrado = aplicar_filtros(df, *filtros)
+        leitura = filtros_para_leitura(*filtros)
+        assert metricas_vendas(banco, leitura) == pytest.approx(calcular_metricas(df_filtrado)), filtros
+
+        esperado = agrupar_e_somar(df_filtrado, 'Linha').sort_values('Linha', ignore_index=True)
+        obtido = banco.somar_por(leitura, ['Linha'], list(esperado.columns[1:]))
+        assert obtido['Linha'].tolist() == esperado['Linha'].astype(str).tolist(), filtros
+        for coluna in esperado.columns[1:]:
+            assert obtido[coluna].tolist() == pytest.approx(esperado[coluna].tolist()), (filtros, coluna)
+
+
+def test_metricas_de_compras_iguais_as_do_pandas(csv_sintetico, abrir):
+    caminho = csv_sintetico("compras", 3000)
+    df = ler_compras(caminho)
+    banco = abrir(caminho, "compras")
+
+    anos = sorted(df['ano'].dropna().unique().tolist())
+    for filtros in itertools.product(anos, ['todos', 'Jan'], ['todos', df['usuario'].iloc[0]],
+                                     ['todos', 'pendente'], ['todos', df['tipo fornecedor'].iloc[0]]):
+        filtros = filtros_compras(*filtros)
+        mascara = pd.Series(True, index=df.index)
+        for coluna, valor in filtros.items():
+            mascara &= df[coluna] == valor
+        assert metricas_compras(banco, filtros) == pytest.approx(calcular_metricas_compras(df[mascara])), filtros
+
+
+def test_exportacao_igual_as_linhas_filtradas(csv_sintetico, abrir):
+    caminho = csv_sintetico("vendas", 3000)
+    df = ler_vendas(caminho)
+    banco = abrir(caminho, "vendas")
+
+    filtros = ('Todos', 'Todos', 'Todos', 'Faturada')
+    exportado = pd.concat(banco.lotes(filtros_para_leitura(*filtros), tamanho_lote=500), ignore_index=True)
+    esperado = aplicar_filtros(df, *filtros)
+    assert len(exportado) == len(esperado)
+    assert sorted(exportado['NF'].tolist()) == sorted(esperado['NF'].tolist())
+    assert exportado['Valor_Total_Item'].sum() == pytest.approx(esperado['Valor_Total_Item'].sum())
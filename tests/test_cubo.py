@@ -0,0 +1,55 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+from calculos import agrupar_e_somar, calcular_metricas, produtos_mais_vendidos
+from cubo import atualizar_cubo, calcular_metricas_cubo, construir_cubo
+from dados import concatenar, ler_vendas
+from meu_app import aplicar_filtros
+
+
+@pytest.fixture
+def vendas(csv_sintetico):
+    return ler_vendas(csv_sintetico("vendas", 4000))
+
+
+def combinacoes(df):
+    # Cada filtro com 'Todos' e um valor presente nos dados; a situação também com a cancelada
+    return itertools.product(['Todos', 'DENIS SOUSA'], ['Todos', 3], ['Todos', int(df['Ano'].max())],
+                             ['Faturada', 'Cancelada', 'Todos'])
+
+
+def filtrar_cuboide(cubo, nome, filtros):
+    # Como renderizar_pagina_vendas filtra os cubóides
+    return aplicar_filtros(cubo[nome], *filtros, indice=cubo['indices'][nome])
+
+
+def test_metricas_do_cubo_iguais_as_do_dataset(vendas):
+    cubo = construir_cubo(vendas)
+    for filtros in combinacoes(vendas):
+        esperado = calcular_metricas(aplicar_filtros(vendas, *filtros))
+        obtido = calcular_metricas_cubo(filtrar_cuboide(cubo, 'base', filtros), filtrar_cuboide(cubo, 'notas', filtros))
+        assert obtido == pytest.approx(esperado), filtros
+
+
+def test_graficos_do_cubo_iguais_aos_do_dataset(vendas):
+    cubo = construir_cubo(vendas)
+    for filtros in combinacoes(vendas):
+        df_filtrado = aplicar_filtros(vendas, *filtros)
+        for nome, coluna in (('linha', 'Linha'), ('base', 'Vendedor'), ('cliente', 'Cliente')):
+            pd.testing.assert_frame_equal(agrupar_e_somar(filtrar_cuboide(cubo, nome, filtros), coluna),
+                                          agrupar_e_somar(df_filtrado, coluna), check_categorical=False)
+        pd.testing.assert_frame_equal(produtos_mais_vendidos(filtrar_cuboide(cubo, 'produto', filtros)).reset_index(drop=True),
+                                      produtos_mais_vendidos(df_filtrado).reset_index(drop=True),
+                                      check_categorical=False, check_dtype=False)
+
+
+def test_cubo_atualizado_com_delta_igual_ao_reconstruido(vendas):
+    inicio, delta = vendas.iloc[:3000], vendas.iloc[3000:]
+    atualizado = atualizar_cubo(construir_cubo(inicio), delta)
+    completo = construir_cubo(concatenar([inicio, delta]))
+    for filtros in combinacoes(vendas):
+        assert (calcular_metricas_cubo(filtrar_cuboide(atualizado, 'base', filtros), filtrar_cuboide(atualizado, 'notas', filtros))
+                == pytest.approx(calcular_metricas_cubo(filtrar_cuboide(completo, 'base', filtros),
+                                                        filtrar_cuboide(completo, 'notas', filtros)))), filtros
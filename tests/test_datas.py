@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dados import COLUNAS_DATA, converter_datas, ler_compras, ler_vendas, normalizar_datas
+
+
+def textos_de_datas(formatos, quantidade=2000):
+    rng = np.random.default_rng(5)
+    datas = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 900, quantidade), unit='D')
+    formato = rng.choice(formatos, quantidade)
+    textos = pd.Series([data.strftime(f) for data, f in zip(datas, formato)], dtype=object)
+    # Valores que não são datas e vazios, repetidos como num export real
+    textos[::97] = 'sem data'
+    textos[::131] = '31/02/2024'
+    textos[::173] = np.nan
+    return textos
+
+
+@pytest.mark.parametrize("formato,formatos", [
+    (None, ['%d/%m/%Y', '%d/%m/%Y %H:%M:%S', '%Y-%m-%d']),
+    ('%d/%m/%Y', ['%d/%m/%Y']),
+])
+def test_converter_datas_igual_ao_to_datetime(formato, formatos):
+    textos = textos_de_datas(formatos)
+    if formato is None:
+        esperado = pd.to_datetime(textos, format='mixed', dayfirst=True, errors='coerce')
+    else:
+        esperado = pd.to_datetime(textos, format=formato, errors='coerce')
+
+    datas, invalidos = converter_datas(textos, formato)
+    pd.testing.assert_series_equal(datas, esperado, check_names=False)
+    assert sorted(invalidos) == ['31/02/2024', 'sem data']
+    # Segunda conversão servida pelo cache de texto -> data, com o mesmo resultado
+    pd.testing.assert_series_equal(converter_datas(textos, formato)[0], esperado, check_names=False)
+
+
+def test_normalizar_datas_registra_as_invalidas():
+    textos = textos_de_datas(['%d/%m/%Y'])
+    df = normalizar_datas(pd.DataFrame({'data emissao': textos}), {'data emissao': '%d/%m/%Y'})
+    linhas, exemplos = df.attrs['datas_invalidas']['data emissao']
+    assert linhas == int((textos.notna() & pd.to_datetime(textos, format='%d/%m/%Y', errors='coerce').isna()).sum())
+    assert sorted(exemplos) == ['31/02/2024', 'sem data']
+
+
+@pytest.mark.parametrize("tipo,ler", [("vendas", ler_vendas), ("compras", ler_compras)])
+def test_leitores_convertem_como_o_parse_por_rerun(csv_sintetico, tipo, ler):
+    # Antes, cada página chamava pd.to_datetime(..., dayfirst=True) sobre o texto a cada rerun
+    caminho = csv_sintetico(tipo, 3000)
+    bruto = pd.read_csv(caminho, dtype=str)
+    df = ler(caminho)
+    for coluna in COLUNAS_DATA[tipo]:
+        esperado = pd.to_datetime(bruto[coluna], format='mixed', dayfirst=True, errors='coerce')
+        pd.testing.assert_series_equal(df[coluna], esperado, check_names=False)
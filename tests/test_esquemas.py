@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from dados import COLUNAS_DATA, ESQUEMAS, LEITORES, normalizar_datas, relatorio_memoria
+
+
+@pytest.fixture(params=["vendas", "compras"])
+def leituras(request, csv_sintetico):
+    tipo = request.param
+    caminho = csv_sintetico(tipo, 3000)
+    # Com ESQUEMAS (bloco a bloco) e com os tipos padrão do pandas, de uma vez
+    return tipo, LEITORES[tipo](caminho), normalizar_datas(pd.read_csv(caminho), COLUNAS_DATA[tipo]), caminho
+
+
+def test_colunas_com_os_tipos_do_esquema(leituras):
+    tipo, df, _, _ = leituras
+    for coluna, esperado in ESQUEMAS[tipo].items():
+        assert str(df[coluna].dtype) == esperado, coluna
+
+
+def test_valores_iguais_aos_da_leitura_sem_esquema(leituras):
+    tipo, df, padrao, _ = leituras
+    assert list(df.columns) == list(padrao.columns)
+    for coluna, esperado in ESQUEMAS[tipo].items():
+        if esperado == 'category':
+            pd.testing.assert_series_equal(df[coluna].astype(object), padrao[coluna].astype(object), check_dtype=False)
+        else:
+            # Inteiros anuláveis e floats: mesmos valores, com os nulos nas mesmas linhas
+            assert (df[coluna].isna() == padrao[coluna].isna()).all(), coluna
+            assert df[coluna].astype('float64').tolist() == pytest.approx(padrao[coluna].astype('float64').tolist(),
+                                                                          nan_ok=True), coluna
+
+
+def test_somas_e_contagens_iguais(leituras):
+    tipo, df, padrao, _ = leituras
+    for coluna, esperado in ESQUEMAS[tipo].items():
+        if esperado == 'category':
+            pd.testing.assert_series_equal(df[coluna].value_counts().astype('int64').sort_index(),
+                                           padrao[coluna].value_counts().astype('int64').sort_index(),
+                                           check_index_type=False, check_categorical=False)
+        else:
+            assert float(df[coluna].sum()) == pytest.approx(float(padrao[coluna].sum())), coluna
+
+
+def test_esquema_reduz_a_memoria(leituras):
+    tipo, _, _, caminho = leituras
+    relatorio = relatorio_memoria(caminho, tipo)
+    assert relatorio.loc['TOTAL', 'redução'] > 1
@@ -0,0 +1,68 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import exportacao
+from exportacao import ExportacaoExcedida, lotes_dataframe, montar_arquivo
+
+
+def vendas(linhas=2500):
+    rng = np.random.default_rng(8)
+    return pd.DataFrame({
+        'NF': np.arange(linhas),
+        'Data_Emissao': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365, linhas), unit='D'),
+        'Vendedor': pd.Categorical(rng.choice(['DENIS SOUSA', 'CESAR GAMA'], linhas)),
+        'Valor_Total_Item': rng.random(linhas) * 1000,
+    })
+
+
+def test_csv_em_lotes_igual_ao_csv_inteiro():
+    df = vendas()
+
+    arquivo = montar_arquivo(lambda: lotes_dataframe(df, 700), "csv", "teste")
+
+    assert arquivo.getvalue() == df.to_csv(index=False, date_format='%d/%m/%Y').encode("utf-8")
+
+
+@pytest.mark.skipif(exportacao.pa is None, reason="pyarrow não instalado")
+def test_parquet_em_lotes_tem_as_mesmas_linhas():
+    df = vendas()
+
+    arquivo = montar_arquivo(lambda: lotes_dataframe(df, 700), "parquet", "teste")
+
+    pd.testing.assert_frame_equal(pd.read_parquet(io.BytesIO(arquivo.getvalue())), df)
+
+
+def test_selecao_vazia_sai_so_com_o_cabecalho():
+    df = vendas().iloc[:0]
+
+    arquivo = montar_arquivo(lambda: lotes_dataframe(df), "csv", "teste")
+
+    assert arquivo.getvalue() == b"NF,Data_Emissao,Vendedor,Valor_Total_Item\n"
+
+
+def test_exportacao_acima_do_limite_e_interrompida(monkeypatch):
+    df = vendas()
+    tamanho = len(df.to_csv(index=False).encode("utf-8"))
+    lidos = []
+
+    def lotes():
+        for lote in lotes_dataframe(df, 100):
+            lidos.append(len(lote))
+            yield lote
+
+    monkeypatch.setattr(exportacao, 'LIMITE_EXPORTACAO_MB', tamanho / 2 / 1024 ** 2)
+    # Mais recusas que vagas: cada uma devolve a sua vaga ao ser interrompida
+    for _ in range(exportacao.EXPORTACOES_SIMULTANEAS + 1):
+        lidos.clear()
+        with pytest.raises(ExportacaoExcedida, match="aplique mais filtros"):
+            montar_arquivo(lotes, "csv", "teste")
+        # Para no lote que passa do limite, sem ler o resto
+        assert sum(lidos) < len(df) * 0.6
+    assert len(montar_arquivo(lambda: lotes_dataframe(df.iloc[:100]), "csv", "teste").getvalue()) > 0
+
+
+def test_exportacoes_simultaneas_cabem_no_orcamento():
+    assert exportacao.LIMITE_EXPORTACAO_MB * exportacao.EXPORTACOES_SIMULTANEAS <= exportacao.MEMORIA_EXPORTACAO_MB
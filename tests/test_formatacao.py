@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import formatacao
+from formatacao import formatar_moeda_serie
+
+
+def formatar_moeda_original(valor, simbolo_moeda='R$'):
+    # Formatação por célula que as páginas usavam antes da versão vetorizada
+    if pd.isna(valor):
+        return ''
+    return f"{simbolo_moeda} {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+VALORES = [0.0, 0.004, 0.005, 0.015, 1.0, 2.675, 12.5, 999.995, 1000.0, 1234567.891, 987654321.0,
+           -0.5, -1234.56, -1000000.004, np.nan, 10 ** 12 + 0.01]
+
+
+@pytest.fixture(params=["pyarrow", "sem pyarrow"])
+def caminho(request, monkeypatch):
+    if request.param == "sem pyarrow":
+        monkeypatch.setattr(formatacao, "pc", None)
+    elif formatacao.pc is None:
+        pytest.skip("pyarrow não instalado")
+    return request.param
+
+
+def test_igual_a_formatacao_por_celula(caminho):
+    esperado = [formatar_moeda_original(valor) for valor in VALORES]
+    assert formatar_moeda_serie(VALORES).tolist() == esperado
+
+
+def test_valores_aleatorios(caminho):
+    valores = np.random.default_rng(3).normal(0, 1e6, 5000).round(3)
+    esperado = [formatar_moeda_original(valor) for valor in valores]
+    assert formatar_moeda_serie(valores).tolist() == esperado
+
+
+def test_preserva_indice_e_aceita_vazio(caminho):
+    serie = pd.Series([10.0, None], index=['a', 'b'])
+    resultado = formatar_moeda_serie(serie)
+    assert resultado.to_dict() == {'a': 'R$ 10,00', 'b': ''}
+    assert formatar_moeda_serie(pd.Series([], dtype='float64')).empty
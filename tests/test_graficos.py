@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import graficos
+from graficos import reduzir_pontos, resumir_caixas, traco_caixa
+
+
+def caixa_com_numpy(valores):
+    # Regra do Plotly (quartilemethod 'linear', cercas a 1,5 IQR) calculada grupo a grupo
+    valores = valores[~np.isnan(valores)]
+    q1, mediana, q3 = np.percentile(valores, [25, 50, 75])
+    iqr = q3 - q1
+    dentro = valores[(valores >= q1 - 1.5 * iqr) & (valores <= q3 + 1.5 * iqr)]
+    fora = valores[(valores < q1 - 1.5 * iqr) | (valores > q3 + 1.5 * iqr)]
+    return q1, mediana, q3, dentro.min(), dentro.max(), np.sort(fora)
+
+
+def amostra():
+    rng = np.random.default_rng(5)
+    linhas = 4000
+    grupos = rng.choice(['A', 'B', 'C', 'D'], linhas)
+    valores = rng.lognormal(3, 1, linhas)
+    valores[::97] = np.nan
+    # Um grupo de uma linha só e um com todos os valores iguais
+    grupos = np.append(grupos, ['E', 'F', 'F', 'F'])
+    valores = np.append(valores, [7.0, 2.0, 2.0, 2.0])
+    return grupos, valores
+
+
+def test_caixas_iguais_ao_calculo_por_grupo():
+    grupos, valores = amostra()
+    resumo = resumir_caixas(grupos, valores)
+
+    assert list(resumo.index) == sorted(set(grupos))
+    for grupo in resumo.index:
+        q1, mediana, q3, inferior, superior, fora = caixa_com_numpy(valores[grupos == grupo])
+        linha = resumo.loc[grupo]
+        assert linha['q1'] == pytest.approx(q1)
+        assert linha['mediana'] == pytest.approx(mediana)
+        assert linha['q3'] == pytest.approx(q3)
+        assert linha['cerca_inferior'] == pytest.approx(inferior)
+        assert linha['cerca_superior'] == pytest.approx(superior)
+        np.testing.assert_allclose(np.sort(linha['outliers']), fora)
+
+
+def test_outliers_limitados_aos_mais_distantes(monkeypatch):
+    monkeypatch.setattr(graficos, 'MAX_OUTLIERS_CAIXA', 5)
+    valores = np.concatenate([np.full(200, 10.0), np.arange(100.0, 120.0)])
+    grupos = np.full(len(valores), 'A')
+
+    resumo = resumir_caixas(grupos, valores)
+
+    np.testing.assert_array_equal(np.sort(resumo.at['A', 'outliers']), np.arange(115.0, 120.0))
+
+
+def test_traco_caixa_usa_o_resumo():
+    grupos, valores = amostra()
+    resumo = resumir_caixas(grupos, valores)
+
+    traco = traco_caixa(grupos, valores, 'Valor', rotulos={grupo: f"G{grupo}" for grupo in resumo.index})
+
+    assert list(traco.x) == [f"G{grupo}" for grupo in resumo.index]
+    assert list(traco.median) == pytest.approx(resumo['mediana'].tolist())
+    assert [len(pontos) for pontos in traco.y] == [len(outliers) for outliers in resumo['outliers']]
+
+
+def serie(linhas, semente=3):
+    rng = np.random.default_rng(semente)
+    datas = pd.date_range('2020-01-01', periods=linhas, freq='D')
+    df = pd.DataFrame({'Data': datas, 'Valor': rng.normal(100, 20, linhas)})
+    df.loc[::101, 'Valor'] = np.nan
+    return df
+
+
+def test_serie_curta_nao_muda():
+    df = serie(200)
+    assert reduzir_pontos(df, 'Valor', max_pontos=200) is df
+
+
+@pytest.mark.parametrize('linhas,max_pontos', [(5000, 300), (1501, 1500), (10_000, 7)])
+def test_reducao_mantem_minimo_e_maximo_de_cada_trecho(linhas, max_pontos):
+    df = serie(linhas)
+
+    reduzido = reduzir_pontos(df, 'Valor', max_pontos=max_pontos)
+
+    assert len(reduzido) <= max_pontos
+    # As linhas saem do próprio df, na ordem original
+    assert reduzido.index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(reduzido, df.loc[reduzido.index])
+    assert reduzido['Valor'].min() == df['Valor'].min()
+    assert reduzido['Valor'].max() == df['Valor'].max()
+    limites = np.linspace(0, linhas, max_pontos // 2 + 1).astype(int)
+    for inicio, fim in zip(limites[:-1], limites[1:]):
+        trecho = df['Valor'].iloc[inicio:fim]
+        mantidos = reduzido['Valor'][(reduzido.index >= inicio) & (reduzido.index < fim)]
+        assert mantidos.min() == trecho.min()
+        assert mantidos.max() == trecho.max()
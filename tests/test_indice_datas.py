@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filtros import IndiceDatas
+
+
+def periodo_com_mascara(df, inicio, fim):
+    # Como o comparativo filtrava antes do índice: máscara >= inicio & <= fim sobre o df inteiro
+    return df[(df['Data_Emissao'] >= inicio) & (df['Data_Emissao'] <= fim)]
+
+
+def diario_com_mascara(df, inicio, fim):
+    periodo = periodo_com_mascara(df, inicio, fim)
+    diario = periodo.groupby(periodo['Data_Emissao'].dt.normalize())['Valor_Total_Item'].sum()
+    return diario.rename_axis('Data').reset_index()
+
+
+def vendas(com_horario=False):
+    rng = np.random.default_rng(11)
+    linhas = 3000
+    datas = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 500, linhas), unit='D')
+    if com_horario:
+        datas = datas + pd.to_timedelta(rng.integers(0, 86400, linhas), unit='s')
+    df = pd.DataFrame({'Data_Emissao': datas, 'Valor_Total_Item': rng.random(linhas) * 1000})
+    # Datas que não puderam ser convertidas na carga e valores vazios
+    df.loc[::250, 'Data_Emissao'] = pd.NaT
+    df.loc[::333, 'Valor_Total_Item'] = np.nan
+    return df
+
+
+PERIODOS = [
+    ('2024-03-01', '2024-03-31'),
+    ('2024-06-15', '2024-06-15'),   # um único dia
+    ('2023-01-01', '2023-12-31'),   # antes de todos os dados
+    ('2024-01-01', '2025-12-31'),   # todo o histórico
+    ('2024-05-10', '2024-05-01'),   # fim antes do início
+]
+
+
+@pytest.mark.parametrize("com_horario", [False, True])
+@pytest.mark.parametrize("inicio,fim", PERIODOS)
+def test_soma_e_fatia_iguais_as_mascaras(com_horario, inicio, fim):
+    df = vendas(com_horario)
+    indice = IndiceDatas(df, 'Data_Emissao', 'Valor_Total_Item')
+    esperado = periodo_com_mascara(df, pd.Timestamp(inicio), pd.Timestamp(fim))
+
+    assert indice.soma(inicio, fim) == pytest.approx(esperado['Valor_Total_Item'].sum())
+    fatia = indice.fatia(inicio, fim)
+    assert sorted(fatia.index) == sorted(esperado.index)
+
+
+@pytest.mark.parametrize("com_horario", [False, True])
+@pytest.mark.parametrize("inicio,fim", PERIODOS)
+def test_vendas_diarias_iguais_ao_groupby(com_horario, inicio, fim):
+    df = vendas(com_horario)
+    indice = IndiceDatas(df, 'Data_Emissao', 'Valor_Total_Item')
+    esperado = diario_com_mascara(df, pd.Timestamp(inicio), pd.Timestamp(fim))
+
+    resultado = indice.vendas_diarias(inicio, fim)
+    assert list(resultado['Data']) == list(esperado['Data'])
+    np.testing.assert_allclose(resultado['Valor_Total_Item'], esperado['Valor_Total_Item'])
+
+
+def test_fatia_e_contigua_e_ordenada():
+    indice = IndiceDatas(vendas(), 'Data_Emissao', 'Valor_Total_Item')
+    fatia = indice.fatia('2024-02-01', '2024-02-29')
+    assert fatia['Data_Emissao'].is_monotonic_increasing
+    assert fatia['Data_Emissao'].notna().all()
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filtros import DIMENSOES_VENDAS, IndiceFiltros
+
+
+def filtrar_com_mascaras(df, filtros):
+    # Como as páginas filtravam antes do índice: uma máscara por filtro
+    mascara = pd.Series(True, index=df.index)
+    for coluna, valor in filtros.items():
+        mascara &= df[coluna] == valor
+    return df[mascara]
+
+
+@pytest.fixture
+def vendas():
+    rng = np.random.default_rng(7)
+    linhas = 2000
+    df = pd.DataFrame({
+        'Vendedor': pd.Categorical(rng.choice(['ANA', 'BRUNO', 'CARLA'], linhas)),
+        'Mes': pd.array(rng.integers(1, 13, linhas), dtype='Int8'),
+        'Ano': pd.array(rng.choice([2024, 2025], linhas), dtype='Int16'),
+        'situacao': pd.Categorical(rng.choice(['Faturada', 'Cancelada'], linhas, p=[0.9, 0.1])),
+        'Valor_Total_Item': rng.random(linhas) * 1000,
+    })
+    # Dimensão com vazios: as linhas nulas ficam fora de qualquer filtro de igualdade
+    df.loc[::97, 'Vendedor'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("filtros", [
+    {'Vendedor': 'ANA'},
+    {'Mes': 3, 'Ano': 2025},
+    {'Vendedor': 'BRUNO', 'Mes': 12, 'Ano': 2024, 'situacao': 'Faturada'},
+    {'situacao': 'Cancelada'},
+])
+def test_mesmas_linhas_que_as_mascaras(vendas, filtros):
+    indice = IndiceFiltros(vendas, DIMENSOES_VENDAS)
+    esperado = filtrar_com_mascaras(vendas, filtros)
+    pd.testing.assert_frame_equal(indice.filtrar(filtros), esperado)
+
+
+def test_sem_filtro_devolve_o_dataset(vendas):
+    indice = IndiceFiltros(vendas, DIMENSOES_VENDAS)
+    assert indice.filtrar({}) is vendas
+
+
+def test_valor_ausente_devolve_vazio(vendas):
+    indice = IndiceFiltros(vendas, DIMENSOES_VENDAS)
+    resultado = indice.filtrar({'Vendedor': 'NINGUEM', 'Mes': 1})
+    assert resultado.empty
+    assert list(resultado.columns) == list(vendas.columns)
+
+
+def test_valores_nao_incluem_nulos(vendas):
+    indice = IndiceFiltros(vendas, DIMENSOES_VENDAS)
+    assert sorted(indice.valores('Vendedor')) == ['ANA', 'BRUNO', 'CARLA']
+
+
+@pytest.mark.parametrize("selecao", [
+    ('Todos', 'Todos', 'Todos', 'Faturada'),
+    ('ANA', 5, 2025, 'Faturada'),
+    ('CARLA', 'Todos', 2024, 'Todos'),
+    ('Todos', 'Todos', 'Todos', 'Todos'),
+])
+def test_aplicar_filtros_da_visao_geral_com_indice(vendas, selecao):
+    from meu_app import aplicar_filtros
+
+    indice = IndiceFiltros(vendas, DIMENSOES_VENDAS)
+    pd.testing.assert_frame_equal(aplicar_filtros(vendas, *selecao, indice=indice), aplicar_filtros(vendas, *selecao))
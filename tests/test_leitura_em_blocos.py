@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+import dados
+from cubo import AGREGADOS_VENDAS, calcular_metricas_cubo, construir_cubo
+from dados import (COLUNAS_DATA, ESQUEMAS, MemoriaExcedida, carregar_agregados, carregar_dataset, ler_em_blocos,
+                   ler_vendas, normalizar_datas)
+
+
+def leitura_unica(caminho, tipo):
+    # O CSV inteiro de uma vez, com o mesmo esquema e a mesma conversão de datas
+    return normalizar_datas(pd.read_csv(caminho, dtype=ESQUEMAS[tipo]), COLUNAS_DATA[tipo])
+
+
+@pytest.mark.parametrize("tipo", ["vendas", "compras"])
+def test_blocos_iguais_a_leitura_unica(csv_sintetico, tipo):
+    caminho = csv_sintetico(tipo, 2500)
+    df = ler_em_blocos(caminho, tipo, tamanho_bloco=300)
+    esperado = leitura_unica(caminho, tipo)
+    pd.testing.assert_frame_equal(df, esperado, check_categorical=False)
+    # As category continuam category depois de juntar blocos com categorias diferentes
+    assert (df.dtypes == esperado.dtypes).all()
+    assert df.attrs['datas_invalidas'] == esperado.attrs['datas_invalidas']
+
+
+def test_acima_do_teto_levanta_memoria_excedida(csv_sintetico):
+    caminho = csv_sintetico("vendas", 2500)
+    uso_mb = leitura_unica(caminho, "vendas").memory_usage(deep=True).sum() / 1024 ** 2
+    with pytest.raises(MemoriaExcedida):
+        ler_em_blocos(caminho, "vendas", limite_memoria_mb=uso_mb / 2, tamanho_bloco=300)
+    assert len(ler_em_blocos(caminho, "vendas", limite_memoria_mb=uso_mb * 2, tamanho_bloco=300)) == 2500
+
+
+def test_acima_do_teto_so_os_agregados_servem_o_arquivo(csv_sintetico, monkeypatch):
+    caminho = csv_sintetico("vendas", 2500)
+    cubo_completo = construir_cubo(ler_vendas(caminho))
+    monkeypatch.setattr(dados, "LIMITE_MEMORIA_MB", 0.01)
+    monkeypatch.setattr(dados, "TAMANHO_BLOCO", 300)
+
+    assert carregar_dataset(caminho, ler_vendas) is None
+    cubo = carregar_agregados(caminho, "vendas", AGREGADOS_VENDAS)['cubo']
+    assert (calcular_metricas_cubo(cubo['base'], cubo['notas'])
+            == pytest.approx(calcular_metricas_cubo(cubo_completo['base'], cubo_completo['notas'])))
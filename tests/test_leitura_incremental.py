@@ -0,0 +1,186 @@
+import os
+
+import pandas as pd
+
+import dados
+from conftest import linhas_vendas
+from dados import carregar_agregados, carregar_dataset, estatisticas_cache, ler_vendas
+
+
+def acrescentar(caminho, texto):
+    with open(caminho, 'a', encoding='utf-8') as arquivo:
+        arquivo.write(texto)
+
+
+def comparar_com_leitura_completa(df, caminho, leitor=pd.read_csv):
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), leitor(caminho).reset_index(drop=True),
+                                  check_categorical=False)
+
+
+def test_so_as_linhas_novas_sao_lidas(csv_vendas):
+    caminho = csv_vendas(40)
+    carregar_dataset(caminho)
+    acrescentar(caminho, linhas_vendas(10, 40))
+
+    df = carregar_dataset(caminho)
+    comparar_com_leitura_completa(df, caminho)
+    assert estatisticas_cache()['incrementais'] == 1
+
+
+def test_linhas_repetidas_no_acrescimo_sao_mantidas(csv_vendas):
+    # O arquivo completo tem as duas cópias; a leitura incremental não pode deduplicar
+    caminho = csv_vendas(20)
+    carregar_dataset(caminho)
+    acrescentar(caminho, linhas_vendas(5, 15) + linhas_vendas(5, 15))
+
+    df = carregar_dataset(caminho)
+    comparar_com_leitura_completa(df, caminho)
+    assert len(df) == 30
+
+
+def test_acrescimo_durante_a_leitura_completa_nao_duplica(csv_vendas):
+    caminho = csv_vendas(50)
+    acrescimos = [linhas_vendas(5, 50) + "55,01/01/2025,DENIS"]
+
+    def leitor_enquanto_cresce(fonte):
+        # Na primeira leitura o ERP grava mais linhas (e começa outra) enquanto o arquivo é lido
+        if acrescimos:
+            acrescentar(caminho, acrescimos.pop())
+        return pd.read_csv(fonte)
+
+    assert len(carregar_dataset(caminho, leitor_enquanto_cresce)) == 50
+    acrescentar(caminho, linhas_vendas(1, 55)[len("55,01/01/2025,DENIS"):])
+
+    df = carregar_dataset(caminho, leitor_enquanto_cresce)
+    comparar_com_leitura_completa(df, caminho)
+    assert df['NF'].is_unique
+    assert estatisticas_cache()['incrementais'] == 1
+
+
+def test_ultima_linha_incompleta_espera_o_fim_da_escrita(csv_vendas):
+    caminho = csv_vendas(30)
+    linha = linhas_vendas(1, 30)
+    acrescentar(caminho, linha[:12])
+
+    assert len(carregar_dataset(caminho)) == 30
+    acrescentar(caminho, linha[12:])
+    df = carregar_dataset(caminho)
+    comparar_com_leitura_completa(df, caminho)
+
+
+def test_versao_mapeada_tem_so_os_bytes_do_stat(csv_vendas, monkeypatch):
+    caminho = csv_vendas(30)
+    acrescimos = [linhas_vendas(3, 30)]
+
+    def ler_vendas_enquanto_cresce(fonte):
+        if acrescimos:
+            acrescentar(caminho, acrescimos.pop())
+        return ler_vendas(fonte)
+
+    # Leitor com esquema (como ler_vendas): só esses têm versão mapeada em disco
+    monkeypatch.setitem(dados.LEITORES, "teste", ler_vendas_enquanto_cresce)
+    assert len(carregar_dataset(caminho, ler_vendas_enquanto_cresce)) == 30
+    # A versão gravada é a do stat (30 linhas), sem as linhas acrescentadas durante a leitura
+    [arquivo] = os.listdir(dados.DIRETORIO_MAPEADOS)
+    assert len(dados.ler_mapeado(os.path.join(dados.DIRETORIO_MAPEADOS, arquivo))) == 30
+
+    df = carregar_dataset(caminho, ler_vendas_enquanto_cresce)
+    comparar_com_leitura_completa(df, caminho, ler_vendas)
+
+
+def test_versao_com_linha_incompleta_nao_e_mapeada(csv_vendas):
+    caminho = csv_vendas(30)
+    acrescentar(caminho, linhas_vendas(1, 30)[:10])
+
+    assert len(carregar_dataset(caminho, ler_vendas)) == 30
+    assert not os.path.exists(dados.DIRETORIO_MAPEADOS) or not os.listdir(dados.DIRETORIO_MAPEADOS)
+
+
+def test_csvs_de_mesmo_nome_tem_versoes_mapeadas_separadas(csv_vendas):
+    caminho_a = csv_vendas(30, "a/df_vendas.csv")
+    caminho_b = csv_vendas(50, "b/df_vendas.csv")
+    carregar_dataset(caminho_a, ler_vendas)
+    carregar_dataset(caminho_b, ler_vendas)
+    assert len(os.listdir(dados.DIRETORIO_MAPEADOS)) == 2
+
+    # Nova versão de um deles substitui só a versão mapeada do mesmo caminho
+    acrescentar(caminho_a, linhas_vendas(5, 30))
+    dados.limpar_cache()
+    assert len(carregar_dataset(caminho_a, ler_vendas)) == 35
+    assert len(os.listdir(dados.DIRETORIO_MAPEADOS)) == 2
+
+    dados.limpar_cache()
+    comparar_com_leitura_completa(carregar_dataset(caminho_b, ler_vendas), caminho_b, ler_vendas)
+    comparar_com_leitura_completa(carregar_dataset(caminho_a, ler_vendas), caminho_a, ler_vendas)
+
+
+def test_agregados_acompanham_o_acrescimo(csv_vendas):
+    caminho = csv_vendas(40)
+    agregados = {'total': (lambda bloco: bloco['Valor_Total_Item'].sum(),
+                           lambda valor, bloco, df: valor + bloco['Valor_Total_Item'].sum())}
+    carregar_agregados(caminho, "vendas", agregados)
+    acrescentar(caminho, linhas_vendas(10, 40))
+
+    total = carregar_agregados(caminho, "vendas", agregados)['total']
+    assert abs(total - pd.read_csv(caminho)['Valor_Total_Item'].sum()) < 1e-6
+
+
+def arquivos_mapeados():
+    # nome -> (inode, mtime): uma regravação troca os dois
+    return {nome: (os.stat(os.path.join(dados.DIRETORIO_MAPEADOS, nome)).st_ino,
+                   os.stat(os.path.join(dados.DIRETORIO_MAPEADOS, nome)).st_mtime_ns)
+            for nome in os.listdir(dados.DIRETORIO_MAPEADOS)}
+
+
+def test_acrescimo_nao_regrava_a_versao_mapeada(csv_vendas):
+    caminho = csv_vendas(30)
+    carregar_dataset(caminho, ler_vendas)
+    mapeados = arquivos_mapeados()
+    assert len(mapeados) == 1
+
+    for inicio in (30, 35):
+        acrescentar(caminho, linhas_vendas(5, inicio))
+        comparar_com_leitura_completa(carregar_dataset(caminho, ler_vendas), caminho, ler_vendas)
+    assert estatisticas_cache()['incrementais'] == 2
+    assert arquivos_mapeados() == mapeados
+
+
+def test_acrescimo_remapeia_depois_do_intervalo(csv_vendas, monkeypatch):
+    caminho = csv_vendas(30)
+    carregar_dataset(caminho, ler_vendas)
+    [anterior] = arquivos_mapeados()
+
+    monkeypatch.setattr(dados, "INTERVALO_REMAPEAMENTO", 0)
+    acrescentar(caminho, linhas_vendas(5, 30))
+    comparar_com_leitura_completa(carregar_dataset(caminho, ler_vendas), caminho, ler_vendas)
+    [atual] = arquivos_mapeados()
+    assert atual != anterior
+    assert len(dados.ler_mapeado(os.path.join(dados.DIRETORIO_MAPEADOS, atual))) == 35
+
+
+def test_processo_novo_retoma_da_versao_mapeada(csv_vendas, monkeypatch):
+    caminho = csv_vendas(30)
+    carregar_dataset(caminho, ler_vendas)
+    acrescentar(caminho, linhas_vendas(5, 30))
+    # Processo novo: sem cache, e o CSV inteiro não pode ser relido
+    dados.limpar_cache()
+
+    def falhar(*args):
+        raise AssertionError("o CSV foi relido do início")
+
+    monkeypatch.setattr(dados, "_ler_ate", falhar)
+    comparar_com_leitura_completa(carregar_dataset(caminho, ler_vendas), caminho, ler_vendas)
+
+    # Seguem valendo as leituras incrementais a partir do ponto retomado
+    acrescentar(caminho, linhas_vendas(5, 35))
+    comparar_com_leitura_completa(carregar_dataset(caminho, ler_vendas), caminho, ler_vendas)
+    assert estatisticas_cache()['incrementais'] == 1
+
+
+def test_csv_reescrito_nao_retoma_da_versao_mapeada(csv_vendas):
+    caminho = csv_vendas(30)
+    carregar_dataset(caminho, ler_vendas)
+    # Reescrito com menos linhas: a versão mapeada não serve de base
+    csv_vendas(20)
+    dados.limpar_cache()
+    comparar_com_leitura_completa(carregar_dataset(caminho, ler_vendas), caminho, ler_vendas)
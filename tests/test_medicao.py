@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+import medicao
+from medicao import fase, rodada
+
+
+@pytest.fixture
+def registros(tmp_path, monkeypatch):
+    caminho = tmp_path / "desempenho.jsonl"
+    monkeypatch.setattr(medicao, "ARQUIVO_LOG", str(caminho))
+
+    def ler():
+        return [json.loads(linha) for linha in caminho.read_text(encoding="utf-8").splitlines()]
+    return ler
+
+
+def test_rodada_desligada_registra_so_o_total(registros):
+    with rodada("rerun completo", False) as aberta:
+        with fase("carga") as medida:
+            medida.linhas(10)
+    assert aberta is None
+    [registro] = registros()
+    assert registro['rotulo'] == "rerun completo"
+    assert registro['total_ms'] >= 0 and registro['fases'] is None
+
+
+def test_rodada_ligada_registra_as_fases(registros):
+    with rodada("rerun completo", True) as aberta:
+        with fase("carga") as medida:
+            medida.linhas(10)
+    assert aberta is not None
+    [registro] = registros()
+    assert [(f['fase'], f['linhas']) for f in registro['fases']] == [("carga", 10)]
+
+
+@pytest.mark.parametrize("ativa", [True, False])
+def test_rodada_aninhada_nao_gera_outro_registro(registros, ativa):
+    # Página decorada com medir_rodada chamada dentro do rerun completo
+    with rodada("rerun completo", ativa):
+        with rodada("Visão Geral", True) as interna:
+            assert interna is None
+    assert [registro['rotulo'] for registro in registros()] == ["rerun completo"]
+
+
+def test_logger_tem_handler_proprio():
+    assert medicao._logger.handlers and not medicao._logger.propagate
@@ -0,0 +1,99 @@
+import os
+
+import pandas as pd
+import pytest
+
+import dados
+from conftest import linhas_vendas
+from dados import abrir_particoes, caminho_parquet, ler_vendas
+from meu_app import aplicar_filtros, filtros_para_leitura
+
+pytestmark = pytest.mark.skipif(dados.ds is None, reason="pyarrow não instalado")
+
+
+def acrescentar(caminho, texto):
+    with open(caminho, 'a', encoding='utf-8') as arquivo:
+        arquivo.write(texto)
+
+
+def ordenado(df):
+    # A leitura das partições devolve as linhas agrupadas por ano/mês, não na ordem do CSV
+    return df.sort_values('NF').reset_index(drop=True)
+
+
+def comparar(lido, esperado):
+    pd.testing.assert_frame_equal(ordenado(lido[esperado.columns]), ordenado(esperado), check_categorical=False)
+
+
+def arquivos_parquet(caminho):
+    encontrados = {}
+    for raiz, _, nomes in os.walk(caminho_parquet(caminho, "vendas")):
+        for nome in nomes:
+            if nome.endswith(".parquet"):
+                encontrado = os.path.join(raiz, nome)
+                encontrados[encontrado] = os.stat(encontrado).st_mtime_ns
+    return encontrados
+
+
+def test_particoes_tem_as_mesmas_linhas_e_tipos_do_csv(csv_vendas):
+    caminho = csv_vendas(120)
+    comparar(abrir_particoes(caminho, "vendas").ler(), ler_vendas(caminho))
+
+
+def test_conversao_funciona_acima_do_teto_de_memoria(csv_vendas, monkeypatch):
+    # Blocos de 10 linhas e teto mínimo: o DataFrame inteiro não caberia, a conversão grava bloco a bloco
+    caminho = csv_vendas(120)
+    esperado = ler_vendas(caminho)
+    monkeypatch.setattr(dados, "TAMANHO_BLOCO", 10)
+    monkeypatch.setattr(dados, "LIMITE_MEMORIA_MB", 0.001)
+    with pytest.raises(dados.MemoriaExcedida):
+        ler_vendas(caminho)
+    comparar(abrir_particoes(caminho, "vendas").ler(), esperado)
+
+
+@pytest.mark.parametrize("filtros", [
+    ('Todos', 'Todos', 'Todos', 'Todos'),
+    ('Todos', 3, 2025, 'Faturada'),
+    ('DENIS SOUSA', 'Todos', 2025, 'Cancelada'),
+    ('FABIAN SILVA', 7, 'Todos', 'Todos'),
+    ('Todos', 5, 2024, 'Faturada'),
+])
+def test_filtros_na_leitura_equivalem_a_aplicar_filtros(csv_vendas, filtros):
+    caminho = csv_vendas(240)
+    particoes = abrir_particoes(caminho, "vendas")
+    comparar(particoes.ler(filtros_para_leitura(*filtros)), aplicar_filtros(ler_vendas(caminho), *filtros))
+
+
+def test_so_as_colunas_pedidas_sao_lidas(csv_vendas):
+    caminho = csv_vendas(60)
+    lido = abrir_particoes(caminho, "vendas").ler({'Mes': [1, 2]}, ['NF', 'Valor_Total_Item', 'Mes'])
+    assert list(lido.columns) == ['NF', 'Valor_Total_Item', 'Mes']
+    assert set(lido['Mes']) == {1, 2}
+
+
+def test_acrescimo_grava_arquivos_novos_sem_regravar_os_existentes(csv_vendas):
+    caminho = csv_vendas(120)
+    abrir_particoes(caminho, "vendas")
+    antes = arquivos_parquet(caminho)
+    acrescentar(caminho, linhas_vendas(30, 120))
+
+    particoes = abrir_particoes(caminho, "vendas")
+    depois = arquivos_parquet(caminho)
+    assert {arquivo: depois[arquivo] for arquivo in antes} == antes
+    assert len(depois) > len(antes)
+    comparar(particoes.ler(), ler_vendas(caminho))
+
+
+def test_csv_reescrito_gera_uma_nova_geracao(csv_vendas):
+    caminho = csv_vendas(120)
+    abrir_particoes(caminho, "vendas")
+    caminho = csv_vendas(50)
+
+    comparar(abrir_particoes(caminho, "vendas").ler(), ler_vendas(caminho))
+
+
+def test_lotes_sem_linhas_levam_as_colunas(csv_vendas):
+    caminho = csv_vendas(60)
+    lotes = list(abrir_particoes(caminho, "vendas").lotes({'Ano': 1900}))
+    assert len(lotes) == 1 and lotes[0].empty
+    assert list(lotes[0].columns) == list(ler_vendas(caminho).columns)
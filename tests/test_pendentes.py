@@ -0,0 +1,85 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dados
+from compras import atualizar_pendentes, construir_pendentes
+from sinteticos import gerar_compras, gravar_sintetico
+
+
+def pendentes_com_filtro(df):
+    # Como a listagem original: todas as linhas pendentes do arquivo, sem deduplicar
+    return df[df['situacao pedido'] == 'pendente']
+
+
+def compras_com_repetidos():
+    saida = io.StringIO()
+    gerar_compras(3000, semente=4).to_csv(saida, index=False)
+    saida.seek(0)
+    df = dados.ler_compras(saida)
+    # Mesma chave (pedido, produto) em mais de uma linha, pendente e não pendente
+    repetidos = df.iloc[::7].copy()
+    repetidos.loc[repetidos.index[::2], 'situacao pedido'] = 'pendente'
+    return dados.concatenar([df, repetidos])
+
+
+def test_itens_iguais_ao_filtro_original():
+    df = compras_com_repetidos()
+    esperado = pendentes_com_filtro(df)
+    assert esperado.duplicated(['numeropedido', 'codigoprodutoitem']).any()
+
+    pendentes = construir_pendentes(df)
+
+    itens = pendentes['itens']
+    assert len(itens) == len(esperado)
+    assert itens['valor liquido item'].sum() == pytest.approx(esperado['valor liquido item'].sum())
+    np.testing.assert_array_equal(itens['numeropedido'], esperado['numeropedido'])
+    fornecedores = pendentes['fornecedores'].set_index('fornecedor')
+    por_fornecedor = esperado.groupby('fornecedor', observed=True)['valor liquido item'].sum()
+    pd.testing.assert_series_equal(fornecedores['valor'].sort_index(), por_fornecedor.sort_index(),
+                                   check_names=False, check_index_type=False, check_categorical=False)
+
+
+@pytest.mark.parametrize('corte', [0, 1, 1500, 3400])
+def test_atualizacao_igual_a_montagem_completa(corte):
+    df = compras_com_repetidos()
+
+    atualizado = atualizar_pendentes(construir_pendentes(df.iloc[:corte]), df.iloc[corte:])
+
+    completo = construir_pendentes(df)
+    pd.testing.assert_frame_equal(atualizado['itens'], completo['itens'], check_categorical=False)
+    pd.testing.assert_frame_equal(atualizado['fornecedores'], completo['fornecedores'], check_categorical=False)
+
+
+def test_filtro_sem_pendentes():
+    df = compras_com_repetidos()
+    df = df[df['situacao pedido'] != 'pendente']
+
+    pendentes = construir_pendentes(df)
+
+    assert pendentes['itens'].empty
+    assert pendentes['fornecedores'].empty
+
+
+def test_acrescimo_no_arquivo_com_linhas_repetidas(tmp_path):
+    caminho = gravar_sintetico(str(tmp_path / "df_compra.csv"), "compras", 2000, semente=2)
+    with open(caminho, encoding="utf-8") as arquivo:
+        linhas = arquivo.readlines()
+    atualizacoes = []
+
+    def atualizar(pendentes, delta, df):
+        atualizacoes.append(len(delta))
+        return atualizar_pendentes(pendentes, delta, df)
+
+    dados.carregar_derivado(caminho, "pendentes", construir_pendentes, dados.ler_compras, atualizar)
+    # Itens já exportados aparecem de novo no fim do arquivo
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        arquivo.writelines(linhas[1:401])
+    pendentes = dados.carregar_derivado(caminho, "pendentes", construir_pendentes, dados.ler_compras, atualizar)
+
+    assert atualizacoes == [400]
+    esperado = pendentes_com_filtro(pd.read_csv(caminho))
+    assert len(pendentes['itens']) == len(esperado)
+    assert pendentes['itens']['valor liquido item'].sum() == pytest.approx(esperado['valor liquido item'].sum())
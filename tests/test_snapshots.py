@@ -0,0 +1,69 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+from calculos import (calcular_metricas, calcular_metricas_compras, carregar_snapshot, consultar_snapshot,
+                      gerar_snapshots)
+from compras import filtros_para_leitura as filtros_compras
+from dados import ler_compras, ler_vendas
+from meu_app import aplicar_filtros, filtros_para_leitura
+
+
+@pytest.fixture
+def snapshots(csv_sintetico, tmp_path):
+    caminhos = {"vendas": csv_sintetico("vendas", 3000), "compras": csv_sintetico("compras", 3000)}
+    destino = str(tmp_path / "snapshots")
+    gerar_snapshots(caminhos["vendas"], caminhos["compras"], destino)
+    return caminhos, destino
+
+
+def valores(df, coluna, todos):
+    # 'todos' e um valor presente nos dados
+    return [todos, df[coluna].dropna().iloc[0]]
+
+
+def test_snapshot_de_vendas_igual_as_metricas_do_dataset(snapshots):
+    caminhos, destino = snapshots
+    df = ler_vendas(caminhos["vendas"])
+    snapshot = carregar_snapshot("vendas", caminhos["vendas"], destino)
+    assert snapshot is not None
+
+    for filtros in itertools.product(valores(df, 'Vendedor', 'Todos'), valores(df, 'Mes', 'Todos'),
+                                     valores(df, 'Ano', 'Todos'), ['Faturada', 'Cancelada', 'Todos']):
+        df_filtrado = aplicar_filtros(df, *filtros)
+        obtido = consultar_snapshot(snapshot, "vendas", filtros_para_leitura(*filtros))
+        if obtido is None:
+            # Combinação sem linhas: a página calcula na hora
+            assert df_filtrado.empty, filtros
+            continue
+        assert obtido == pytest.approx(calcular_metricas(df_filtrado)), filtros
+
+
+def test_snapshot_de_compras_igual_as_metricas_do_dataset(snapshots):
+    caminhos, destino = snapshots
+    df = ler_compras(caminhos["compras"])
+    snapshot = carregar_snapshot("compras", caminhos["compras"], destino)
+    assert snapshot is not None
+
+    anos = sorted(df['ano'].dropna().unique().tolist())
+    for filtros in itertools.product(anos, valores(df, 'mes', 'todos'), valores(df, 'usuario', 'todos'),
+                                     valores(df, 'situacao pedido', 'todos'), valores(df, 'tipo fornecedor', 'todos')):
+        filtros = filtros_compras(*filtros)
+        # Como o aplicar_filtros da página de compras, sem índice
+        mascara = pd.Series(True, index=df.index)
+        for coluna, valor in filtros.items():
+            mascara &= df[coluna] == valor
+        obtido = consultar_snapshot(snapshot, "compras", filtros)
+        if obtido is None:
+            assert not mascara.any(), filtros
+            continue
+        assert obtido == pytest.approx(calcular_metricas_compras(df[mascara])), filtros
+
+
+def test_snapshot_de_outra_versao_do_csv_nao_e_usado(snapshots):
+    caminhos, destino = snapshots
+    with open(caminhos["vendas"], "a", encoding="utf-8") as arquivo:
+        arquivo.write(open(caminhos["vendas"], encoding="utf-8").read().splitlines()[-1] + "\n")
+    assert carregar_snapshot("vendas", caminhos["vendas"], destino) is None
+    assert carregar_snapshot("compras", caminhos["compras"], destino) is not None
@@ -1,25 +1,37 @@
-import pandas as pd
-
-# Carregar o arquivo CSV
-df = pd.read_csv("df_vendas.csv")
-
-# Verificar o tipo de dados da coluna 'Data_Emissao'
-print(f"Tipo de dados original de 'Data_Emissao': {df['Data_Emissao'].dtype}")
-
-# Verificar se a coluna 'Data_Emissao' já está em datetime, caso contrário, converter
-if df['Data_Emissao'].dtype == 'object':  # Se a coluna for do tipo 'object' (string)
-    try:
-        # Tentar converter as datas no formato brasileiro 'dd/mm/yyyy'
-        df['Data_Emissao'] = pd.to_datetime(df['Data_Emissao'], format='%d/%m/%Y', errors='coerce')
-        print("Conversão bem-sucedida para datetime no formato brasileiro (dd/mm/yyyy).")
-    except Exception as e:
-        print(f"Erro ao tentar converter datas: {e}")
-else:
-    print("A coluna 'Data_Emissao' já está em formato datetime.")
-
-# Verificar se a conversão foi realizada corretamente
-print(f"Tipo de dados após a conversão: {df['Data_Emissao'].dtype}")
-
-# Verificar se há valores inválidos (NaT) após a conversão
-valores_invalidos = df[df['Data_Emissao'].isna()]
-print(f"Entradas inválidas após conversão:\n{valores_invalidos}")
+import pandas as pd
+
+from dados import COLUNAS_DATA, converter_datas
+
+# Ler o arquivo CSV em blocos: históricos longos não precisam caber inteiros na memória
+TAMANHO_BLOCO = 200_000
+formato = COLUNAS_DATA['vendas']['Data_Emissao']
+
+total_linhas = 0
+total_invalidas = 0
+datas_invalidas = []
+exemplos_invalidos = []
+
+for numero, bloco in enumerate(pd.read_csv("df_vendas.csv", chunksize=TAMANHO_BLOCO)):
+    if numero == 0:
+        # Verificar o tipo de dados da coluna 'Data_Emissao'
+        print(f"Tipo de dados original de 'Data_Emissao': {bloco['Data_Emissao'].dtype}")
+
+    # Mesma conversão feita pelo app na carga: cada data distinta é analisada uma única vez
+    datas, invalidos = converter_datas(bloco['Data_Emissao'], formato)
+    datas_invalidas += [valor for valor in invalidos if valor not in datas_invalidas]
+
+    # Verificar se há valores inválidos (NaT) após a conversão
+    invalidas = bloco[datas.isna()]
+    total_linhas += len(bloco)
+    total_invalidas += len(invalidas)
+    if len(exemplos_invalidos) < 20:
+        exemplos_invalidos.append(invalidas.head(20))
+
+print("Conversão concluída para datetime (formatos mistos, dia primeiro).")
+print(f"Tipo de dados após a conversão: {datas.dtype}")
+if datas_invalidas:
+    print(f"Valores distintos que não puderam ser convertidos: {datas_invalidas}")
+
+print(f"{total_invalidas} de {total_linhas} entradas inválidas após conversão.")
+if exemplos_invalidos:
+    print(pd.concat(exemplos_invalidos).head(20))